@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'reviews',
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -50,6 +53,21 @@ REST_FRAMEWORK = {
     )
 }
 
+# Keyset pagination of the API list endpoints, see reviews.api.pagination
+API_PAGINATE_LISTS = os.getenv('API_PAGINATE_LISTS', 'True') == 'True'
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+
+# Default and largest number of results of the ranked name searches
+API_SEARCH_LIMIT = int(os.getenv('API_SEARCH_LIMIT', 20))
+API_MAX_SEARCH_LIMIT = int(os.getenv('API_MAX_SEARCH_LIMIT', 100))
+
+# Largest number of visits accepted by a single bulk POST /api/visits/
+API_MAX_BULK_VISITS = int(os.getenv('API_MAX_BULK_VISITS', 1000))
+
+# Number of rows fetched per round trip by the streaming export endpoints
+API_EXPORT_CHUNK_SIZE = int(os.getenv('API_EXPORT_CHUNK_SIZE', 2000))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
@@ -91,6 +109,9 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'reviews.middleware.MetricsMiddleware',
+    'reviews.middleware.QueryCountMiddleware',
+    'reviews.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -124,6 +145,19 @@ WSGI_APPLICATION = 'restaurant_review.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
+#
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after every
+# request, None keeps them forever) and checked before being reused by a new request
+# with DB_CONN_HEALTH_CHECKS. Under ASGI, connections cannot be reused across
+# requests, so set DB_CONN_MAX_AGE=0 there and use a pooler instead.
+#
+# To connect through an external pooler such as PgBouncer, point POSTGRES_HOST and
+# POSTGRES_PORT at it. In transaction pooling mode (DB_POOLER=transaction), the
+# server-side cursors of QuerySet.iterator() are disabled, since a cursor cannot
+# outlive the transaction whose server connection it was opened on.
+
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+DB_POOLER = os.getenv('DB_POOLER', '')
 
 DATABASES = {
     'default': {
@@ -131,8 +165,11 @@ DATABASES = {
         'NAME': os.getenv('POSTGRES_DB', 'restaurant_review_db'),
         'USER': os.getenv('POSTGRES_USER', 'admin'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'admin'),
-        'HOST': 'db',
-        'PORT': '5432',
+        'HOST': os.getenv('POSTGRES_HOST', 'db'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE == 'None' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'transaction',
     },
     'test': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -144,6 +181,118 @@ DATABASES = {
     },
 }
 
+# Read replicas
+# Every comma-separated host of DB_REPLICA_HOSTS is added as a replica alias
+# (replica_0, replica_1, ...) using the credentials of the primary. The reads of
+# GET and HEAD requests are routed to a random replica, everything else to the
+# primary, see reviews.routers. After a client writes, its reads stay on the
+# primary for DB_REPLICA_STICKY_SECONDS, so it sees its own writes despite the
+# replication lag.
+
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['reviews.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Redis is used when REDIS_URL is set, e.g. redis://redis:6379/1, otherwise a
+# per-process in-memory cache.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Lifetime in seconds of the cached restaurant responses, see reviews.cache
+VIEW_CACHE_TIMEOUT = int(os.getenv('VIEW_CACHE_TIMEOUT', 300))
+
+# Client addresses or networks (e.g. the Prometheus server, 10.0.0.0/8) allowed to
+# read /metrics, staff users are always allowed, see reviews.metrics
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+# Number of virtual reviews with the mean rating every restaurant starts with in
+# the Bayesian ranking of /api/restaurants/top/, see reviews.leaderboard
+LEADERBOARD_PRIOR_WEIGHT = int(os.getenv('LEADERBOARD_PRIOR_WEIGHT', 10))
+
+# Celery
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://redis:6379/0'))
+CELERY_TIMEZONE = 'UTC'
+
+CELERY_BEAT_SCHEDULE = {
+    # recompute the stored statistics and repair any drift, see reviews.stats
+    'verify-stats': {
+        'task': 'reviews.tasks.verify_stats',
+        'schedule': crontab(minute=30, hour=3),
+    },
+    # refresh the mean rating of the restaurant leaderboard, see reviews.leaderboard
+    'rebuild-leaderboard': {
+        'task': 'reviews.tasks.rebuild_leaderboard',
+        'schedule': crontab(minute=45, hour=3),
+    },
+    # create the upcoming monthly partitions of the visits table, see reviews.partitions
+    'create-visit-partitions': {
+        'task': 'reviews.tasks.create_visit_partitions',
+        'schedule': crontab(minute=0, hour=4),
+    },
+}
+
+# Partition the visits table by month (PostgreSQL only). Read by the migration
+# 0019_partition_visits, existing databases are converted with
+# `manage.py visit_partitions --convert`.
+VISIT_PARTITIONING = os.getenv('VISIT_PARTITIONING', 'False') == 'True'
+# Number of future months that always have a partition
+VISIT_PARTITIONS_AHEAD = int(os.getenv('VISIT_PARTITIONS_AHEAD', 3))
+
+# Largest number of queries per view (URL name), see reviews.middleware.
+# Exceeding views are logged, or fail with QUERY_BUDGET_RAISE=True (e.g. when running the tests).
+QUERY_BUDGETS = {
+    'restaurant_list': 6,
+    'restaurant_detail': 10,
+    'user_reviews': 6,
+    'user_visits': 6,
+    'customers': 6,
+    'customer_spending': 6,
+    'restaurants': 6,
+    'restaurant': 6,
+    'top_restaurants': 6,
+    'reviews': 6,
+    'review': 6,
+    'visits': 12,
+    'visit': 8,
+}
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'reviews.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Restaurant, Review, Customer, Visit
+from .models import CustomerRestaurantStats, LeaderboardState, Restaurant, Review, Customer, TableVersion, Visit
 
 admin.site.register(Restaurant)
 admin.site.register(Review)
 admin.site.register(Customer)
 admin.site.register(Visit)
+admin.site.register(CustomerRestaurantStats)
+admin.site.register(LeaderboardState)
+admin.site.register(TableVersion)
@@ -0,0 +1,160 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+from reviews.models import Customer, Restaurant, Review, Visit
+from reviews.utils import aget_total_spending_by_customer_and_restaurant
+from .pagination import KeysetPagination
+from .serializers import (CustomerListSerializer, CustomerSerializer, RestaurantSerializer, ReviewSerializer,
+                          VisitSerializer)
+from .views import _get_search_limit, _restaurant_filters, _review_filters
+
+# Asynchronous versions of the read endpoints of `reviews.api.views`.
+#
+# Served by an ASGI server (see the `web-async` service of docker-compose.yml), a
+# worker keeps handling other requests while one waits for the database. DRF 3.14
+# has no async views, so these are plain Django views returning the same JSON
+# as their synchronous counterparts. The rows are fetched with the async ORM and
+# serialized without further queries. Unlike the synchronous endpoints, they do
+# not answer conditional GETs and bypass the response cache.
+
+
+def async_api_view(view):
+    """
+    Restrict an async view to GET (and HEAD) and render API exceptions like DRF does.
+    """
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as e:
+            data = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            return json_response(data, status=e.status_code)
+
+    return inner
+
+
+def json_response(data, status: int = 200) -> JsonResponse:
+    # DRF's encoder, so decimals and dates are rendered like in the synchronous responses
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+def not_found() -> JsonResponse:
+    return json_response({'detail': 'Not found.'}, status=404)
+
+
+# customers
+@async_api_view
+async def customers_view(request, username=None):
+    """
+    Async version of `get_customers`.
+    """
+    if username:
+        try:
+            customer = await Customer.objects.aget(username=username)
+        except Customer.DoesNotExist:
+            return not_found()
+        # the groups and user_permissions relations are queried while serializing
+        data = await sync_to_async(lambda: CustomerSerializer(customer).data)()
+        return json_response(data)
+
+    fields = CustomerListSerializer.Meta.fields
+    query = request.GET.get('query', '')
+
+    if query:
+        # the search first checks for an exact match, which is a synchronous query
+        customers = await sync_to_async(
+            lambda: list(Customer.objects.only(*fields).search(query, limit=_get_search_limit(request)))
+        )()
+        return json_response(CustomerListSerializer(customers, many=True).data)
+
+    paginator = KeysetPagination('username')
+    page = await paginator.apaginate_queryset(Customer.objects.only(*fields), request)
+    return json_response(paginator.get_paginated_data(CustomerListSerializer(page, many=True).data))
+
+
+# restaurant
+@async_api_view
+async def restaurants_view(request):
+    """
+    Async version of the GET requests of `restaurants_view`.
+    """
+    restaurants = Restaurant.objects.filter(**_restaurant_filters(request))
+
+    search = request.GET.get('search', '')
+    if search:
+        restaurants = [row async for row in restaurants.search(search, limit=_get_search_limit(request))]
+        return json_response(RestaurantSerializer(restaurants, many=True).data)
+
+    paginator = KeysetPagination('id')
+    page = await paginator.apaginate_queryset(restaurants, request)
+    return json_response(paginator.get_paginated_data(RestaurantSerializer(page, many=True).data))
+
+
+@async_api_view
+async def restaurant_detail_view(request, restaurant_id=None):
+    """
+    Async version of the GET requests of `restaurant_detail_view`.
+    """
+    try:
+        restaurant = await Restaurant.objects.aget(id=restaurant_id)
+    except Restaurant.DoesNotExist:
+        return not_found()
+
+    return json_response(RestaurantSerializer(restaurant).data)
+
+
+# review
+@async_api_view
+async def reviews_view(request):
+    """
+    Async version of the GET requests of `reviews_view`.
+    """
+    paginator = KeysetPagination('-created')
+    page = await paginator.apaginate_queryset(Review.objects.filter(**_review_filters(request)), request)
+    return json_response(paginator.get_paginated_data(ReviewSerializer(page, many=True).data))
+
+
+@async_api_view
+async def review_detail_view(request, review_id=None):
+    """
+    Async version of the GET requests of `review_detail_view`.
+    """
+    try:
+        review = await Review.objects.aget(id=review_id)
+    except Review.DoesNotExist:
+        return not_found()
+
+    return json_response(ReviewSerializer(review).data)
+
+
+# visit
+@async_api_view
+async def visits_view(request):
+    """
+    Async version of the GET requests of `visits_view`.
+    """
+    paginator = KeysetPagination('-date')
+    page = await paginator.apaginate_queryset(Visit.objects.all(), request)
+    spending_totals = await aget_total_spending_by_customer_and_restaurant(page)
+    serializer = VisitSerializer(page, many=True, context={'spending_totals': spending_totals})
+    return json_response(paginator.get_paginated_data(serializer.data))
+
+
+@async_api_view
+async def visit_detail_view(request, visit_id=None):
+    """
+    Async version of the GET requests of `visit_detail_view`.
+    """
+    try:
+        visit = await Visit.objects.aget(id=visit_id)
+    except Visit.DoesNotExist:
+        return not_found()
+
+    spending_totals = await aget_total_spending_by_customer_and_restaurant([visit])
+    return json_response(VisitSerializer(visit, context={'spending_totals': spending_totals}).data)
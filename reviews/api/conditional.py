@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from django.db.models import Count, Max, QuerySet, Subquery
+from django.views.decorators.http import condition
+
+from reviews.models import TableVersion
+
+Validators = Optional[Tuple[str, Optional[datetime]]]
+
+
+def conditional_view(validators_func: Callable[..., Validators]) -> Callable:
+    """
+    Decorate a view with ETag / Last-Modified support for GET and HEAD requests.
+
+    `validators_func` is called with the view arguments and returns an
+    (etag, last_modified) tuple, or None if the resource does not exist. It runs
+    once per request, before the view, so a request carrying a matching
+    If-None-Match or If-Modified-Since header is answered with 304 Not Modified
+    without running the view or instantiating serializers. Other methods skip the
+    validators entirely.
+
+    Parameters:
+        validators_func (Callable): Computes the validators of the requested resource.
+
+    Returns:
+        Callable: The view decorator.
+
+    Example:
+        ```python
+        @conditional_view(lambda request, pk: row_validators('restaurant', Restaurant.objects.filter(pk=pk)))
+        @api_view(['GET'])
+        def restaurant_view(request, pk):
+            ...
+        ```
+    """
+    def get_validators(request, *args, **kwargs) -> Validators:
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(request, '_conditional_validators'):
+            request._conditional_validators = validators_func(request, *args, **kwargs)
+        return request._conditional_validators
+
+    def etag_func(request, *args, **kwargs) -> Optional[str]:
+        validators = get_validators(request, *args, **kwargs)
+        return validators[0] if validators else None
+
+    def last_modified_func(request, *args, **kwargs) -> Optional[datetime]:
+        validators = get_validators(request, *args, **kwargs)
+        return validators[1] if validators else None
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+
+def row_validators(prefix: str, queryset: QuerySet) -> Validators:
+    """
+    Validators of a single row, from its `updated_at` column.
+
+    Parameters:
+        prefix (str): Distinguishes the ETags of different resources.
+        queryset (QuerySet): A queryset selecting the row.
+
+    Returns:
+        Validators: The ETag and last modification time, or None if the row does not exist.
+
+    """
+    row = queryset.values_list('pk', 'updated_at').first()
+    if row is None:
+        return None
+
+    pk, updated_at = row
+    return f'"{prefix}-{pk}-{updated_at.timestamp()}"', updated_at
+
+
+def list_validators(prefix: str, queryset: QuerySet) -> Validators:
+    """
+    Validators of a small set of rows, from max(`updated_at`) and the row count.
+
+    The count makes the ETag change when a row is deleted, which the maximum
+    modification time alone would not reflect. Both are computed over all the
+    rows, so use it only for small sets selected by an index, e.g. the visits of
+    one customer at one restaurant; paginated lists use `versioned_list_validators`.
+
+    Parameters:
+        prefix (str): Distinguishes the ETags of different resources.
+        queryset (QuerySet): The filtered rows of the list.
+
+    Returns:
+        Validators: The ETag and last modification time of the set.
+
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    last_modified = stats['last_modified']
+    timestamp = last_modified.timestamp() if last_modified else 0
+    return f'"{prefix}-{stats["count"]}-{timestamp}"', last_modified
+
+
+def versioned_list_validators(prefix: str, model) -> Validators:
+    """
+    Validators of a list, from max(`updated_at`) and the deletion counter of its table.
+
+    The newest modification time is read from the end of the `updated_at` index
+    and the deletions from the TableVersion row of the table (see
+    `TableVersion.bump`), in a single query, so the cost of a validator does not
+    grow with the table the way a COUNT would. Both cover the whole table, not
+    just the filtered rows: a row leaving a filtered list, e.g. a renamed
+    restaurant, only changes its own `updated_at`, which the filter would skip.
+
+    Parameters:
+        prefix (str): Distinguishes the ETags of different resources.
+        model (Model): The model of the listed rows.
+
+    Returns:
+        Validators: The ETag and last modification time of the list.
+
+    """
+    newest = model.objects.order_by('-updated_at').values('updated_at')[:1]
+    row = (
+        TableVersion.objects.filter(table=model._meta.db_table)
+        .annotate(last_modified=Subquery(newest))
+        .values_list('deletions', 'last_modified')
+        .first()
+    )
+    # the row is created by the migrations, or by the first deletion of the table
+    if row is None:
+        row = 0, model.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+    deletions, last_modified = row
+
+    timestamp = last_modified.timestamp() if last_modified else 0
+    return f'"{prefix}-{deletions}-{timestamp}"', last_modified
@@ -0,0 +1,111 @@
+import csv
+import json
+from typing import Iterable, Iterator, Sequence
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it, for streaming csv.writer output.
+    """
+    def write(self, value: str) -> str:
+        return value
+
+
+def parse_export_filters(query_params, date_field: str) -> dict:
+    """
+    Build queryset filters from the export query parameters.
+
+    Query Parameters:
+    - date_from (optional): Only include rows on or after this date (YYYY-MM-DD).
+    - date_to (optional): Only include rows on or before this date (YYYY-MM-DD).
+    - restaurant (optional): Only include rows of the restaurant with this ID.
+
+    Parameters:
+        query_params (QueryDict): The request query parameters.
+        date_field (str): The lookup path of the date to filter on, e.g. 'date' or 'created__date'.
+
+    Returns:
+        dict: Keyword arguments for `QuerySet.filter()`.
+
+    Raises:
+        ValidationError: If a date or the restaurant ID is malformed.
+
+    """
+    filters = {}
+
+    for param, lookup in (('date_from', 'gte'), ('date_to', 'lte')):
+        value = query_params.get(param)
+        if value:
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValidationError({param: 'Enter a valid date in the format YYYY-MM-DD.'})
+            filters[f'{date_field}__{lookup}'] = parsed
+
+    restaurant = query_params.get('restaurant')
+    if restaurant:
+        if not restaurant.isdigit():
+            raise ValidationError({'restaurant': 'Enter a valid restaurant ID.'})
+        filters['restaurant_id'] = int(restaurant)
+
+    return filters
+
+
+def iter_rows(queryset: QuerySet, fields: Sequence[str]) -> Iterator[dict]:
+    """
+    Iterate over the rows of a queryset as dicts, fetching them in chunks.
+
+    On PostgreSQL the rows are read through a server-side cursor, so memory use
+    does not depend on the size of the export.
+
+    """
+    chunk_size = getattr(settings, 'API_EXPORT_CHUNK_SIZE', 2000)
+    return queryset.order_by('pk').values(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(rows: Iterable[dict], fields: Sequence[str]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([row[field] for field in fields])
+
+
+def stream_export(queryset: QuerySet, fields: Sequence[str], export_format: str,
+                  filename: str) -> StreamingHttpResponse:
+    """
+    Stream the rows of a queryset as NDJSON or CSV.
+
+    Parameters:
+        queryset (QuerySet): The filtered rows to export.
+        fields (Sequence[str]): The fields to export, in column order.
+        export_format (str): Either 'ndjson' or 'csv'.
+        filename (str): The file name suggested to the client, without extension.
+
+    Returns:
+        StreamingHttpResponse: The streamed export.
+
+    """
+    rows = iter_rows(queryset, fields)
+
+    if export_format == 'csv':
+        response = StreamingHttpResponse(iter_csv(rows, fields), content_type='text/csv; charset=utf-8')
+    else:
+        export_format = 'ndjson'
+        response = StreamingHttpResponse(iter_ndjson(rows), content_type='application/x-ndjson; charset=utf-8')
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,169 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a (sort key, id) pair.
+
+    Pages are selected with a `WHERE (key, id) > (last key, last id)` condition
+    instead of an OFFSET, so every page costs the same regardless of its depth,
+    as long as the ordering is backed by an index on (sort key, id). The cursor
+    handed to clients is an opaque, URL-safe encoding of the last row's key and id.
+
+    Pagination is applied when `API_PAGINATE_LISTS` is enabled or when the request
+    passes a `cursor` or `page_size` query parameter. Otherwise the whole list is
+    returned as before.
+
+    Attributes:
+        ordering (str): The sort key, prefixed with '-' for descending order.
+        cursor_query_param (str): The query parameter holding the cursor.
+        page_size_query_param (str): The query parameter holding the requested page size.
+
+    Settings:
+        API_PAGINATE_LISTS (bool): Paginate list responses by default.
+        API_PAGE_SIZE (int): The default page size.
+        API_MAX_PAGE_SIZE (int): The largest page size a client may request.
+
+    Example:
+        ```python
+        paginator = KeysetPagination('-date')
+        page = paginator.paginate_queryset(Visit.objects.all(), request)
+        serializer = VisitSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+        ```
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering: str = 'id'):
+        self.ordering = ordering
+        self.descending = ordering.startswith('-')
+        self.sort_field = ordering.lstrip('-')
+        self.paginate = False
+        self.request = None
+        self.next_cursor = None
+
+    def get_page_size(self, request: Request) -> int:
+        default_page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+        try:
+            page_size = int(self.get_query_params(request).get(self.page_size_query_param, default_page_size))
+        except ValueError:
+            page_size = default_page_size
+
+        return max(1, min(page_size, max_page_size))
+
+    def encode_cursor(self, row: Any) -> str:
+        value = getattr(row, self.sort_field)
+        if isinstance(value, datetime):
+            # DjangoJSONEncoder truncates to milliseconds, which would skip the rows
+            # sharing the millisecond of the last row
+            value = value.isoformat()
+        position = [value, row.pk]
+        payload = json.dumps(position, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, cursor: str) -> List[Any]:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor.')
+
+        if not isinstance(position, list) or len(position) != 2:
+            raise NotFound('Invalid cursor.')
+        return position
+
+    def filter_after(self, queryset: QuerySet, cursor: str) -> QuerySet:
+        value, pk = self.decode_cursor(cursor)
+        lookup = 'lt' if self.descending else 'gt'
+
+        if self.sort_field in ('id', 'pk'):
+            return queryset.filter(**{f'pk__{lookup}': pk})
+
+        return queryset.filter(
+            Q(**{f'{self.sort_field}__{lookup}': value})
+            | Q(**{self.sort_field: value, f'pk__{lookup}': pk})
+        )
+
+    def get_query_params(self, request) -> Any:
+        # DRF requests expose `query_params`, the plain Django requests of the async views `GET`
+        return getattr(request, 'query_params', request.GET)
+
+    def prepare_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """
+        Order the queryset by (sort key, id) and, if paginating, apply the cursor and page size.
+        """
+        self.request = request
+        params = self.get_query_params(request)
+        order_by = [self.ordering] if self.sort_field in ('id', 'pk') else [self.ordering, '-pk' if self.descending else 'pk']
+        queryset = queryset.order_by(*order_by)
+
+        self.paginate = (
+            getattr(settings, 'API_PAGINATE_LISTS', True)
+            or self.cursor_query_param in params
+            or self.page_size_query_param in params
+        )
+        if not self.paginate:
+            return queryset
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.filter_after(queryset, cursor)
+
+        # one extra row tells whether there is a next page
+        return queryset[:self.get_page_size(request) + 1]
+
+    def get_page(self, rows: List[Any]) -> List[Any]:
+        if not self.paginate:
+            return rows
+
+        page_size = self.get_page_size(self.request)
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if len(rows) > page_size else None
+        return page
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> Optional[List[Any]]:
+        """
+        Return the rows of the requested page, ordered by (sort key, id).
+
+        Parameters:
+            queryset (QuerySet): The filtered queryset to paginate.
+            request (Request): The request carrying the cursor and page size.
+
+        Returns:
+            List[Any]: The rows of the page, or all rows if pagination is not applied.
+
+        """
+        return self.get_page(list(self.prepare_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request) -> List[Any]:
+        """
+        Asynchronous version of `paginate_queryset`, fetching the rows with async iteration.
+        """
+        return self.get_page([row async for row in self.prepare_queryset(queryset, request)])
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data: Any) -> Any:
+        if not self.paginate:
+            return data
+        return {'next': self.get_next_link(), 'results': data}
+
+    def get_paginated_response(self, data: Any) -> Response:
+        return Response(self.get_paginated_data(data))
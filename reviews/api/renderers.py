@@ -0,0 +1,42 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline-delimited JSON.
+
+    Export views stream their rows themselves; this renderer only selects the
+    format during content negotiation and renders non-streamed responses, such
+    as validation errors, as a single JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=DjangoJSONEncoder) + '\n').encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer for comma-separated values.
+
+    Export views stream their rows themselves; this renderer only selects the
+    format during content negotiation and renders non-streamed responses, such
+    as validation errors, as 'field,message' rows.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        return ''.join(f'{key},{json.dumps(value, cls=DjangoJSONEncoder)}\n' for key, value in data.items()).encode(self.charset)
@@ -64,6 +64,23 @@ class CustomerSerializer(ModelSerializer):
         fields = '__all__'
 
 
+class CustomerListSerializer(ModelSerializer):
+    """
+    Lean serializer for customer lists and searches.
+
+    Unlike CustomerSerializer, it leaves out the password hash and the `groups`
+    and `user_permissions` many-to-many fields, so serializing a customer does
+    not query the database.
+
+    Meta:
+        - model (Customer): The Customer model.
+        - fields (list): List of fields to include in the serialized output.
+    """
+    class Meta:
+        model = Customer
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'date_joined']
+
+
 class RestaurantSerializer(ModelSerializer):
     """
     Serializer for the Restaurant model.
@@ -82,7 +99,7 @@ class RestaurantSerializer(ModelSerializer):
     average_rating = serializers.FloatField(read_only=True)
 
     def get_created_by(self, obj: Restaurant) -> int or None:
-        return obj.created_by.id if obj.created_by else None
+        return obj.created_by_id
 
     def get_pricing_category_eval(self, obj: Restaurant) -> str or None:
         return obj.get_restaurant_pricing_category_eval()
@@ -92,6 +109,18 @@ class RestaurantSerializer(ModelSerializer):
         fields = ['id', 'name', 'cuisine', 'address', 'created_by', 'average_rating', 'pricing_category_eval']
 
 
+class TopRestaurantSerializer(RestaurantSerializer):
+    """
+    Serializer for the restaurant leaderboard, adding the ranking fields to RestaurantSerializer.
+
+    Attributes:
+        - review_count (int): The number of reviews of the restaurant.
+        - bayesian_rating (float): The Bayesian average rating the restaurants are ranked by.
+    """
+    class Meta(RestaurantSerializer.Meta):
+        fields = RestaurantSerializer.Meta.fields + ['review_count', 'bayesian_rating']
+
+
 class ReviewSerializer(ModelSerializer):
     """
     Serializer for the Review model.
@@ -115,6 +144,11 @@ class VisitSerializer(ModelSerializer):
     Methods:
         - get_total_spending_at_restaurant(obj: Visit) -> float: Returns the total spending at the visited restaurant.
 
+    Context:
+        - spending_totals (dict, optional): Precomputed totals keyed by (customer ID, restaurant ID),
+          see `get_total_spending_by_customer_and_restaurant`. Used by list responses to avoid
+          one query per visit.
+
     Meta:
         - model (Visit): The Visit model.
         - fields (list): List of fields to include in the serialized output.
@@ -122,6 +156,10 @@ class VisitSerializer(ModelSerializer):
     total_spending_at_restaurant = serializers.SerializerMethodField()
 
     def get_total_spending_at_restaurant(self, obj: Visit) -> Decimal:
+        spending_totals = self.context.get('spending_totals')
+        if spending_totals is not None:
+            return spending_totals.get((obj.customer_id, obj.restaurant_id), 0)
+
         user = obj.customer
         restaurant = obj.restaurant
         total_spending = calculate_user_total_spending_at_restaurant(user, restaurant)
@@ -138,3 +176,27 @@ class VisitSerializer(ModelSerializer):
         """
         model = Visit
         fields = ['id', 'date', 'spending', 'restaurant', 'customer', 'total_spending_at_restaurant']
+
+
+class BulkVisitSerializer(serializers.Serializer):
+    """
+    Serializer validating one row of a bulk visit creation.
+
+    Restaurants are resolved from the 'restaurants' context, a mapping of ID to
+    Restaurant built with a single `in_bulk` query for the whole batch, so
+    validating a row does not hit the database.
+
+    Attributes:
+        - date (date): The date of the visit.
+        - spending (Decimal): The amount spent during the visit.
+        - restaurant (Restaurant): The visited restaurant, given by its ID.
+    """
+    date = serializers.DateField()
+    spending = serializers.DecimalField(max_digits=10, decimal_places=2)
+    restaurant = serializers.IntegerField()
+
+    def validate_restaurant(self, value: int) -> Restaurant:
+        restaurant = self.context['restaurants'].get(value)
+        if restaurant is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return restaurant
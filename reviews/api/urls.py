@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView
-from . import views
+from . import async_views, views
 from reviews.api.views import MyTokenObtainPairView
 
 urlpatterns = [
@@ -10,13 +10,28 @@ urlpatterns = [
 
     path('customers/', views.get_customers, name='customers'),
     path('customers/<str:username>/', views.get_customers, name='customer'),
+    path('customers/<str:username>/spending/', views.customer_spending_view, name='customer_spending'),
 
     path('restaurants/', views.restaurants_view, name='restaurants'),
     path('restaurants/<int:restaurant_id>/', views.restaurant_detail_view, name='restaurant'),
+    path('restaurants/top/', views.top_restaurants_view, name='top_restaurants'),
 
     path('reviews/', views.reviews_view, name='reviews'),
     path('reviews/<int:review_id>', views.review_detail_view, name='review'),
+    path('reviews/export/', views.reviews_export_view, name='reviews_export'),
 
     path('visits/', views.visits_view, name='visits'),
     path('visits/<int:visit_id>', views.visit_detail_view, name='visit'),
+    path('visits/export/', views.visits_export_view, name='visits_export'),
+
+    path('cache/stats/', views.cache_stats_view, name='cache_stats'),
+
+    path('async/customers/', async_views.customers_view, name='async_customers'),
+    path('async/customers/<str:username>/', async_views.customers_view, name='async_customer'),
+    path('async/restaurants/', async_views.restaurants_view, name='async_restaurants'),
+    path('async/restaurants/<int:restaurant_id>/', async_views.restaurant_detail_view, name='async_restaurant'),
+    path('async/reviews/', async_views.reviews_view, name='async_reviews'),
+    path('async/reviews/<int:review_id>', async_views.review_detail_view, name='async_review'),
+    path('async/visits/', async_views.visits_view, name='async_visits'),
+    path('async/visits/<int:visit_id>', async_views.visit_detail_view, name='async_visit'),
 ]
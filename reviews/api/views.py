@@ -1,17 +1,33 @@
-from django.db.models import Q
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
 from django.shortcuts import get_object_or_404
-from rest_framework.decorators import api_view, authentication_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.exceptions import NotAuthenticated, ValidationError
+from rest_framework.permissions import BasePermission, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import status
 
-from reviews.models import Customer, Restaurant, Review, Visit
+from reviews.cache import cached_view, get_cache_stats, invalidate
+from reviews.models import Customer, CustomerRestaurantStats, Restaurant, Review, Visit
+from reviews.utils import get_total_spending_by_customer_and_restaurant
+from .conditional import conditional_view, list_validators, row_validators, versioned_list_validators
+from .exports import parse_export_filters, stream_export
+from .pagination import KeysetPagination
+from .renderers import CSVRenderer, NDJSONRenderer
 from .serializers import (
+    BulkVisitSerializer,
     MyTokenObtainPairSerializer,
+    CustomerListSerializer,
     CustomerSerializer,
     RestaurantSerializer,
     ReviewSerializer,
+    TopRestaurantSerializer,
     VisitSerializer,
 )
 
@@ -36,40 +52,190 @@ def get_routes(request):
 
         '/api/customers',
         '/api/customers/<str:username>',
+        '/api/customers/<str:username>/spending/',
 
         '/api/restaurants',
         '/api/restaurants/<int:restaurant_id>',
+        '/api/restaurants/top/',
 
         '/api/reviews/',
         '/api/reviews/<int:review_id>',
+        '/api/reviews/export/',
 
         '/api/visits/',
         '/api/visits/<int:visit_id>',
+        '/api/visits/export/',
+
+        '/api/cache/stats/',
+
+        '/api/async/customers',
+        '/api/async/customers/<str:username>',
+        '/api/async/restaurants',
+        '/api/async/restaurants/<int:restaurant_id>',
+        '/api/async/reviews/',
+        '/api/async/reviews/<int:review_id>',
+        '/api/async/visits/',
+        '/api/async/visits/<int:visit_id>',
     ]
     return Response(routes)
 
 
+# cache
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    """
+    API endpoint for monitoring the restaurant response cache.
+
+    Only staff users may read the counters.
+
+    Returns:
+        Response: A JSON response with the number of cache 'hits' and 'misses'.
+    """
+    return Response(get_cache_stats())
+
+
 # customers
 @api_view(['GET'])
 def get_customers(request, username=None):
     """
     Retrieve customer information.
 
+    Query Parameters:
+    - query (optional): Returns the customers whose username or email best matches the
+      query as a plain list. An exact username or email match is returned on its own.
+    - limit (optional): Maximum number of 'query' results, capped by API_MAX_SEARCH_LIMIT.
+
+    Without a query, customers are listed by username and paginated with the
+    'cursor' and 'page_size' query parameters.
+
     Returns:
     - Response: JSON response containing customer information.
     """
     if username:
         customer = get_object_or_404(Customer, username=username)
         serializer = CustomerSerializer(customer, many=False)
+        return Response(serializer.data)
+
+    fields = CustomerListSerializer.Meta.fields
+    query = request.GET.get('query', '')
+
+    if query:
+        customers = Customer.objects.only(*fields).search(query, limit=_get_search_limit(request))
+        serializer = CustomerListSerializer(customers, many=True)
+        return Response(serializer.data)
+
+    paginator = KeysetPagination('username')
+    page = paginator.paginate_queryset(Customer.objects.only(*fields), request)
+    serializer = CustomerListSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+class IsCustomerOrStaff(BasePermission):
+    """
+    Allow access to the data of the customer in the URL to that customer and to staff users.
+    """
+    def has_permission(self, request, view):
+        return request.user.is_staff or request.user.username == view.kwargs.get('username')
+
+
+def _customer_scope(request, username: str) -> list:
+    # the requesting user is the customer, unless a staff user asks
+    if request.user.username == username:
+        customer_id = request.user.pk
     else:
-        query = request.GET.get('query', '')
-        customers = Customer.objects.filter(Q(username__icontains=query) | Q(email__icontains=query))
-        serializer = CustomerSerializer(customers, many=True)
+        customer_id = Customer.objects.filter(username=username).values_list('pk', flat=True).first()
+    return [f'customer:{customer_id}']
+
 
-    return Response(serializer.data)
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated, IsCustomerOrStaff])
+@cached_view('customer_spending', _customer_scope, per_user=True)
+def customer_spending_view(request, username=None):
+    """
+    Monthly spending of a customer, only available to the customer and staff users.
+
+    The visits are grouped by month (and restaurant) and summed by the database.
+    Responses are cached per customer and invalidated on every visit change and
+    on changes of the restaurants the customer visited.
+
+    Query Parameters:
+    - date_from, date_to (optional): Only count visits in this date range (YYYY-MM-DD), inclusive.
+    - restaurant (optional): Only count visits of the restaurant with this ID.
+    - group_by (optional): 'restaurant' to break every month down by restaurant.
+
+    Returns:
+    - Response: The total spending and visit count, and a list of 'months' with the
+      'month' (YYYY-MM), 'total_spending' and 'visit_count' of each, ordered by month.
+    """
+    if request.user.username == username:
+        customer = request.user
+    else:
+        customer = get_object_or_404(Customer, username=username)
+    filters = parse_export_filters(request.query_params, 'date')
+
+    group_by = ['month']
+    if request.query_params.get('group_by') == 'restaurant':
+        group_by += ['restaurant', 'restaurant__name']
+
+    rows = (
+        Visit.objects.filter(customer=customer, **filters)
+        .annotate(month=TruncMonth('date'))
+        .values(*group_by)
+        .annotate(total_spending=Sum('spending'), visit_count=Count('id'))
+        .order_by(*group_by)
+    )
+
+    months = []
+    for row in rows:
+        month = {'month': f"{row['month']:%Y-%m}"}
+        if 'restaurant' in row:
+            month.update({'restaurant': row['restaurant'], 'restaurant_name': row['restaurant__name']})
+        months.append({**month, 'total_spending': row['total_spending'], 'visit_count': row['visit_count']})
+
+    return Response({
+        'customer': customer.username,
+        'total_spending': sum((month['total_spending'] for month in months), Decimal('0.00')),
+        'visit_count': sum(month['visit_count'] for month in months),
+        'months': months,
+    })
+
+
+def _get_search_limit(request) -> int:
+    """
+    Return the 'limit' query parameter of a search, bounded by API_MAX_SEARCH_LIMIT.
+    """
+    default_limit = getattr(settings, 'API_SEARCH_LIMIT', 20)
+    try:
+        limit = int(request.GET.get('limit', default_limit))
+    except ValueError:
+        limit = default_limit
+    return max(1, min(limit, getattr(settings, 'API_MAX_SEARCH_LIMIT', 100)))
 
 
 # restaurant
+def _restaurant_filters(request) -> dict:
+    restaurant_name = request.GET.get('restaurant_name', '')
+    query_params = {}
+
+    if restaurant_name:
+        query_params['name__icontains'] = restaurant_name
+
+    return query_params
+
+
+def _restaurants_validators(request):
+    return versioned_list_validators('restaurants', Restaurant)
+
+
+def _restaurant_validators(request, restaurant_id=None):
+    return row_validators('restaurant', Restaurant.objects.filter(pk=restaurant_id))
+
+
+@conditional_view(_restaurants_validators)
+@cached_view('api_restaurants', lambda request: ['restaurants'])
 @api_view(['GET', 'POST'])
 @authentication_classes([JWTAuthentication])
 def restaurants_view(request):
@@ -84,22 +250,33 @@ def restaurants_view(request):
 
     Query Parameters:
     - restaurant_name (optional): Filters restaurants by name using case-insensitive partial matching.
+    - search (optional): Returns the restaurants whose name best matches the query, ranked by
+      trigram similarity and tolerant to typos, as a plain list instead of pages.
+    - limit (optional): Maximum number of 'search' results, capped by API_MAX_SEARCH_LIMIT.
+    - cursor (optional): Opaque cursor of the next page, taken from the 'next' link.
+    - page_size (optional): Number of restaurants per page, capped by API_MAX_PAGE_SIZE.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - 'average_rating' set to 0 for new restaurants.
     - 'created_by' set to the user making the request for new restaurants.
     """
-    restaurant_name = request.GET.get('restaurant_name', '')
-    query_params = {}
+    query_params = _restaurant_filters(request)
 
-    if restaurant_name:
-        query_params['name__icontains'] = restaurant_name
+    # GET (search)
+    search = request.GET.get('search', '')
+    if request.method == 'GET' and search:
+        restaurants = Restaurant.objects.filter(**query_params).search(search, limit=_get_search_limit(request))
+        serializer = RestaurantSerializer(restaurants, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     # GET (list all)
     if request.method == 'GET':
         restaurants = Restaurant.objects.filter(**query_params)
-        serializer = RestaurantSerializer(restaurants, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = KeysetPagination('id')
+        page = paginator.paginate_queryset(restaurants, request)
+        serializer = RestaurantSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     # POST (create new)
     if request.method == 'POST':
@@ -112,6 +289,39 @@ def restaurants_view(request):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@cached_view('top_restaurants', lambda request: ['restaurants'])
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+def top_restaurants_view(request):
+    """
+    API endpoint listing the best rated restaurants.
+
+    Restaurants are ranked by the Bayesian average of their ratings (see
+    `reviews.leaderboard`), so a few perfect reviews do not outrank many very good
+    ones. The ranking is stored on the restaurants and read from a partial index
+    in one query. Restaurants without reviews are not ranked.
+
+    Query Parameters:
+    - cuisine (optional): Only rank restaurants of this cuisine.
+    - limit (optional): Number of restaurants, capped by API_MAX_SEARCH_LIMIT.
+
+    Returns:
+    - Response: The restaurants with their 'bayesian_rating', best first.
+    """
+    restaurants = Restaurant.objects.filter(review_count__gt=0)
+
+    cuisine = request.query_params.get('cuisine', '')
+    if cuisine:
+        if cuisine not in dict(Restaurant.RESTAURANT_TYPE_OPTIONS):
+            raise ValidationError({'cuisine': f'"{cuisine}" is not a valid cuisine.'})
+        restaurants = restaurants.filter(cuisine=cuisine)
+
+    restaurants = restaurants.order_by('-bayesian_rating', 'id')[:_get_search_limit(request)]
+    return Response(TopRestaurantSerializer(restaurants, many=True).data)
+
+
+@conditional_view(_restaurant_validators)
+@cached_view('api_restaurant_detail', lambda request, restaurant_id=None: [f'restaurant:{restaurant_id}'])
 @api_view(['GET', 'PUT', 'DELETE'])
 @authentication_classes([JWTAuthentication])
 def restaurant_detail_view(request, restaurant_id=None):
@@ -131,6 +341,7 @@ def restaurant_detail_view(request, restaurant_id=None):
     - restaurant_id: ID of the restaurant to be retrieved, updated, or deleted.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - Ensure the provided 'restaurant_id' corresponds to an existing restaurant.
     - PUT request updates fields provided in the request body.
     - DELETE request returns a success message upon successful deletion.
@@ -158,6 +369,28 @@ def restaurant_detail_view(request, restaurant_id=None):
 
 
 # review
+REVIEW_EXPORT_FIELDS = ('id', 'restaurant', 'customer', 'created', 'rating', 'pricing', 'comment')
+
+
+def _review_filters(request) -> dict:
+    username = request.GET.get('username', '')
+    query_params = {}
+
+    if username:
+        query_params['customer__username__icontains'] = username
+
+    return query_params
+
+
+def _reviews_validators(request):
+    return versioned_list_validators('reviews', Review)
+
+
+def _review_validators(request, review_id=None):
+    return row_validators('review', Review.objects.filter(pk=review_id))
+
+
+@conditional_view(_reviews_validators)
 @api_view(['GET', 'POST'])
 @authentication_classes([JWTAuthentication])
 def reviews_view(request):
@@ -172,24 +405,24 @@ def reviews_view(request):
 
     Query Parameters:
     - username (optional): Filters reviews by the username of the customer.
+    - cursor (optional): Opaque cursor of the next page, taken from the 'next' link.
+    - page_size (optional): Number of reviews per page, capped by API_MAX_PAGE_SIZE.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - 'customer' field automatically set to the authenticated user for new reviews.
     - Ensure 'rating' and 'comment' are provided in the request body for POST requests.
     - Returns a success message upon successful review creation (POST).
     """
-    username = request.GET.get('username', '')
-
-    query_params = {}
-
-    if username:
-        query_params['customer__username__icontains'] = username
+    query_params = _review_filters(request)
 
     # GET (list all)
     if request.method == 'GET':
         reviews = Review.objects.filter(**query_params)
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination('-created')
+        page = paginator.paginate_queryset(reviews, request)
+        serializer = ReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     # POST (create new)
     if request.method == 'POST':
@@ -202,6 +435,7 @@ def reviews_view(request):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@conditional_view(_review_validators)
 @api_view(['GET', 'PUT', 'DELETE'])
 @authentication_classes([JWTAuthentication])
 def review_detail_view(request, review_id=None):
@@ -221,6 +455,7 @@ def review_detail_view(request, review_id=None):
     - review_id: ID of the review to be retrieved, updated, or deleted.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - Ensure the provided 'review_id' corresponds to an existing review.
     - PUT request updates fields provided in the request body.
     - DELETE request returns a success message upon successful deletion.
@@ -248,7 +483,50 @@ def review_detail_view(request, review_id=None):
         return Response({"detail": "Restaurant review successfully deleted."}, status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@renderer_classes([NDJSONRenderer, CSVRenderer])
+def reviews_export_view(request):
+    """
+    API endpoint for exporting reviews.
+
+    GET:
+        Stream all reviews as NDJSON (default) or CSV, ordered by ID.
+
+    Query Parameters:
+    - format (optional): 'ndjson' or 'csv'.
+    - date_from, date_to (optional): Filters reviews by creation date (YYYY-MM-DD), inclusive.
+    - restaurant (optional): Filters reviews by restaurant ID.
+
+    Note:
+    - Rows are read in chunks and streamed as they are fetched, so memory use
+      does not grow with the size of the export.
+    """
+    filters = parse_export_filters(request.query_params, 'created__date')
+    reviews = Review.objects.filter(**filters)
+    return stream_export(reviews, REVIEW_EXPORT_FIELDS, request.accepted_renderer.format, 'reviews')
+
+
 # visit
+VISIT_EXPORT_FIELDS = ('id', 'date', 'spending', 'restaurant', 'customer')
+
+
+def _visits_validators(request):
+    return versioned_list_validators('visits', Visit)
+
+
+def _visit_validators(request, visit_id=None):
+    visit = Visit.objects.filter(pk=visit_id).values('customer_id', 'restaurant_id').first()
+    if visit is None:
+        return None
+
+    # the representation includes the total spending of the customer at the
+    # restaurant, which changes with every visit of the same pair
+    pair_visits = Visit.objects.filter(customer_id=visit['customer_id'], restaurant_id=visit['restaurant_id'])
+    return list_validators(f'visit-{visit_id}', pair_visits)
+
+
+@conditional_view(_visits_validators)
 @api_view(['GET', 'POST'])
 @authentication_classes([JWTAuthentication])
 def visits_view(request):
@@ -256,24 +534,38 @@ def visits_view(request):
     API endpoint for managing customer visits.
 
     GET:
-        List all customer visits.
+        List all customer visits, newest first.
 
     POST:
-        Create a new visit record for the authenticated customer.
+        Create a new visit record for the authenticated customer, or several
+        visits at once when the request body is a JSON array.
+
+    Query Parameters:
+    - cursor (optional): Opaque cursor of the next page, taken from the 'next' link.
+    - page_size (optional): Number of visits per page, capped by API_MAX_PAGE_SIZE.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - 'customer' field automatically set to the authenticated user for new visits.
     - Ensure 'date' and 'restaurant' are provided in the request body for POST requests.
     - Returns a success message upon successful visit creation (POST).
+    - Bulk creation accepts up to API_MAX_BULK_VISITS rows and is all-or-nothing;
+      errors are reported per row in the order of the request body.
     """
     # GET (list all)
     if request.method == 'GET':
         visits = Visit.objects.all()
-        serializer = VisitSerializer(visits, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination('-date')
+        page = paginator.paginate_queryset(visits, request)
+        spending_totals = get_total_spending_by_customer_and_restaurant(page)
+        serializer = VisitSerializer(page, many=True, context={'spending_totals': spending_totals})
+        return paginator.get_paginated_response(serializer.data)
 
     # POST (create new)
     if request.method == 'POST':
+        if isinstance(request.data, list):
+            return _create_visits_in_bulk(request)
+
         data = {**request.data, 'customer': request.user}
         serializer = VisitSerializer(data=data)
         if serializer.is_valid():
@@ -283,6 +575,85 @@ def visits_view(request):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _create_visits_in_bulk(request):
+    """
+    Create the visits of a JSON array request body for the authenticated customer.
+
+    All referenced restaurants are fetched with one `in_bulk` query and existing
+    visits colliding with the (restaurant, customer, date) constraint with one more
+    query. The visits are inserted with `bulk_create` in a single transaction, and
+    the customer restaurant statistics are updated once for the whole batch.
+
+    Returns:
+        Response: The created visits (201), or a list of per-row errors (400).
+    """
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+
+    rows = request.data
+    max_rows = getattr(settings, 'API_MAX_BULK_VISITS', 1000)
+    if not rows or len(rows) > max_rows:
+        return Response(
+            {"detail": f"Expected between 1 and {max_rows} visits."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    restaurant_ids = set()
+    for row in rows:
+        try:
+            restaurant_ids.add(int(row['restaurant']))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    context = {'restaurants': Restaurant.objects.in_bulk(restaurant_ids)}
+    row_serializers = [BulkVisitSerializer(data=row, context=context) for row in rows]
+    valid = [serializer.is_valid() for serializer in row_serializers]
+
+    existing = set(
+        Visit.objects.filter(
+            customer=request.user,
+            restaurant_id__in=restaurant_ids,
+            date__in={serializer.validated_data['date'] for serializer, ok in zip(row_serializers, valid) if ok},
+        ).values_list('restaurant_id', 'date')
+    ) if any(valid) else set()
+
+    errors, visits, seen = [], [], set()
+    for serializer, ok in zip(row_serializers, valid):
+        if not ok:
+            errors.append(serializer.errors)
+            continue
+
+        key = (serializer.validated_data['restaurant'].id, serializer.validated_data['date'])
+        if key in existing or key in seen:
+            errors.append({'non_field_errors': ['The fields restaurant, customer, date must make a unique set.']})
+            continue
+
+        seen.add(key)
+        errors.append({})
+        visits.append(Visit(customer=request.user, **serializer.validated_data))
+
+    if any(errors):
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            Visit.objects.bulk_create(visits)
+            CustomerRestaurantStats.add_visits(visits)
+    except IntegrityError:
+        return Response(
+            {"detail": "A visit for the same restaurant, customer and date was created concurrently."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # bulk_create sends no post_save signals
+    invalidate(f'customer:{request.user.pk}', *{f'restaurant:{visit.restaurant_id}' for visit in visits})
+
+    spending_totals = get_total_spending_by_customer_and_restaurant(visits)
+    serializer = VisitSerializer(visits, many=True, context={'spending_totals': spending_totals})
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@conditional_view(_visit_validators)
 @api_view(['GET', 'PUT', 'DELETE'])
 @authentication_classes([JWTAuthentication])
 def visit_detail_view(request, visit_id=None):
@@ -302,6 +673,7 @@ def visit_detail_view(request, visit_id=None):
     - visit_id: ID of the visit to be retrieved, updated, or deleted.
 
     Note:
+    - GET responses carry ETag and Last-Modified headers; conditional GETs are answered with 304.
     - Ensure the provided 'visit_id' corresponds to an existing visit.
     - PUT request updates fields provided in the request body.
     - DELETE request returns a success message upon successful deletion.
@@ -326,3 +698,27 @@ def visit_detail_view(request, visit_id=None):
     if request.method == 'DELETE':
         visit.delete()
         return Response({"detail": "Restaurant visit successfully deleted."}, status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@renderer_classes([NDJSONRenderer, CSVRenderer])
+def visits_export_view(request):
+    """
+    API endpoint for exporting customer visits.
+
+    GET:
+        Stream all visits as NDJSON (default) or CSV, ordered by ID.
+
+    Query Parameters:
+    - format (optional): 'ndjson' or 'csv'.
+    - date_from, date_to (optional): Filters visits by date (YYYY-MM-DD), inclusive.
+    - restaurant (optional): Filters visits by restaurant ID.
+
+    Note:
+    - Rows are read in chunks and streamed as they are fetched, so memory use
+      does not grow with the size of the export.
+    """
+    filters = parse_export_filters(request.query_params, 'date')
+    visits = Visit.objects.filter(**filters)
+    return stream_export(visits, VISIT_EXPORT_FIELDS, request.accepted_renderer.format, 'visits')
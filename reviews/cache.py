@@ -0,0 +1,151 @@
+import hashlib
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import CACHE_REQUESTS
+from .routers import use_primary
+
+STATS_KEYS = {'hits': 'view-cache:stats:hits', 'misses': 'view-cache:stats:misses'}
+
+
+def _generation_key(scope: str) -> str:
+    return f'view-cache:generation:{scope}'
+
+
+def _increment(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_generations(scopes: Iterable[str]) -> List[int]:
+    """
+    Return the current generation of every scope.
+
+    Missing generations start from the current time, so a scope whose counter was
+    evicted never falls back to a generation that already has cached responses.
+
+    """
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+
+    return [generations[key] for key in keys]
+
+
+def _bump_generations(scopes: Iterable[str]) -> None:
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*scopes: str) -> None:
+    """
+    Invalidate all cached responses of the given scopes.
+
+    Bumping the generation of a scope changes the keys of all responses depending
+    on it, so stale entries are never read again and expire on their own. Inside a
+    transaction the generations are bumped once it commits, as a miss reading the
+    new generation before that would cache the uncommitted, old data under it.
+
+    Parameters:
+        *scopes (str): The scopes to invalidate, e.g. 'restaurants' or 'restaurant:5'.
+
+    """
+    transaction.on_commit(lambda: _bump_generations(scopes))
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """
+    Return the view cache hit and miss counters.
+
+    Returns:
+        Dict[str, int]: The 'hits' and 'misses' counted since the cache was last cleared.
+
+    """
+    values = cache.get_many(STATS_KEYS.values())
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def cached_view(name: str, scopes: Callable[..., List[str]], per_user: bool = False) -> Callable:
+    """
+    Cache the successful GET responses of a view (cache-aside).
+
+    The cache key is built from the view name, the generations of the scopes the
+    response depends on, the full path including the query string, the Accept
+    header the response format is negotiated from and, with `per_user`, the
+    requesting user. Writes bump the generations of the affected scopes (see
+    `reviews.signals`), which makes every dependent key unreachable. Pages of DRF's
+    browsable API show the logged-in user and are never stored.
+
+    Requests with pending flash messages bypass the cache, so messages are never
+    served from or stored in it. On a miss, the view reads from the primary database
+    rather than a lagging read replica, so a stale response is never cached under
+    the generation of a newer write.
+
+    Parameters:
+        name (str): The name of the view, part of the cache key.
+        scopes (Callable): Called with the view arguments, returns the scopes the response depends on.
+        per_user (bool): Whether the response depends on the logged-in user.
+
+    Returns:
+        Callable: The view decorator.
+
+    Example:
+        ```python
+        @cached_view('restaurant_detail', lambda request, restaurant_id: [f'restaurant:{restaurant_id}'])
+        def restaurant_detail(request, restaurant_id):
+            ...
+        ```
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method != 'GET' or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            user_scope = f'user-{request.user.pk}' if per_user and request.user.is_authenticated else 'public'
+            generations = '.'.join(str(generation) for generation in get_generations(scopes(request, *args, **kwargs)))
+            variant = f"{request.get_full_path()}\n{request.META.get('HTTP_ACCEPT', '')}"
+            path = hashlib.md5(variant.encode()).hexdigest()
+            key = f'view-cache:{name}:{generations}:{user_scope}:{path}'
+
+            response = cache.get(key)
+            if response is not None:
+                _increment(STATS_KEYS['hits'])
+                CACHE_REQUESTS.labels(name, 'hit').inc()
+                return response
+
+            _increment(STATS_KEYS['misses'])
+            CACHE_REQUESTS.labels(name, 'miss').inc()
+            with use_primary():
+                response = view(request, *args, **kwargs)
+
+            renderer = getattr(response, 'accepted_renderer', None)
+            browsable = renderer is not None and renderer.format == 'api'
+            if response.status_code == 200 and not response.streaming and not browsable:
+                timeout = getattr(settings, 'VIEW_CACHE_TIMEOUT', 300)
+                if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+                    response.add_post_render_callback(lambda rendered: cache.set(key, rendered, timeout))
+                else:
+                    cache.set(key, response, timeout)
+
+            return response
+
+        return inner
+
+    return decorator
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db.models import F, FloatField, Subquery, Sum, Value
+from django.db.models.expressions import ExpressionWrapper
+from django.db.models.functions import Coalesce
+
+from .models import LeaderboardState, Restaurant
+
+# Ranking of the restaurants by the Bayesian average of their ratings.
+#
+# Every restaurant starts with LEADERBOARD_PRIOR_WEIGHT virtual reviews rated with
+# the mean rating of all reviews:
+#
+#     bayesian_rating = (weight * mean + rating_sum) / (weight + review_count)
+#
+# so a restaurant needs many good reviews to rank high, and a single 5-star review
+# does not beat hundreds of 4.8-star ones. The rating is stored on the restaurant,
+# updated with its review aggregates on every review write and recomputed with
+# the current mean by `reviews.stats.rebuild_leaderboard`. The mean itself is
+# stored in the single LeaderboardState row, which only the rebuild writes.
+
+STATE_ID = 1
+DEFAULT_MEAN_RATING = 3.0
+
+
+def compute_mean_rating() -> float:
+    """
+    Return the mean rating of all reviews, computed from the stored restaurant aggregates.
+    """
+    totals = Restaurant.objects.aggregate(rating_sum=Sum('rating_sum'), review_count=Sum('review_count'))
+    if not totals['review_count']:
+        return DEFAULT_MEAN_RATING
+    return totals['rating_sum'] / totals['review_count']
+
+
+def get_mean_rating() -> float:
+    """
+    Return the mean rating of all reviews, as of the last leaderboard rebuild.
+    """
+    mean = LeaderboardState.objects.filter(pk=STATE_ID).values_list('mean_rating', flat=True).first()
+    return DEFAULT_MEAN_RATING if mean is None else mean
+
+
+def set_mean_rating(mean: float) -> None:
+    LeaderboardState.objects.update_or_create(pk=STATE_ID, defaults={'mean_rating': mean})
+
+
+def mean_rating_expression() -> Coalesce:
+    """
+    Return the mean rating of the last leaderboard rebuild as a subquery, read by the enclosing query.
+    """
+    mean = LeaderboardState.objects.filter(pk=STATE_ID).values('mean_rating')[:1]
+    return Coalesce(Subquery(mean), Value(DEFAULT_MEAN_RATING), output_field=FloatField())
+
+
+def compute_bayesian_rating(review_count: int, rating_sum: int) -> float:
+    """
+    Return the Bayesian average rating of a restaurant with the given review aggregates.
+    """
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    return (weight * get_mean_rating() + rating_sum) / (weight + review_count)
+
+
+def bayesian_rating_expression(count_delta: int = 0, rating_delta: int = 0) -> ExpressionWrapper:
+    """
+    Return the Bayesian average rating of the stored review aggregates as an update expression.
+
+    The mean rating is read from LeaderboardState by the UPDATE itself, so the
+    review writes cost no extra query.
+
+    Parameters:
+        count_delta (int): The change of the review count applied by the same UPDATE.
+        rating_delta (int): The change of the rating sum applied by the same UPDATE.
+
+    Example:
+        ```python
+        Restaurant.objects.filter(pk=restaurant_id).update(
+            review_count=F('review_count') + 1,
+            rating_sum=F('rating_sum') + 4,
+            bayesian_rating=bayesian_rating_expression(count_delta=1, rating_delta=4),
+        )
+        ```
+    """
+    weight = float(settings.LEADERBOARD_PRIOR_WEIGHT)
+    return ExpressionWrapper(
+        (Value(weight) * mean_rating_expression() + F('rating_sum') + rating_delta)
+        / (Value(weight) + F('review_count') + count_delta),
+        output_field=FloatField(),
+    )
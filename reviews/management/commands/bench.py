@@ -0,0 +1,338 @@
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from reviews.middleware import QueryStats
+from reviews.models import Restaurant, Review, Visit
+from reviews.stats import verify_customer_restaurant_stats, verify_restaurant_stats
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}}
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Return the nearest-rank percentile of a list of values.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    """
+    Benchmark every HTML and API endpoint.
+
+    Like the test runner, the command creates a separate test database, seeds it
+    with a deterministic dataset of `--size` restaurants and customers and destroys
+    it afterwards, so the configured database is never touched. Every route of
+    `reviews/urls.py` and `reviews/api/urls.py` is then requested through the test
+    client, as a session user for the HTML pages and with a JWT for the API. Each
+    request runs in a rolled back savepoint, so write endpoints see the same data
+    on every iteration. The command uses its own local memory cache, which is
+    cleared before every measured request, so the numbers are those of uncached
+    responses and the configured cache, e.g. Redis, is never touched.
+
+    The p50/p95/p99 latency, the number of queries and the peak memory allocated
+    while handling one request are written per endpoint to `--output`. With
+    `--compare`, endpoints whose p95 latency grew by more than `--threshold` or
+    that run more queries than in the baseline are reported as regressions and
+    the command fails.
+
+    Example:
+        ```shell
+        $ python manage.py bench --size 200 --iterations 100 --output bench.json
+        $ python manage.py bench --size 200 --compare bench.json --threshold 0.2
+        ```
+    """
+    help = 'Benchmark the latency, query count and memory of every endpoint on a seeded test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help='Number of seeded restaurants and customers.')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated dataset.')
+        parser.add_argument('--endpoint', action='append', help='Only benchmark the endpoints with these names.')
+        parser.add_argument('--output', help='Path of the JSON result file.')
+        parser.add_argument('--compare', help='Path of a baseline JSON result file to compare with.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed relative p95 latency increase over the baseline.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError('--iterations must be positive and --warmup must not be negative.')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read the baseline {options["compare"]}: {e}')
+
+        old_name = connection.settings_dict['NAME']
+        with override_settings(CACHES=BENCH_CACHES):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+            try:
+                self.seed(options['size'], options['seed'])
+                results = self.run_endpoints(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        report = {
+            'meta': {
+                'size': options['size'],
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'endpoints': results,
+        }
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} {result['status']} p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+                f"p99={result['p99_ms']:.2f}ms queries={result['queries']} peak={result['peak_memory_kb']:.0f}KiB"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+
+        if baseline is not None:
+            regressions = self.compare(baseline['endpoints'], results, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}.')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
+
+    def seed(self, size: int, seed: int) -> None:
+        """
+        Create `size` customers and restaurants with five reviews and ten visits per customer.
+
+        The first customer is a staff user and owns the first restaurant.
+        """
+        rng = random.Random(seed)
+        password = make_password(BENCH_PASSWORD)
+
+        customers = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'bench_user_{i}', email=f'bench_user_{i}@example.com', password=password)
+            for i in range(size)
+        ])
+        customers[0].is_staff = True
+        customers[0].save(update_fields=['is_staff'])
+
+        cuisines = [cuisine for cuisine, _ in Restaurant.RESTAURANT_TYPE_OPTIONS]
+        restaurants = Restaurant.objects.bulk_create([
+            Restaurant(name=f'Bench Restaurant {i}', cuisine=rng.choice(cuisines), address=f'{i} Bench Street',
+                       created_by=customers[0] if i == 0 else rng.choice(customers))
+            for i in range(size)
+        ])
+
+        pricings = [pricing for pricing, _ in Review.PRICING_CATEGORY_OPTIONS]
+        reviews, visits = [], []
+        for customer in customers:
+            for restaurant in rng.sample(restaurants, min(5, size)):
+                reviews.append(Review(restaurant=restaurant, customer=customer, rating=rng.randint(1, 5),
+                                      pricing=rng.choice(pricings), comment='Benchmark review'))
+            for day in range(10):
+                visits.append(Visit(restaurant=rng.choice(restaurants), customer=customer,
+                                    date=date(2023, 1, 1) + timedelta(days=day),
+                                    spending=Decimal(rng.randint(500, 10000)) / 100))
+
+        Review.objects.bulk_create(reviews, batch_size=1000)
+        Visit.objects.bulk_create(visits, batch_size=1000)
+        verify_restaurant_stats(repair=True)
+        verify_customer_restaurant_stats(repair=True)
+
+    def get_endpoints(self) -> List[dict]:
+        """
+        Return the benchmarked requests: name, client ('anonymous', 'session' or 'jwt'), method, URL and data.
+        """
+        customer = get_user_model().objects.order_by('pk').first()
+        restaurant = Restaurant.objects.filter(created_by=customer).order_by('pk').first()
+        review = Review.objects.filter(customer=customer).order_by('pk').first()
+        visit = Visit.objects.filter(customer=customer).order_by('pk').first()
+        uid = urlsafe_base64_encode(force_bytes(customer.pk))
+        token = default_token_generator.make_token(customer)
+
+        restaurant_data = {'name': 'Bench', 'cuisine': 'asian_cuisine', 'address': 'Bench Street'}
+        review_data = {'rating': 4, 'pricing': 'cheap', 'comment': 'Benchmark review'}
+        visit_data = {'date': '2024-01-01', 'spending': '25.00'}
+
+        return [
+            # html
+            {'name': 'home', 'client': 'anonymous', 'url': reverse('home')},
+            {'name': 'register', 'client': 'anonymous', 'url': reverse('register')},
+            {'name': 'login', 'client': 'anonymous', 'url': reverse('login')},
+            {'name': 'login_post', 'client': 'anonymous', 'method': 'post', 'url': reverse('login'),
+             'data': {'username': customer.username, 'password': BENCH_PASSWORD}},
+            {'name': 'logout', 'client': 'anonymous', 'url': reverse('logout')},
+            {'name': 'restaurant_list', 'client': 'session', 'url': reverse('restaurant_list')},
+            {'name': 'restaurant_detail', 'client': 'session', 'url': reverse('restaurant_detail', args=[restaurant.id])},
+            {'name': 'add_restaurant', 'client': 'session', 'url': reverse('add_restaurant')},
+            {'name': 'edit_restaurant', 'client': 'session', 'url': reverse('edit_restaurant', args=[restaurant.id])},
+            {'name': 'delete_restaurant', 'client': 'session',
+             'url': reverse('delete_restaurant', args=[restaurant.id])},
+            {'name': 'create_review', 'client': 'session', 'url': reverse('create_review', args=[restaurant.id])},
+            {'name': 'user_reviews', 'client': 'session', 'url': reverse('user_reviews')},
+            {'name': 'add_visit', 'client': 'session', 'url': reverse('add_visit', args=[restaurant.id])},
+            {'name': 'user_visits', 'client': 'session', 'url': reverse('user_visits')},
+            {'name': 'reset_password', 'client': 'anonymous', 'url': reverse('reset_password')},
+            {'name': 'password_reset_done', 'client': 'anonymous', 'url': reverse('password_reset_done')},
+            {'name': 'password_reset_confirm', 'client': 'anonymous',
+             'url': reverse('password_reset_confirm', args=[uid, token])},
+            {'name': 'password_reset_complete', 'client': 'anonymous', 'url': reverse('password_reset_complete')},
+            {'name': 'add_restaurant_post', 'client': 'session', 'method': 'post', 'url': reverse('add_restaurant'),
+             'data': restaurant_data},
+            {'name': 'create_review_post', 'client': 'session', 'method': 'post',
+             'url': reverse('create_review', args=[restaurant.id]), 'data': review_data},
+            {'name': 'add_visit_post', 'client': 'session', 'method': 'post',
+             'url': reverse('add_visit', args=[restaurant.id]), 'data': visit_data},
+            {'name': 'delete_visit', 'client': 'session', 'url': reverse('delete_visit', args=[visit.id])},
+
+            # api
+            {'name': 'api_routes', 'client': 'jwt', 'url': '/api/'},
+            {'name': 'token_obtain_pair', 'client': 'anonymous', 'method': 'post', 'url': reverse('token_obtain_pair'),
+             'data': {'username': customer.username, 'password': BENCH_PASSWORD}},
+            # token/refresh/ is served by MyTokenObtainPairView, which takes credentials
+            {'name': 'token_refresh', 'client': 'anonymous', 'method': 'post', 'url': reverse('token_refresh'),
+             'data': {'username': customer.username, 'password': BENCH_PASSWORD}},
+            {'name': 'customers', 'client': 'jwt', 'url': reverse('customers')},
+            {'name': 'customers_search', 'client': 'jwt', 'url': reverse('customers') + '?query=bench_user_1'},
+            {'name': 'customer', 'client': 'jwt', 'url': reverse('customer', args=[customer.username])},
+            {'name': 'customer_spending', 'client': 'jwt',
+             'url': reverse('customer_spending', args=[customer.username])},
+            {'name': 'restaurants', 'client': 'jwt', 'url': reverse('restaurants')},
+            {'name': 'restaurants_search', 'client': 'jwt', 'url': reverse('restaurants') + '?search=Restaurant 1'},
+            {'name': 'restaurant', 'client': 'jwt', 'url': reverse('restaurant', args=[restaurant.id])},
+            {'name': 'top_restaurants', 'client': 'jwt', 'url': reverse('top_restaurants')},
+            {'name': 'reviews', 'client': 'jwt', 'url': reverse('reviews')},
+            {'name': 'review', 'client': 'jwt', 'url': reverse('review', args=[review.id])},
+            {'name': 'reviews_export', 'client': 'jwt', 'url': reverse('reviews_export')},
+            {'name': 'visits', 'client': 'jwt', 'url': reverse('visits')},
+            {'name': 'visit', 'client': 'jwt', 'url': reverse('visit', args=[visit.id])},
+            {'name': 'visits_export', 'client': 'jwt', 'url': reverse('visits_export')},
+            {'name': 'cache_stats', 'client': 'jwt', 'url': reverse('cache_stats')},
+            {'name': 'restaurants_post', 'client': 'jwt', 'method': 'post', 'url': reverse('restaurants'),
+             'data': restaurant_data},
+            {'name': 'reviews_post', 'client': 'jwt', 'method': 'post', 'url': reverse('reviews'),
+             'data': {**review_data, 'restaurant': restaurant.id}},
+            {'name': 'visits_post', 'client': 'jwt', 'method': 'post', 'url': reverse('visits'),
+             'data': {**visit_data, 'restaurant': restaurant.id}},
+            {'name': 'visits_bulk_post', 'client': 'jwt', 'method': 'post', 'url': reverse('visits'),
+             'data': [{'restaurant': restaurant.id, 'date': f'2024-02-{day:02d}', 'spending': '10.00'}
+                      for day in range(1, 21)]},
+            {'name': 'metrics', 'client': 'anonymous', 'url': reverse('metrics')},
+        ]
+
+    def get_clients(self) -> Dict[str, Client]:
+        customer = get_user_model().objects.order_by('pk').first()
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')),
+                    'localhost')
+
+        # failing endpoints are reported with their status code instead of aborting the run
+        session = Client(raise_request_exception=False, SERVER_NAME=host)
+        session.force_login(customer)
+        access = str(RefreshToken.for_user(customer).access_token)
+
+        return {
+            'anonymous': Client(raise_request_exception=False, SERVER_NAME=host),
+            'session': session,
+            'jwt': Client(raise_request_exception=False, SERVER_NAME=host, HTTP_AUTHORIZATION=f'Bearer {access}'),
+        }
+
+    def run_endpoints(self, options: dict) -> Dict[str, dict]:
+        clients = self.get_clients()
+        results = {}
+
+        for endpoint in self.get_endpoints():
+            if options['endpoint'] and endpoint['name'] not in options['endpoint']:
+                continue
+
+            client = clients[endpoint['client']]
+
+            def request(stats: Optional[QueryStats] = None):
+                method = endpoint.get('method', 'get')
+                kwargs = {'content_type': 'application/json'} if method == 'post' and endpoint['client'] == 'jwt' else {}
+                with transaction.atomic(), connection.execute_wrapper(stats or QueryStats()):
+                    response = getattr(client, method)(endpoint['url'], endpoint.get('data'), **kwargs)
+                    if response.streaming:
+                        # streamed rows are queried while the response is consumed
+                        b''.join(response.streaming_content)
+                    transaction.set_rollback(True)
+                return response
+
+            for _ in range(options['warmup']):
+                request()
+
+            durations = []
+            for _ in range(options['iterations']):
+                cache.clear()
+                start = time.perf_counter()
+                request()
+                durations.append((time.perf_counter() - start) * 1000)
+
+            cache.clear()
+            stats = QueryStats()
+            tracemalloc.start()
+            response = request(stats)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[endpoint['name']] = {
+                'method': endpoint.get('method', 'get').upper(),
+                'url': endpoint['url'],
+                'status': response.status_code,
+                'p50_ms': percentile(durations, 50),
+                'p95_ms': percentile(durations, 95),
+                'p99_ms': percentile(durations, 99),
+                'queries': stats.count,
+                'peak_memory_kb': peak / 1024,
+            }
+
+        return results
+
+    def compare(self, baseline: Dict[str, dict], results: Dict[str, dict], threshold: float) -> List[str]:
+        """
+        Return a message per endpoint that became slower than the threshold allows or runs more queries.
+        """
+        regressions = []
+
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+
+            if result['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+                regressions.append(
+                    f"{name}: p95 {result['p95_ms']:.2f}ms, baseline {previous['p95_ms']:.2f}ms "
+                    f"(+{result['p95_ms'] / previous['p95_ms'] - 1:.0%})"
+                )
+            if result['queries'] > previous['queries']:
+                regressions.append(f"{name}: {result['queries']} queries, baseline {previous['queries']}")
+
+        return regressions
@@ -0,0 +1,76 @@
+import time
+from typing import List, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from .bench import percentile
+
+
+class Command(BaseCommand):
+    """
+    Measure the database connection setup cost per request.
+
+    Requests are simulated the way Django handles them: old connections are
+    closed when a request starts and finishes (`close_old_connections`), and a
+    cheap query runs in between. This is done once with CONN_MAX_AGE=0, where
+    every request opens a new connection, and once with the configured
+    CONN_MAX_AGE (see DB_CONN_MAX_AGE), where the connection is reused. The
+    difference of the latencies is the connection setup time removed from every
+    request by persistent connections.
+
+    Example:
+        ```shell
+        $ DB_CONN_MAX_AGE=60 python manage.py bench_connections --requests 500
+        ```
+    """
+    help = 'Compare the per-request latency with and without persistent database connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Number of simulated requests per mode.')
+        parser.add_argument('--database', default='default', help='Database alias to measure.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive.')
+
+        connection = connections[options['database']]
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        if configured == 0:
+            self.stdout.write(self.style.WARNING('CONN_MAX_AGE is 0, comparing with persistent connections (None).'))
+            configured = None
+
+        results = {}
+        for label, max_age in [('CONN_MAX_AGE=0', 0), (f'CONN_MAX_AGE={configured}', configured)]:
+            durations = self.measure(connection, max_age, options['requests'])
+            results[label] = durations
+            self.stdout.write(
+                f'{label:<20} p50={percentile(durations, 50):.3f}ms p95={percentile(durations, 95):.3f}ms '
+                f'mean={sum(durations) / len(durations):.3f}ms'
+            )
+
+        (_, closing), (_, persistent) = results.items()
+        saved = percentile(closing, 50) - percentile(persistent, 50)
+        self.stdout.write(self.style.SUCCESS(f'Persistent connections save {saved:.3f}ms per request (p50).'))
+
+    def measure(self, connection, max_age: Optional[int], requests: int) -> List[float]:
+        original = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        # the maximum age is applied when the connection is opened
+        connection.close()
+
+        durations = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                close_old_connections()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                close_old_connections()
+                durations.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = original
+            connection.close()
+
+        return durations
@@ -0,0 +1,208 @@
+import itertools
+import math
+import multiprocessing
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Tuple
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reviews.models import Restaurant, Review, Visit
+from reviews.stats import rebuild_leaderboard, verify_restaurant_stats
+
+# Data shared with the worker processes, which inherit it when they are forked
+_shared = {}
+
+
+def zipf_cum_weights(size: int, exponent: float) -> List[float]:
+    """
+    Return the cumulative weights of a Zipf-like distribution over `size` ranks.
+
+    The item of rank k (starting at 1) is drawn with a probability proportional to
+    1 / k ** exponent, so a few items are very popular and most are rarely drawn.
+
+    """
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def split_total(total: int, weights: List[float], rng: random.Random) -> List[int]:
+    """
+    Split `total` proportionally to `weights`, rounding randomly so the parts add up to `total` on average.
+    """
+    weight_sum = sum(weights)
+    parts = []
+    for weight in weights:
+        share = total * weight / weight_sum
+        parts.append(math.floor(share) + (rng.random() < share % 1))
+    return parts
+
+
+def generate_chunk(chunk: int, customers: List[Tuple[int, int, int]]) -> Tuple[int, int]:
+    """
+    Create the reviews and visits of a chunk of customers.
+
+    Every chunk uses its own random generator seeded from the command seed and the
+    chunk index, so the data does not depend on the number of worker processes.
+
+    Parameters:
+        chunk (int): The index of the chunk.
+        customers (List[Tuple[int, int, int]]): The customer ID, review count and visit count per customer.
+
+    Returns:
+        Tuple[int, int]: The number of created reviews and visits.
+
+    """
+    rng = random.Random(f"{_shared['seed']}-{chunk}")
+    restaurant_ids, cum_weights = _shared['restaurant_ids'], _shared['restaurant_cum_weights']
+    quality, batch_size = _shared['quality'], _shared['batch_size']
+    pricings = [pricing for pricing, _ in Review.PRICING_CATEGORY_OPTIONS]
+    first_day, days = _shared['first_day'], _shared['days']
+
+    reviews, visits = [], []
+    for customer_id, review_count, visit_count in customers:
+        reviewed = set()
+        for attempt in itertools.count():
+            if len(reviewed) >= review_count:
+                break
+            # heavy reviewers may need rarely drawn restaurants, switch to uniform draws
+            skewed = attempt < 10 * review_count
+            restaurant_id = rng.choices(restaurant_ids, cum_weights=cum_weights if skewed else None)[0]
+            if restaurant_id in reviewed:
+                continue
+            reviewed.add(restaurant_id)
+            rating = min(5, max(1, round(rng.gauss(quality[restaurant_id], 1))))
+            reviews.append(Review(restaurant_id=restaurant_id, customer_id=customer_id, rating=rating,
+                                  pricing=rng.choice(pricings), comment='Generated review'))
+
+        visited = set()
+        for attempt in itertools.count():
+            if len(visited) >= visit_count:
+                break
+            skewed = attempt < 10 * visit_count
+            key = (rng.choices(restaurant_ids, cum_weights=cum_weights if skewed else None)[0], rng.randrange(days))
+            if key in visited:
+                continue
+            visited.add(key)
+            spending = Decimal(round(rng.lognormvariate(3.3, 0.6), 2)).quantize(Decimal('0.01'))
+            visits.append(Visit(restaurant_id=key[0], customer_id=customer_id,
+                                date=first_day + timedelta(days=key[1]), spending=spending))
+
+    Review.objects.bulk_create(reviews, batch_size=batch_size)
+    Visit.objects.bulk_create(visits, batch_size=batch_size)
+    return len(reviews), len(visits)
+
+
+class Command(BaseCommand):
+    """
+    Generate a large synthetic dataset for load testing.
+
+    Customers and restaurants (across all RESTAURANT_TYPE_OPTIONS) are inserted with
+    batched `bulk_create`. Restaurant popularity and customer activity follow
+    Zipf-like distributions: a few restaurants receive most reviews and visits, and
+    a few customers write most of them. Reviews respect the (restaurant, customer)
+    and visits the (restaurant, customer, date) uniqueness.
+
+    Reviews and visits are generated per chunk of customers, optionally in several
+    worker processes. The output only depends on `--seed` and the sizes, not on the
+    number of workers. Signals are bypassed, so the restaurant review aggregates,
+    the leaderboard and the CustomerRestaurantStats table are rebuilt at the end.
+
+    Example:
+        ```shell
+        $ python manage.py generate_data --customers 100000 --restaurants 10000 \\
+              --reviews 500000 --visits 5000000 --workers 8 --seed 42
+        ```
+    """
+    help = 'Generate customers, restaurants, reviews and visits with skewed distributions for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000, help='Number of customers.')
+        parser.add_argument('--restaurants', type=int, default=100, help='Number of restaurants.')
+        parser.add_argument('--reviews', type=int, default=5000,
+                            help='Approximate number of reviews, at most one per customer and restaurant.')
+        parser.add_argument('--visits', type=int, default=20000, help='Approximate number of visits.')
+        parser.add_argument('--start-date', type=date.fromisoformat, default=date(2022, 1, 1),
+                            help='First day of the visits (YYYY-MM-DD).')
+        parser.add_argument('--days', type=int, default=730, help='Number of days the visits are spread over.')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Exponent of the popularity distributions.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generators.')
+        parser.add_argument('--prefix', default='generated_', help='Prefix of the customer usernames.')
+        parser.add_argument('--password', default='password', help='Password of all generated customers.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows inserted per query.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Number of customers per work unit.')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes.')
+
+    def handle(self, *args, **options):
+        customer_count, restaurant_count = options['customers'], options['restaurants']
+        if customer_count < 1 or restaurant_count < 1:
+            raise CommandError('At least one customer and one restaurant are required.')
+        if get_user_model().objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f'Customers prefixed "{options["prefix"]}" already exist, choose another --prefix.')
+
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        password = make_password(options['password'])
+        customer_ids = [customer.pk for customer in get_user_model().objects.bulk_create([
+            get_user_model()(username=f'{options["prefix"]}{i}', email=f'{options["prefix"]}{i}@example.com',
+                             password=password)
+            for i in range(customer_count)
+        ], batch_size=batch_size)]
+
+        # customer activity: a shuffled Zipf rank per customer
+        activity_weights = [1 / rank ** options['zipf'] for rank in range(1, customer_count + 1)]
+        rng.shuffle(activity_weights)
+        activity = list(itertools.accumulate(activity_weights))
+
+        cuisines = [cuisine for cuisine, _ in Restaurant.RESTAURANT_TYPE_OPTIONS]
+        restaurant_ids = [restaurant.pk for restaurant in Restaurant.objects.bulk_create([
+            Restaurant(name=f'Restaurant {i}', cuisine=cuisines[i % len(cuisines)], address=f'{i} Generated Street',
+                       created_by_id=rng.choices(customer_ids, cum_weights=activity)[0])
+            for i in range(restaurant_count)
+        ], batch_size=batch_size)]
+        rng.shuffle(restaurant_ids)
+
+        review_counts = [min(count, restaurant_count)
+                         for count in split_total(options['reviews'], activity_weights, rng)]
+        visit_counts = [min(count, restaurant_count * options['days'])
+                        for count in split_total(options['visits'], activity_weights, rng)]
+
+        _shared.update({
+            'seed': options['seed'],
+            'restaurant_ids': restaurant_ids,
+            'restaurant_cum_weights': zipf_cum_weights(restaurant_count, options['zipf']),
+            'quality': {restaurant_id: rng.uniform(2, 4.8) for restaurant_id in restaurant_ids},
+            'first_day': options['start_date'],
+            'days': options['days'],
+            'batch_size': batch_size,
+        })
+
+        rows = list(zip(customer_ids, review_counts, visit_counts))
+        chunk_size = options['chunk_size']
+        chunks = [(index, rows[start:start + chunk_size]) for index, start in enumerate(range(0, len(rows), chunk_size))]
+
+        if options['workers'] > 1:
+            # forked workers must not share the connection of the parent process
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+                counts = pool.starmap(generate_chunk, chunks)
+        else:
+            counts = [generate_chunk(*chunk) for chunk in chunks]
+
+        reviews, visits = sum(count[0] for count in counts), sum(count[1] for count in counts)
+
+        verify_restaurant_stats(repair=True, batch_size=1000)
+        rebuild_leaderboard()
+        call_command('rebuild_customer_restaurant_stats', batch_size=batch_size, stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {customer_count} customers, {restaurant_count} restaurants, {reviews} reviews and '
+            f'{visits} visits in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,246 @@
+import csv
+import io
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.cache import invalidate
+from reviews.models import Restaurant, Review
+
+
+class Command(BaseCommand):
+    """
+    Import reviews from a CSV or JSONL file.
+
+    Every row needs a `restaurant` (ID), a `customer` (username), a `rating`
+    and a `pricing`, and may have a `comment`. Rows are read as a stream and
+    written in batches; an existing review of the same customer for the same
+    restaurant is updated instead of duplicated. Restaurants and customers are
+    resolved with one query per batch for the keys not seen before.
+
+    Rejected rows are counted and, with `--rejects`, written to a JSONL file
+    together with the reason. The restaurant review aggregates of all touched
+    restaurants are recomputed once the import is done.
+
+    On PostgreSQL, `--copy` loads each batch with COPY into a temporary staging
+    table and merges it with a single INSERT ... ON CONFLICT statement.
+
+    Example:
+        ```shell
+        $ python manage.py import_reviews partner_reviews.jsonl --batch-size 5000 --rejects rejected.jsonl
+        ```
+    """
+    help = 'Import reviews from a CSV or JSONL file, updating existing reviews of the same customer and restaurant.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path of the input file, or '-' for standard input.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format, guessed from the file extension if omitted.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows written per batch.')
+        parser.add_argument('--copy', action='store_true', help='Load batches with COPY into a staging table (PostgreSQL only).')
+        parser.add_argument('--rejects', help='Write rejected rows with the rejection reason to this JSONL file.')
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy is only supported on PostgreSQL.')
+
+        self.use_copy = options['copy']
+        self.restaurant_ids = set()
+        self.customer_ids: Dict[str, int] = {}
+        self.touched_restaurants = set()
+        self.rejects = open(options['rejects'], 'w') if options['rejects'] else None
+
+        imported = rejected = 0
+        started = time.monotonic()
+
+        try:
+            stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='')
+            with stream:
+                for batch in self.read_batches(stream, input_format, options['batch_size']):
+                    written, failed = self.import_batch(batch)
+                    imported += written
+                    rejected += failed
+        finally:
+            if self.rejects:
+                self.rejects.close()
+
+        self.refresh_restaurant_stats()
+
+        elapsed = time.monotonic() - started
+        rate = (imported + rejected) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} reviews, rejected {rejected} rows in {elapsed:.1f}s ({rate:.0f} rows/s).'
+        ))
+
+    def read_batches(self, stream, input_format: str, batch_size: int) -> Iterator[List[Tuple[int, object]]]:
+        """
+        Yield batches of (line number, raw row) read lazily from the input.
+        """
+        if input_format == 'csv':
+            rows = enumerate(csv.DictReader(stream), start=2)
+        else:
+            rows = ((number, line) for number, line in enumerate(stream, start=1) if line.strip())
+
+        batch = []
+        for number, row in rows:
+            batch.append((number, row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def resolve_keys(self, rows: List[dict]) -> None:
+        """
+        Cache the restaurants and customers referenced by a batch that were not seen yet.
+        """
+        restaurant_ids = set()
+        for row in rows:
+            try:
+                restaurant_ids.add(int(row.get('restaurant')))
+            except (TypeError, ValueError):
+                pass
+        missing_restaurants = restaurant_ids - self.restaurant_ids
+        if missing_restaurants:
+            self.restaurant_ids.update(
+                Restaurant.objects.filter(pk__in=missing_restaurants).values_list('pk', flat=True)
+            )
+
+        missing_customers = {str(row.get('customer')) for row in rows} - self.customer_ids.keys()
+        if missing_customers:
+            self.customer_ids.update(
+                get_user_model().objects.filter(username__in=missing_customers).values_list('username', 'pk')
+            )
+
+    def validate(self, row: dict) -> Tuple[Optional[Review], Optional[str]]:
+        """
+        Build an unsaved review from a row, or return the reason it is rejected.
+        """
+        try:
+            restaurant_id = int(row.get('restaurant'))
+        except (TypeError, ValueError):
+            return None, 'invalid restaurant'
+        if restaurant_id not in self.restaurant_ids:
+            return None, 'unknown restaurant'
+
+        customer_id = self.customer_ids.get(str(row.get('customer')))
+        if customer_id is None:
+            return None, 'unknown customer'
+
+        try:
+            rating = int(row.get('rating'))
+        except (TypeError, ValueError):
+            return None, 'invalid rating'
+        if rating not in dict(Review.RATINGS_OPTIONS):
+            return None, 'invalid rating'
+
+        pricing = row.get('pricing')
+        if pricing not in dict(Review.PRICING_CATEGORY_OPTIONS):
+            return None, 'invalid pricing'
+
+        comment = row.get('comment') or None
+        if comment and len(comment) > Review._meta.get_field('comment').max_length:
+            return None, 'comment too long'
+
+        review = Review(
+            restaurant_id=restaurant_id, customer_id=customer_id, rating=rating, pricing=pricing, comment=comment,
+        )
+        return review, None
+
+    def reject(self, number: int, row: object, reason: str) -> None:
+        if self.rejects:
+            self.rejects.write(json.dumps({'line': number, 'reason': reason, 'row': row}, default=str) + '\n')
+
+    def import_batch(self, batch: List[Tuple[int, object]]) -> Tuple[int, int]:
+        """
+        Validate and write one batch.
+
+        Returns:
+            Tuple[int, int]: The number of written and rejected rows.
+
+        """
+        rows, rejected = [], 0
+        for number, raw in batch:
+            if isinstance(raw, str):
+                try:
+                    raw = json.loads(raw)
+                except ValueError:
+                    raw = {'_raw': raw}
+            if not isinstance(raw, dict):
+                raw = {'_raw': raw}
+            rows.append((number, raw))
+
+        self.resolve_keys([row for _, row in rows])
+
+        # later rows win when a batch holds several reviews of the same customer for the same restaurant
+        reviews = {}
+        for number, row in rows:
+            review, reason = self.validate(row)
+            if reason:
+                self.reject(number, row, reason)
+                rejected += 1
+                continue
+            reviews[(review.restaurant_id, review.customer_id)] = review
+
+        if reviews:
+            with transaction.atomic():
+                if self.use_copy:
+                    self.copy_batch(list(reviews.values()))
+                else:
+                    Review.objects.bulk_create(
+                        list(reviews.values()),
+                        update_conflicts=True,
+                        unique_fields=['restaurant', 'customer'],
+                        update_fields=['rating', 'pricing', 'comment', 'updated_at'],
+                    )
+            self.touched_restaurants.update(restaurant_id for restaurant_id, _ in reviews)
+
+        return len(reviews), rejected
+
+    def copy_batch(self, reviews: List[Review]) -> None:
+        """
+        Load a batch with COPY into a staging table and merge it into the review table.
+        """
+        table = Review._meta.db_table
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for review in reviews:
+            writer.writerow([review.restaurant_id, review.customer_id, review.rating, review.pricing, review.comment])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS review_import_staging ('
+                'restaurant_id bigint, customer_id bigint, rating integer, pricing varchar(30), comment text'
+                ') ON COMMIT DELETE ROWS'
+            )
+            cursor.copy_expert(
+                'COPY review_import_staging (restaurant_id, customer_id, rating, pricing, comment) '
+                "FROM STDIN WITH (FORMAT csv, NULL '')",
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (restaurant_id, customer_id, rating, pricing, comment, created, updated_at) '
+                'SELECT restaurant_id, customer_id, rating, pricing, comment, now(), now() FROM review_import_staging '
+                'ON CONFLICT (restaurant_id, customer_id) DO UPDATE SET '
+                'rating = EXCLUDED.rating, pricing = EXCLUDED.pricing, comment = EXCLUDED.comment, '
+                'updated_at = EXCLUDED.updated_at'
+            )
+
+    def refresh_restaurant_stats(self) -> None:
+        """
+        Recompute the review aggregates of every restaurant touched by the import
+        and invalidate their cached responses.
+        """
+        restaurant_ids = sorted(self.touched_restaurants)
+        for start in range(0, len(restaurant_ids), 1000):
+            for restaurant in Restaurant.objects.filter(pk__in=restaurant_ids[start:start + 1000]):
+                restaurant.recalculate_review_stats()
+
+        if restaurant_ids:
+            invalidate('restaurants', *(f'restaurant:{restaurant_id}' for restaurant_id in restaurant_ids))
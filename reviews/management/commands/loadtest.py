@@ -0,0 +1,88 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench import percentile
+
+
+def fetch(url: str, headers: Dict[str, str]) -> Tuple[float, int]:
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=30) as response:
+            response.read()
+            status = response.status
+    except HTTPError as e:
+        status = e.code
+    except URLError:
+        status = 0
+    return (time.perf_counter() - start) * 1000, status
+
+
+class Command(BaseCommand):
+    """
+    Measure the throughput of running deployments under concurrent load.
+
+    Each URL is requested `--requests` times by `--concurrency` client threads and
+    the throughput, latency percentiles and failed requests are reported. Pointed
+    at the same endpoint of the WSGI (`web`) and the ASGI (`web-async`) services of
+    docker-compose.yml, which run the same number of workers, it compares the
+    synchronous views with their async versions.
+
+    Unlike `bench`, which profiles single requests in-process, this command only
+    talks HTTP and can run from any machine.
+
+    Example:
+        ```shell
+        $ python manage.py loadtest http://localhost:8000/api/restaurants/ \\
+              http://localhost:8001/api/async/restaurants/ --concurrency 64 --requests 5000
+        ```
+    """
+    help = 'Request URLs concurrently and report throughput and latency percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs to load test, one after the other.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Number of concurrent clients.')
+        parser.add_argument('--requests', type=int, default=1000, help='Number of requests per URL.')
+        parser.add_argument('--token', help='JWT access token sent as Bearer authorization.')
+        parser.add_argument('--output', help='Path of the JSON result file.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be positive.')
+
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Bearer {options["token"]}'
+
+        results = {}
+        for url in options['urls']:
+            results[url] = result = self.load(url, headers, options['concurrency'], options['requests'])
+            self.stdout.write(
+                f"{url}: {result['requests_per_second']:.1f} req/s, p50={result['p50_ms']:.1f}ms "
+                f"p95={result['p95_ms']:.1f}ms p99={result['p99_ms']:.1f}ms, {result['errors']} errors"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'concurrency': options['concurrency'], 'urls': results}, file, indent=2)
+
+    def load(self, url: str, headers: Dict[str, str], concurrency: int, requests: int) -> dict:
+        with ThreadPoolExecutor(concurrency) as executor:
+            started = time.perf_counter()
+            samples: List[Tuple[float, int]] = list(executor.map(lambda _: fetch(url, headers), range(requests)))
+            elapsed = time.perf_counter() - started
+
+        durations = [duration for duration, _ in samples]
+        return {
+            'requests': requests,
+            'requests_per_second': requests / elapsed,
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'p99_ms': percentile(durations, 99),
+            'errors': sum(1 for _, status in samples if not 200 <= status < 400),
+        }
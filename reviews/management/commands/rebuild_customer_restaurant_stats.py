@@ -0,0 +1,51 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from reviews.models import CustomerRestaurantStats, Visit
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the CustomerRestaurantStats table from the visits.
+
+    The table is emptied and refilled from a single grouped query over the
+    visits inside one transaction, so readers never see a partial table.
+
+    Example:
+        ```shell
+        $ python manage.py rebuild_customer_restaurant_stats --batch-size 5000
+        ```
+    """
+    help = 'Rebuild the per customer and restaurant visit statistics from the visits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows inserted per query.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        rows = (
+            Visit.objects.filter(restaurant__isnull=False)
+            .values('customer_id', 'restaurant_id')
+            .annotate(
+                visit_count=Count('id'),
+                total_spending=Sum('spending'),
+                first_visit=Min('date'),
+                last_visit=Max('date'),
+            )
+            .order_by()
+            .iterator(chunk_size=batch_size)
+        )
+
+        created = 0
+        with transaction.atomic():
+            CustomerRestaurantStats.objects.all().delete()
+
+            while batch := [CustomerRestaurantStats(**row) for row in islice(rows, batch_size)]:
+                CustomerRestaurantStats.objects.bulk_create(batch, batch_size=batch_size)
+                created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} customer restaurant stats rows.'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from reviews.stats import verify_customer_restaurant_stats, verify_restaurant_stats
+
+
+class Command(BaseCommand):
+    """
+    Detect (and optionally repair) drift of the stored statistics.
+
+    The review aggregates stored on the restaurants and the CustomerRestaurantStats
+    table are recomputed from the reviews and visits in ID range chunks and compared
+    with the stored values. Every mismatch is reported; with --repair the mismatching
+    rows are fixed in short transactions that only lock the rows being repaired.
+
+    The same check runs periodically as the `reviews.tasks.verify_stats` Celery task.
+
+    Example:
+        ```shell
+        $ python manage.py verify_stats --repair --chunk-size 5000
+        ```
+    """
+    help = 'Compare the stored restaurant and customer statistics with the reviews and visits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Repair the mismatching statistics.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Size of the ID ranges compared at once.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of rows repaired per transaction.')
+
+    def handle(self, *args, **options):
+        checks = [
+            ('restaurant', verify_restaurant_stats),
+            ('customer restaurant', verify_customer_restaurant_stats),
+        ]
+
+        total = 0
+        for label, verify in checks:
+            mismatches = verify(chunk_size=options['chunk_size'], repair=options['repair'],
+                                batch_size=options['batch_size'])
+            for mismatch in mismatches:
+                self.stdout.write(
+                    f"{label} {mismatch['id']}: stored {mismatch['stored']}, actual {mismatch['actual']}"
+                )
+            total += len(mismatches)
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS('All statistics are consistent.'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {total} mismatching statistics.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Found {total} mismatching statistics, run with --repair to fix them.'))
@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from reviews.partitions import (create_visit_partitions, detach_visit_partitions, get_partition_months,
+                                is_partitioned, partition_visit_table)
+
+
+class Command(BaseCommand):
+    """
+    Maintain the monthly partitions of the visits table (PostgreSQL only).
+
+    By default the partitions from the current month until `--months-ahead`
+    months ahead are created; the `reviews.tasks.create_visit_partitions` Celery
+    task does the same daily. With `--detach-before`, the partitions of older
+    months are detached (and dropped with `--drop`). `--convert` partitions an
+    existing visits table, e.g. after enabling VISIT_PARTITIONING on a database
+    that was already migrated.
+
+    Example:
+        ```shell
+        $ python manage.py visit_partitions --months-ahead 6 --detach-before 2022-01-01
+        ```
+    """
+    help = 'Create upcoming and detach old monthly partitions of the visits table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Partition the visits table if it is not yet.')
+        parser.add_argument('--months-ahead', type=int, default=settings.VISIT_PARTITIONS_AHEAD,
+                            help='Number of future months that get a partition.')
+        parser.add_argument('--detach-before', type=date.fromisoformat,
+                            help='Detach the partitions of the months before this date (YYYY-MM-DD).')
+        parser.add_argument('--drop', action='store_true', help='Drop the detached partitions.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning the visits table requires PostgreSQL.')
+
+        if not is_partitioned():
+            if not options['convert']:
+                raise CommandError('The visits table is not partitioned, run with --convert to partition it.')
+            created = partition_visit_table(months_ahead=options['months_ahead'])
+            self.stdout.write(f'Partitioned the visits table into {len(created)} monthly partitions.')
+        else:
+            created = create_visit_partitions(months_ahead=options['months_ahead'])
+            for name in created:
+                self.stdout.write(f'Created {name}.')
+
+        if options['detach_before']:
+            for name in detach_visit_partitions(options['detach_before'], drop=options['drop']):
+                self.stdout.write(f"{'Dropped' if options['drop'] else 'Detached'} {name}.")
+
+        months = get_partition_months()
+        if months:
+            self.stdout.write(self.style.SUCCESS(
+                f'The visits table has partitions from {months[0]:%Y-%m} to {months[-1]:%Y-%m}.'
+            ))
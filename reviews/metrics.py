@@ -0,0 +1,89 @@
+import ipaddress
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Gunicorn workers are separate processes, each with its own counters. With
+# PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py), every process writes its
+# samples to memory mapped files in that directory and /metrics merges them.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUEST_LATENCY = Histogram(
+    'restaurant_review_request_duration_seconds',
+    'Request latency by URL name and method.',
+    ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    'restaurant_review_response_size_bytes',
+    'Response body size by URL name and method, streaming responses excluded.',
+    ['view', 'method'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'restaurant_review_requests_in_flight',
+    'Requests currently being processed.',
+    multiprocess_mode='livesum',
+)
+DB_QUERIES = Histogram(
+    'restaurant_review_db_queries',
+    'Database queries per request by URL name.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_DURATION = Counter(
+    'restaurant_review_db_duration_seconds',
+    'Total database time by URL name.',
+    ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'restaurant_review_view_cache_requests',
+    'View cache lookups by view and result (hit or miss).',
+    ['view', 'result'],
+)
+WORKER_START_TIME = Gauge(
+    'restaurant_review_worker_start_time_seconds',
+    'Start time of the worker process, labelled with its pid in multiprocess mode.',
+    multiprocess_mode='liveall',
+)
+WORKER_START_TIME.set(time.time())
+
+
+def _is_allowed_ip(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Expose the metrics in the Prometheus text exposition format.
+
+    In multiprocess mode, the samples of all worker processes are aggregated;
+    otherwise the metrics of the current process are returned. The metrics reveal
+    the URL names, query counts and workers of the application, so only clients
+    in METRICS_ALLOWED_IPS and staff users may read them.
+
+    Parameters:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        HttpResponse: The metrics as text.
+
+    """
+    if not (request.user.is_staff or _is_allowed_ip(request.META.get('REMOTE_ADDR', ''))):
+        return HttpResponseForbidden()
+
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,246 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .routers import get_replica_databases, routing_state
+
+logger = logging.getLogger('reviews.queries')
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a view executes more queries than its budget and QUERY_BUDGET_RAISE is set.
+    """
+
+
+class QueryStats:
+    """
+    Database execute wrapper collecting the queries of a request.
+
+    Attributes:
+        count (int): The number of executed statements.
+        duration (float): The total database time in seconds.
+        slowest (float): The duration of the slowest statement in seconds.
+        slowest_sql (str): The SQL of the slowest statement.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest:
+                self.slowest, self.slowest_sql = elapsed, sql
+
+
+class QueryCountMiddleware:
+    """
+    Record the number of queries, the total database time and the slowest
+    statement of every request.
+
+    The numbers are added to the response as a `Server-Timing` header, which the
+    browser developer tools display, and logged to the 'reviews.queries' logger
+    with the values in `extra` for structured log handlers.
+
+    QUERY_BUDGETS maps view names (`request.resolver_match.view_name`, e.g.
+    'restaurants' or 'restaurant_detail') to the largest number of queries the
+    view may execute. Exceeding views are logged as warnings, or raise
+    QueryBudgetExceeded when QUERY_BUDGET_RAISE is set, e.g. in tests.
+
+    Queries of streaming responses executed after the view returns are not counted.
+    The collected QueryStats are kept on `request.query_stats` for MetricsMiddleware.
+    The middleware supports both sync and async requests. The queries of an async
+    request run in the single thread its thread-sensitive `sync_to_async` calls
+    share, so the counters are installed on the connections of that thread.
+
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def wrap_connections(stats: QueryStats) -> ExitStack:
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = request.query_stats = QueryStats()
+        with self.wrap_connections(stats):
+            response = self.get_response(request)
+        return self.process_response(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+        stack = await sync_to_async(self.wrap_connections)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.process_response(request, response, stats)
+
+    def process_response(self, request, response, stats: QueryStats):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f'db-slowest;dur={stats.slowest * 1000:.1f}',
+        ])
+
+        extra = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.duration * 1000, 1),
+            'slowest_ms': round(stats.slowest * 1000, 1),
+            'slowest_sql': stats.slowest_sql,
+        }
+        logger.info(
+            '%(method)s %(path)s view=%(view)s status=%(status)s queries=%(queries)d db_ms=%(db_ms).1f '
+            'slowest_ms=%(slowest_ms).1f', extra, extra=extra,
+        )
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and stats.count > budget:
+            message = f'{view_name} executed {stats.count} queries, its budget is {budget}.'
+            if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=extra)
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record the Prometheus request metrics of `reviews.metrics`.
+
+    Requests are labelled with their URL name (`request.resolver_match.view_name`),
+    so the number of label values stays bounded. Placed before QueryCountMiddleware,
+    it also records the database queries of each request. The middleware supports
+    both sync and async requests.
+
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        return self.process_response(request, response, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+        return self.process_response(request, response, start)
+
+    def process_response(self, request, response, start: float):
+        view_name = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        metrics.REQUEST_LATENCY.labels(view_name, request.method).observe(time.perf_counter() - start)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.labels(view_name, request.method).observe(len(response.content))
+
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            metrics.DB_QUERIES.labels(view_name).observe(stats.count)
+            metrics.DB_DURATION.labels(view_name).inc(stats.duration)
+
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide whether the reads of a request may use the read replicas, see reviews.routers.
+
+    Reads of GET and HEAD requests go to the replicas, unless the client wrote less
+    than REPLICA_STICKY_SECONDS ago. A request writing to the database (any unsafe
+    request, or a safe one that writes, e.g. a login session) sets the
+    `primary_until` cookie, which keeps the following reads of the client on the
+    primary until the replicas caught up. This way a redirect after a write, e.g.
+    from `create_review` to `restaurant_detail`, shows the new data. The routing also
+    applies to the content of streaming responses. The middleware supports both
+    sync and async requests and does nothing without REPLICA_DATABASES.
+
+    """
+    sync_capable = True
+    async_capable = True
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with routing_state(self.reads_from_replica(request)) as state:
+            response = self.get_response(request)
+        return self.process_response(request, response, state)
+
+    async def __acall__(self, request):
+        with routing_state(self.reads_from_replica(request)) as state:
+            response = await self.get_response(request)
+        return self.process_response(request, response, state)
+
+    def reads_from_replica(self, request) -> bool:
+        if not get_replica_databases() or request.method not in ('GET', 'HEAD'):
+            return False
+        try:
+            return float(request.COOKIES.get(self.cookie_name, 0)) <= time.time()
+        except ValueError:
+            return True
+
+    def process_response(self, request, response, state: dict):
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, state)
+
+        sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 0)
+        if get_replica_databases() and sticky_seconds and (state['wrote'] or request.method not in ('GET', 'HEAD')):
+            response.set_cookie(self.cookie_name, f'{time.time() + sticky_seconds:.3f}', max_age=sticky_seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    @staticmethod
+    def stream(content, state: dict):
+        with routing_state(state['replica']):
+            yield from content
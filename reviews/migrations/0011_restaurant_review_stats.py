@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:09
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_review_stats(apps, schema_editor):
+    Restaurant = apps.get_model('reviews', 'Restaurant')
+
+    restaurants = Restaurant.objects.annotate(
+        stats_count=Count('review'),
+        stats_sum=Sum('review__rating'),
+    ).filter(stats_count__gt=0)
+
+    for restaurant in restaurants.iterator():
+        Restaurant.objects.filter(pk=restaurant.pk).update(
+            review_count=restaurant.stats_count,
+            rating_sum=restaurant.stats_sum or 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_alter_visit_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:10
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+PRICING_COUNT_FIELDS = {
+    'cheap': 'pricing_cheap_count',
+    'moderate': 'pricing_moderate_count',
+    'high': 'pricing_high_count',
+    'overpriced': 'pricing_overpriced_count',
+}
+
+
+def backfill_pricing_counts(apps, schema_editor):
+    Restaurant = apps.get_model('reviews', 'Restaurant')
+
+    restaurants = Restaurant.objects.annotate(
+        **{
+            f'stats_{field}': Count('review', filter=Q(review__pricing=pricing))
+            for pricing, field in PRICING_COUNT_FIELDS.items()
+        }
+    ).filter(review_count__gt=0)
+
+    for restaurant in restaurants.iterator():
+        Restaurant.objects.filter(pk=restaurant.pk).update(
+            **{field: getattr(restaurant, f'stats_{field}') for field in PRICING_COUNT_FIELDS.values()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_restaurant_review_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='pricing_cheap_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='pricing_high_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='pricing_moderate_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='pricing_overpriced_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_pricing_counts, migrations.RunPython.noop),
+    ]
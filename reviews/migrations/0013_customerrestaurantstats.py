@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:14
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+
+def backfill_customer_restaurant_stats(apps, schema_editor):
+    Visit = apps.get_model('reviews', 'Visit')
+    CustomerRestaurantStats = apps.get_model('reviews', 'CustomerRestaurantStats')
+
+    rows = (
+        Visit.objects.filter(restaurant__isnull=False)
+        .values('customer_id', 'restaurant_id')
+        .annotate(
+            visit_count=Count('id'),
+            total_spending=Sum('spending'),
+            first_visit=Min('date'),
+            last_visit=Max('date'),
+        )
+        .order_by()
+    )
+    CustomerRestaurantStats.objects.bulk_create(
+        (CustomerRestaurantStats(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_restaurant_pricing_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerRestaurantStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('total_spending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('first_visit', models.DateField()),
+                ('last_visit', models.DateField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reviews.restaurant')),
+            ],
+            options={
+                'verbose_name_plural': 'customer restaurant stats',
+                'unique_together': {('customer', 'restaurant')},
+            },
+        ),
+        migrations.RunPython(backfill_customer_restaurant_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_customerrestaurantstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created', 'id'], name='review_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['date', 'id'], name='visit_date_id_idx'),
+        ),
+    ]
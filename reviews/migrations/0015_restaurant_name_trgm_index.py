@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS restaurant_name_trgm_idx '
+        'ON reviews_restaurant USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS restaurant_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Enable pg_trgm and index restaurant names for similarity search.
+
+    Only applies on PostgreSQL; other databases keep using substring matching.
+    """
+
+    dependencies = [
+        ('reviews', '0014_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:26
+
+from django.db import migrations, models
+import reviews.models
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in ('username', 'email'):
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS customer_{column}_trgm_idx '
+            f'ON reviews_customer USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for column in ('username', 'email'):
+        schema_editor.execute(f'DROP INDEX IF EXISTS customer_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_restaurant_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customer',
+            managers=[
+                ('objects', reviews.models.CustomerManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['email'], name='customer_email_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:09
+
+from django.db import migrations, models
+
+
+def create_username_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    # `username__icontains` compares UPPER(username), which the plain trigram index does not cover
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS customer_username_upper_trgm_idx '
+        'ON reviews_customer USING gin (UPPER(username::text) gin_trgm_ops)'
+    )
+
+
+def drop_username_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS customer_username_upper_trgm_idx')
+
+
+class Migration(migrations.Migration):
+    """
+    Index the hot query shapes: the visits and reviews of a customer, the review
+    aggregates of a restaurant and the reviews filtered by customer username.
+    """
+
+    dependencies = [
+        ('reviews', '0017_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['restaurant'], include=('id', 'rating', 'pricing'), name='review_restaurant_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['customer', 'created', 'id'], name='review_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['customer', 'date'], name='visit_customer_date_idx'),
+        ),
+        migrations.RunPython(create_username_search_index, drop_username_search_index),
+    ]
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import migrations
+
+from reviews.partitions import is_partitioned, partition_visit_table, unpartition_visit_table
+
+
+def partition_visits(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or not settings.VISIT_PARTITIONING or is_partitioned(connection):
+        return
+
+    partition_visit_table(months_ahead=settings.VISIT_PARTITIONS_AHEAD, connection=connection)
+
+
+def unpartition_visits(apps, schema_editor):
+    connection = schema_editor.connection
+    if is_partitioned(connection):
+        unpartition_visit_table(connection=connection)
+
+
+class Migration(migrations.Migration):
+    """
+    Partition the visits table by month of the visit date when VISIT_PARTITIONING is set.
+
+    Only applies on PostgreSQL; the Visit model itself is unchanged.
+    """
+
+    dependencies = [
+        ('reviews', '0018_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_visits, unpartition_visits),
+    ]
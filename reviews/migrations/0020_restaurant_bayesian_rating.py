@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.expressions import ExpressionWrapper
+
+
+def backfill_bayesian_rating(apps, schema_editor):
+    Restaurant = apps.get_model('reviews', 'Restaurant')
+    db = schema_editor.connection.alias
+
+    totals = Restaurant.objects.using(db).aggregate(rating_sum=Sum('rating_sum'), review_count=Sum('review_count'))
+    if not totals['review_count']:
+        return
+
+    weight = float(settings.LEADERBOARD_PRIOR_WEIGHT)
+    mean = totals['rating_sum'] / totals['review_count']
+    Restaurant.objects.using(db).update(bayesian_rating=ExpressionWrapper(
+        (Value(weight * mean) + F('rating_sum')) / (Value(weight) + F('review_count')),
+        output_field=FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0019_partition_visits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='bayesian_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['-bayesian_rating', 'id'], name='restaurant_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('review_count__gt', 0)), fields=['cuisine', '-bayesian_rating', 'id'], name='restaurant_cuisine_ranking_idx'),
+        ),
+        migrations.RunPython(backfill_bayesian_rating, migrations.RunPython.noop),
+    ]
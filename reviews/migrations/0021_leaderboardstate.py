@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.expressions import ExpressionWrapper
+
+
+def store_mean_rating(apps, schema_editor):
+    LeaderboardState = apps.get_model('reviews', 'LeaderboardState')
+    Restaurant = apps.get_model('reviews', 'Restaurant')
+    db = schema_editor.connection.alias
+
+    # rank every restaurant against the stored mean
+    totals = Restaurant.objects.using(db).aggregate(rating_sum=Sum('rating_sum'), review_count=Sum('review_count'))
+    mean = totals['rating_sum'] / totals['review_count'] if totals['review_count'] else 3.0
+    LeaderboardState.objects.using(db).create(pk=1, mean_rating=mean)
+
+    weight = float(settings.LEADERBOARD_PRIOR_WEIGHT)
+    Restaurant.objects.using(db).update(bayesian_rating=ExpressionWrapper(
+        (Value(weight * mean) + F('rating_sum')) / (Value(weight) + F('review_count')),
+        output_field=FloatField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0020_restaurant_bayesian_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mean_rating', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(store_mean_rating, migrations.RunPython.noop),
+    ]
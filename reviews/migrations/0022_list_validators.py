@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+def create_table_versions(apps, schema_editor):
+    TableVersion = apps.get_model('reviews', 'TableVersion')
+    db = schema_editor.connection.alias
+
+    TableVersion.objects.using(db).bulk_create([
+        TableVersion(table=table) for table in ('reviews_restaurant', 'reviews_review', 'reviews_visit')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0021_leaderboardstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('deletions', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['updated_at'], name='restaurant_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['updated_at'], name='review_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['updated_at'], name='visit_updated_at_idx'),
+        ),
+        migrations.RunPython(create_table_versions, migrations.RunPython.noop),
+    ]
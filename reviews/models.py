@@ -1,13 +1,69 @@
 from collections import Counter
-from typing import List, Tuple
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Avg
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections, models
+from django.db.models import Avg, Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Length, Now
 
 
 # user
+class CustomerQuerySet(models.QuerySet):
+    """
+    QuerySet for the Customer model.
+
+    Methods:
+        search(query: str, limit: int) -> QuerySet:
+            Return the customers whose username or email best matches a search query.
+
+    """
+    def search(self, query: str, limit: int = 20) -> models.QuerySet:
+        """
+        Return the customers whose username or email best matches a search query.
+
+        An exact username or email match is answered from the unique username
+        index or the email index alone. Otherwise, on PostgreSQL, usernames and
+        emails are matched with the pg_trgm word similarity operator served by the
+        `customer_username_trgm_idx` and `customer_email_trgm_idx` GIN indexes and
+        ranked by similarity. Other databases fall back to a prefix match, which
+        scans the table (e.g. SQLite's case-insensitive LIKE skips the indexes), so
+        it only suits small development databases.
+
+        Parameters:
+            query (str): The search query.
+            limit (int): The maximum number of customers returned.
+
+        Returns:
+            QuerySet: The best matching customers.
+
+        """
+        customers = self
+
+        exact = customers.filter(Q(username=query) | Q(email=query)).order_by('id')[:limit]
+        if exact:
+            return exact
+
+        if connections[customers.db].vendor == 'postgresql':
+            return customers.filter(
+                Q(username__trigram_word_similar=query) | Q(email__trigram_word_similar=query)
+            ).annotate(
+                similarity=Greatest(TrigramWordSimilarity(query, 'username'), TrigramWordSimilarity(query, 'email')),
+            ).order_by('-similarity', 'id')[:limit]
+
+        return customers.filter(
+            Q(username__startswith=query) | Q(email__startswith=query)
+        ).order_by('username')[:limit]
+
+
+class CustomerManager(UserManager.from_queryset(CustomerQuerySet)):
+    """
+    Manager for the Customer model, combining UserManager with CustomerQuerySet.
+    """
+
+
 class Customer(AbstractUser):
     """
     Custom user model representing a customer.
@@ -22,7 +78,17 @@ class Customer(AbstractUser):
     Attributes:
         Inherits attributes from the Django AbstractUser model.
 
+    Meta:
+        indexes (list): Backs exact lookups by email.
+
     """
+    objects = CustomerManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['email'], name='customer_email_idx'),
+        ]
+
     def get_all_visits(self) -> models.QuerySet:
         """
         Get all visits associated with the customer, ordered by date.
@@ -43,6 +109,75 @@ class Customer(AbstractUser):
 
 
 # restaurant
+class RestaurantQuerySet(models.QuerySet):
+    """
+    QuerySet for the Restaurant model.
+
+    Methods:
+        with_stats() -> QuerySet:
+            Annotate review statistics computed from the review table.
+
+        search(query: str, limit: int) -> QuerySet:
+            Return the restaurants whose name best matches a search query.
+
+    """
+    def with_stats(self) -> models.QuerySet:
+        """
+        Annotate review statistics computed from the review table.
+
+        All statistics are computed with conditional aggregation in the same grouped
+        query that fetches the restaurants. The annotations are named after the stored
+        aggregate fields with a `stats_` prefix (`stats_review_count`, `stats_rating_sum`,
+        `stats_pricing_cheap_count`, ...) plus `stats_average_rating`, and take
+        precedence over the stored fields in `average_rating` and
+        `get_restaurant_pricing_category_eval`.
+
+        Returns:
+            QuerySet: The restaurants annotated with their review statistics.
+
+        Example:
+            ```python
+            restaurants = Restaurant.objects.with_stats().filter(cuisine='asian_cuisine')
+            ```
+        """
+        pricing_annotations = {
+            f'stats_{field}': Count('review', filter=Q(review__pricing=pricing))
+            for pricing, field in Restaurant.PRICING_COUNT_FIELDS.items()
+        }
+        return self.annotate(
+            stats_review_count=Count('review'),
+            stats_rating_sum=Coalesce(Sum('review__rating'), 0),
+            stats_average_rating=Coalesce(Avg('review__rating'), 0.0),
+            **pricing_annotations,
+        )
+
+    def search(self, query: str, limit: int = 20) -> models.QuerySet:
+        """
+        Return the restaurants whose name best matches a search query.
+
+        On PostgreSQL, names are matched with the pg_trgm word similarity operator,
+        which is served by the `restaurant_name_trgm_idx` GIN index and tolerates
+        typos, and ranked by similarity. Other databases fall back to a
+        case-insensitive substring match ranked by name length.
+
+        Parameters:
+            query (str): The search query.
+            limit (int): The maximum number of restaurants returned.
+
+        Returns:
+            QuerySet: The best matching restaurants, annotated with `similarity`.
+
+        """
+        if connections[self.db].vendor == 'postgresql':
+            return self.filter(name__trigram_word_similar=query).annotate(
+                similarity=TrigramWordSimilarity(query, 'name'),
+            ).order_by('-similarity', 'id')[:limit]
+
+        return self.filter(name__icontains=query).annotate(
+            similarity=Value(len(query), output_field=models.FloatField()) / Length('name'),
+        ).order_by('-similarity', 'id')[:limit]
+
+
 class Restaurant(models.Model):
     """
     Model representing a restaurant.
@@ -56,13 +191,36 @@ class Restaurant(models.Model):
         cuisine (str): The cuisine type of the restaurant.
         address (str): The address of the restaurant.
         created_by (User): The user who created the restaurant.
+        review_count (int): The number of reviews of the restaurant, maintained on review writes.
+        rating_sum (int): The sum of all review ratings, maintained on review writes.
+        pricing_cheap_count (int): The number of reviews with 'cheap' pricing.
+        pricing_moderate_count (int): The number of reviews with 'moderate' pricing.
+        pricing_high_count (int): The number of reviews with 'high' pricing.
+        pricing_overpriced_count (int): The number of reviews with 'overpriced' pricing.
+        bayesian_rating (float): The Bayesian average rating ranking the restaurant, maintained on review writes.
+        updated_at (DateTimeField): The time of the last change, including changes of the review aggregates.
 
     Methods:
+        from_db(db, field_names, values) -> Restaurant:
+            Remembers the values loaded from the database.
+
         __str__() -> str:
             Returns the string representation of the restaurant.
 
+        review_stat(field: str) -> int:
+            Returns a review aggregate, preferring the `with_stats()` annotation.
+
         average_rating() -> float:
-            Calculates and returns the average rating of the restaurant.
+            Returns the average rating of the restaurant from the stored aggregates.
+
+        recalculate_review_stats() -> None:
+            Recomputes the stored review aggregates from the review table.
+
+        pricing_counts() -> Counter:
+            Returns the number of reviews per pricing category.
+
+        evaluate_pricing_counts(pricing_counts: Counter) -> str or None:
+            Evaluates the pricing category from per-category review counts.
 
         get_restaurant_pricing_category_eval() -> str or None:
             Evaluates and returns the pricing category of the restaurant.
@@ -76,10 +234,51 @@ class Restaurant(models.Model):
         ('oceanic_cuisine', 'Oceanic cuisine'),
     ]
 
+    PRICING_COUNT_FIELDS: Dict[str, str] = {
+        'cheap': 'pricing_cheap_count',
+        'moderate': 'pricing_moderate_count',
+        'high': 'pricing_high_count',
+        'overpriced': 'pricing_overpriced_count',
+    }
+
     name = models.CharField(max_length=100)
     cuisine = models.CharField(max_length=50, choices=RESTAURANT_TYPE_OPTIONS, default='european_cuisine')
     address = models.TextField(max_length=200)
     created_by = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    pricing_cheap_count = models.PositiveIntegerField(default=0, editable=False)
+    pricing_moderate_count = models.PositiveIntegerField(default=0, editable=False)
+    pricing_high_count = models.PositiveIntegerField(default=0, editable=False)
+    pricing_overpriced_count = models.PositiveIntegerField(default=0, editable=False)
+    bayesian_rating = models.FloatField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RestaurantQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # the leaderboard, overall and per cuisine, see reviews.leaderboard
+            models.Index(fields=['-bayesian_rating', 'id'], condition=Q(review_count__gt=0),
+                         name='restaurant_ranking_idx'),
+            models.Index(fields=['cuisine', '-bayesian_rating', 'id'], condition=Q(review_count__gt=0),
+                         name='restaurant_cuisine_ranking_idx'),
+            # the conditional GET validator of the restaurant list, see reviews.api.conditional
+            models.Index(fields=['updated_at'], name='restaurant_updated_at_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the values loaded from the database.
+
+        The cache signal handlers compare the name against them, as only a renamed
+        restaurant changes the cached responses of its visitors.
+
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self) -> str:
         """
@@ -91,32 +290,91 @@ class Restaurant(models.Model):
         """
         return self.name
 
+    def review_stat(self, field: str) -> int:
+        """
+        Returns a review aggregate, preferring the `with_stats()` annotation.
+
+        Parameters:
+            field (str): The name of the stored aggregate field, e.g. 'review_count'.
+
+        Returns:
+            int: The annotated value if the restaurant was loaded through
+                 `with_stats()`, the stored value otherwise.
+
+        """
+        return getattr(self, f'stats_{field}', getattr(self, field))
+
     @property
     def average_rating(self) -> float:
         """
-        Calculates and returns the average rating of the restaurant.
+        Returns the average rating of the restaurant.
+
+        The value is taken from the `with_stats()` annotation when present and
+        otherwise derived from the stored `review_count` and `rating_sum`
+        columns, so reading it does not hit the database.
 
         Returns:
             float: The average rating of the restaurant.
 
         """
-        try:
-            reviews = Review.objects.filter(restaurant=self)
-            return reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        except Review.DoesNotExist:
-            return 0
-        except Review.MultipleObjectsReturned:
+        if hasattr(self, 'stats_average_rating'):
+            return self.stats_average_rating
+
+        review_count = self.review_stat('review_count')
+        if not review_count:
             return 0
+        return self.review_stat('rating_sum') / review_count
 
-    def get_restaurant_pricing_category_eval(self) -> str or None:
+    def recalculate_review_stats(self) -> None:
         """
-        Evaluates and returns the pricing category of the restaurant.
+        Recomputes the stored review aggregates from the review table.
+
+        Used when the previous state of a changed review is unknown and the
+        aggregates cannot be adjusted incrementally.
+
+        """
+        pricing_aggregates = {
+            field: Count('id', filter=Q(pricing=pricing)) for pricing, field in self.PRICING_COUNT_FIELDS.items()
+        }
+        stats = Review.objects.filter(restaurant=self).aggregate(
+            review_count=Count('id'),
+            rating_sum=Coalesce(Sum('rating'), 0),
+            **pricing_aggregates,
+        )
+        # imported here, the leaderboard module depends on the models
+        from .leaderboard import compute_bayesian_rating
+        stats['bayesian_rating'] = compute_bayesian_rating(stats['review_count'], stats['rating_sum'])
+
+        for field, value in stats.items():
+            setattr(self, field, value)
+        Restaurant.objects.filter(pk=self.pk).update(**stats, updated_at=Now())
+
+    @property
+    def pricing_counts(self) -> Counter:
+        """
+        Returns the number of reviews per pricing category.
 
         Returns:
-            str or None: The pricing category of the restaurant or None if no pricing is available.
+            Counter: Review counts keyed by pricing category, without empty categories.
 
         """
-        pricing_counts = Counter(review.pricing for review in self.review_set.all())
+        return +Counter({
+            pricing: self.review_stat(field) for pricing, field in self.PRICING_COUNT_FIELDS.items()
+        })
+
+    @staticmethod
+    def evaluate_pricing_counts(pricing_counts: Counter) -> str or None:
+        """
+        Evaluates the pricing category from per-category review counts.
+
+        Parameters:
+            pricing_counts (Counter): Review counts keyed by pricing category.
+
+        Returns:
+            str or None: The pricing category or None if no pricing is available.
+
+        """
+        pricing_counts = +pricing_counts
 
         # Check if pricing_counts is not empty
         if pricing_counts:
@@ -152,6 +410,19 @@ class Restaurant(models.Model):
         # Return a default value if pricing_counts is empty
         return None
 
+    def get_restaurant_pricing_category_eval(self) -> str or None:
+        """
+        Evaluates and returns the pricing category of the restaurant.
+
+        The evaluation runs over the stored per-category review counts, so it does
+        not load the reviews of the restaurant.
+
+        Returns:
+            str or None: The pricing category of the restaurant or None if no pricing is available.
+
+        """
+        return self.evaluate_pricing_counts(self.pricing_counts)
+
 
 # review
 class Review(models.Model):
@@ -169,11 +440,16 @@ class Review(models.Model):
         rating (int): The rating given by the customer (1 to 5).
         pricing (str): The pricing category chosen by the customer.
         comment (str, optional): An optional comment provided by the customer.
+        updated_at (DateTimeField): The time of the last change.
 
     Meta:
         unique_together (list): Ensures uniqueness of reviews for a specific restaurant and customer.
+        indexes (list): Backs the keyset pagination of reviews by (created, id) and the list validator.
 
     Methods:
+        from_db(db, field_names, values) -> Review:
+            Builds an instance from a database row and remembers the loaded values.
+
         __str__() -> str:
             Returns the string representation of the review.
 
@@ -199,9 +475,33 @@ class Review(models.Model):
     rating = models.IntegerField(choices=RATINGS_OPTIONS, default=3)
     pricing = models.CharField(max_length=30, choices=PRICING_CATEGORY_OPTIONS, default='moderate')
     comment = models.TextField(max_length=500, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['restaurant', 'customer']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='review_created_id_idx'),
+            # the rating aggregates of a restaurant are answered from the index alone (PostgreSQL)
+            models.Index(fields=['restaurant'], include=['id', 'rating', 'pricing'],
+                         name='review_restaurant_cover_idx'),
+            # the reviews of a customer, newest first
+            models.Index(fields=['customer', 'created', 'id'], name='review_customer_created_idx'),
+            # the conditional GET validator of the review list
+            models.Index(fields=['updated_at'], name='review_updated_at_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the values loaded from the database.
+
+        The review signal handlers compare against them to adjust the restaurant
+        aggregates by the difference instead of recomputing them.
+
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self) -> str:
         """
@@ -227,11 +527,16 @@ class Visit(models.Model):
         customer (User): The user who made the visit.
         date (DateField): The date of the visit.
         spending (DecimalField): The amount spent during the visit.
+        updated_at (DateTimeField): The time of the last change.
 
     Meta:
         unique_together (list): Ensures uniqueness of visits for a specific restaurant, customer, and date.
+        indexes (list): Backs the keyset pagination of visits by (date, id) and the list validator.
 
     Methods:
+        from_db(db, field_names, values) -> Visit:
+            Builds an instance from a database row and remembers the loaded values.
+
         __str__() -> str:
             Returns the string representation of the visit.
 
@@ -240,9 +545,30 @@ class Visit(models.Model):
     customer = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     date = models.DateField()
     spending = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['restaurant', 'customer', 'date']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='visit_date_id_idx'),
+            # the visits of a customer ordered by date, in both directions
+            models.Index(fields=['customer', 'date'], name='visit_customer_date_idx'),
+            # the conditional GET validator of the visit list
+            models.Index(fields=['updated_at'], name='visit_updated_at_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the values loaded from the database.
+
+        The visit signal handlers compare against them to keep the customer
+        restaurant statistics in sync.
+
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self) -> str:
         """
@@ -253,3 +579,230 @@ class Visit(models.Model):
 
         """
         return f"{self.customer.username} - {self.restaurant} - {self.date} - {self.spending}"
+
+
+# stats
+class CustomerRestaurantStats(models.Model):
+    """
+    Model storing the visit statistics of a customer at a restaurant.
+
+    The rows are maintained by the visit signal handlers, so reading the visit
+    count or total spending of a customer at a restaurant is a single lookup on
+    the (customer, restaurant) unique index instead of a scan over the visits.
+
+    Attributes:
+        customer (User): The customer.
+        restaurant (Restaurant): The restaurant.
+        visit_count (int): The number of visits of the customer to the restaurant.
+        total_spending (DecimalField): The total spending of the customer at the restaurant.
+        first_visit (DateField): The date of the first visit.
+        last_visit (DateField): The date of the last visit.
+
+    Meta:
+        unique_together (list): Ensures one row per customer and restaurant.
+
+    Methods:
+        add_visit(customer_id: int, restaurant_id: int, date, spending) -> None:
+            Adds a single visit to the statistics of the pair.
+
+        add_visits(visits: Iterable[Visit]) -> None:
+            Adds a batch of visits, e.g. created with `bulk_create`, to the statistics.
+
+        rebuild_for(customer_id: int, restaurant_id: int) -> None:
+            Recomputes the statistics of the pair from its visits.
+
+    """
+    customer = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    visit_count = models.PositiveIntegerField(default=0)
+    total_spending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    first_visit = models.DateField()
+    last_visit = models.DateField()
+
+    class Meta:
+        unique_together = ['customer', 'restaurant']
+        verbose_name_plural = 'customer restaurant stats'
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of the statistics.
+
+        Returns:
+            str: The string representation of the statistics.
+
+        """
+        return f"{self.customer_id} - {self.restaurant_id} - {self.visit_count} - {self.total_spending}"
+
+    @classmethod
+    def add_visit(cls, customer_id: int, restaurant_id: int, date, spending) -> None:
+        """
+        Adds a single visit to the statistics of the pair.
+
+        Parameters:
+            customer_id (int): The ID of the customer.
+            restaurant_id (int): The ID of the restaurant.
+            date (date): The date of the visit.
+            spending (Decimal): The amount spent during the visit.
+
+        """
+        stats, created = cls.objects.get_or_create(
+            customer_id=customer_id,
+            restaurant_id=restaurant_id,
+            defaults={'visit_count': 1, 'total_spending': spending, 'first_visit': date, 'last_visit': date},
+        )
+        if not created:
+            cls.objects.filter(pk=stats.pk).update(
+                visit_count=F('visit_count') + 1,
+                total_spending=F('total_spending') + spending,
+                first_visit=Least('first_visit', Value(date)),
+                last_visit=Greatest('last_visit', Value(date)),
+            )
+
+    @classmethod
+    def add_visits(cls, visits: Iterable['Visit']) -> None:
+        """
+        Adds a batch of visits, e.g. created with `bulk_create`, to the statistics.
+
+        The visits are grouped per (customer, restaurant) first, so each affected
+        pair costs one UPDATE, and all missing pairs are inserted with a single
+        `bulk_create`.
+
+        Parameters:
+            visits (Iterable[Visit]): The new visits.
+
+        """
+        groups = {}
+        for visit in visits:
+            if visit.restaurant_id is None:
+                continue
+
+            group = groups.setdefault((visit.customer_id, visit.restaurant_id), {
+                'visit_count': 0,
+                'total_spending': Decimal(0),
+                'first_visit': visit.date,
+                'last_visit': visit.date,
+            })
+            group['visit_count'] += 1
+            group['total_spending'] += Decimal(visit.spending)
+            group['first_visit'] = min(group['first_visit'], visit.date)
+            group['last_visit'] = max(group['last_visit'], visit.date)
+
+        if not groups:
+            return
+
+        existing = set(cls.objects.filter(
+            customer_id__in={customer_id for customer_id, _ in groups},
+            restaurant_id__in={restaurant_id for _, restaurant_id in groups},
+        ).values_list('customer_id', 'restaurant_id'))
+
+        cls.objects.bulk_create([
+            cls(customer_id=customer_id, restaurant_id=restaurant_id, **group)
+            for (customer_id, restaurant_id), group in groups.items()
+            if (customer_id, restaurant_id) not in existing
+        ])
+
+        for (customer_id, restaurant_id), group in groups.items():
+            if (customer_id, restaurant_id) in existing:
+                cls.objects.filter(customer_id=customer_id, restaurant_id=restaurant_id).update(
+                    visit_count=F('visit_count') + group['visit_count'],
+                    total_spending=F('total_spending') + group['total_spending'],
+                    first_visit=Least('first_visit', Value(group['first_visit'])),
+                    last_visit=Greatest('last_visit', Value(group['last_visit'])),
+                )
+
+    @classmethod
+    def rebuild_for(cls, customer_id: int, restaurant_id: int) -> None:
+        """
+        Recomputes the statistics of the pair from its visits.
+
+        The row is removed when the customer has no visits left at the restaurant.
+
+        Parameters:
+            customer_id (int): The ID of the customer.
+            restaurant_id (int): The ID of the restaurant.
+
+        """
+        stats = Visit.objects.filter(customer_id=customer_id, restaurant_id=restaurant_id).aggregate(
+            visit_count=Count('id'),
+            total_spending=Sum('spending'),
+            first_visit=Min('date'),
+            last_visit=Max('date'),
+        )
+
+        if not stats['visit_count']:
+            cls.objects.filter(customer_id=customer_id, restaurant_id=restaurant_id).delete()
+            return
+
+        cls.objects.update_or_create(customer_id=customer_id, restaurant_id=restaurant_id, defaults=stats)
+
+
+# leaderboard
+class LeaderboardState(models.Model):
+    """
+    Model storing the mean rating the restaurant leaderboard ranks against, in a single row.
+
+    The review writes read the mean in the same UPDATE that adjusts the Bayesian
+    rating of the restaurant, so every web and worker process ranks with the same
+    mean. Only `reviews.stats.rebuild_leaderboard` recomputes it.
+
+    Attributes:
+        mean_rating (float): The mean rating of all reviews at the last rebuild.
+        updated_at (DateTimeField): The time of the last rebuild.
+
+    """
+    mean_rating = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of the state.
+
+        Returns:
+            str: The string representation of the state.
+
+        """
+        return f"{self.mean_rating} - {self.updated_at}"
+
+
+# versions
+class TableVersion(models.Model):
+    """
+    Model counting the deleted rows of a table, for the conditional GET validators of the API lists.
+
+    Inserts and updates raise the maximum `updated_at` of a list, deletions do not,
+    so the post_delete signal handlers bump the counter of the table instead.
+
+    Attributes:
+        table (str): The database table of the model.
+        deletions (int): The number of rows deleted from the table.
+
+    Methods:
+        bump(model) -> None:
+            Counts a deleted row of the model.
+
+    """
+    table = models.CharField(max_length=100, unique=True)
+    deletions = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of the version.
+
+        Returns:
+            str: The string representation of the version.
+
+        """
+        return f"{self.table} - {self.deletions}"
+
+    @classmethod
+    def bump(cls, model) -> None:
+        """
+        Counts a deleted row of the model.
+
+        Parameters:
+            model (Model): The model of the deleted row.
+
+        """
+        table = model._meta.db_table
+        if not cls.objects.filter(table=table).update(deletions=F('deletions') + 1):
+            cls.objects.get_or_create(table=table, defaults={'deletions': 1})
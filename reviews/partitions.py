@@ -0,0 +1,232 @@
+import re
+from datetime import date
+from typing import List
+
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+# Optional monthly range partitioning of the visits table by visit date (PostgreSQL only).
+#
+# Every month lives in its own partition named reviews_visit_yYYYYmMM. Visits of
+# months without a partition land in the default partition and are moved into
+# their month's partition once it is created. Queries filtering by date only
+# scan the matching partitions, and old months can be detached in constant time.
+# The Visit model is unchanged; the primary key becomes (id, date), as every
+# unique constraint of a partitioned table must contain the partition key.
+
+TABLE = 'reviews_visit'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+
+def is_partitioned(connection=None) -> bool:
+    """
+    Return whether the visits table is partitioned.
+    """
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)', [TABLE])
+        return cursor.fetchone()[0]
+
+
+def get_partition_months(connection=None) -> List[date]:
+    """
+    Return the first day of every month having a partition, in ascending order.
+    """
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass', [TABLE]
+        )
+        names = [name for name, in cursor.fetchall()]
+
+    matches = [PARTITION_NAME.match(name) for name in names]
+    return sorted(date(int(match[1]), int(match[2]), 1) for match in matches if match)
+
+
+def _create_partition(cursor, month: date) -> None:
+    name, end = partition_name(month), add_months(month, 1)
+    # the partition is filled with the visits of its month from the default
+    # partition before it is attached, which would fail otherwise
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved', [month, end]
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{end}')")
+
+
+def create_visit_partitions(months_ahead: int = 3, connection=None) -> List[str]:
+    """
+    Create the missing partitions from the current month until `months_ahead` months ahead.
+
+    Runs periodically as the `reviews.tasks.create_visit_partitions` Celery task,
+    so visits are never stored in the default partition during normal operation.
+    Does nothing if the visits table is not partitioned.
+
+    Parameters:
+        months_ahead (int): The number of future months to create partitions for.
+
+    Returns:
+        List[str]: The names of the created partitions.
+
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+
+    current = timezone.now().date().replace(day=1)
+    return _create_partitions(connection, current, add_months(current, months_ahead))
+
+
+def _create_partitions(connection, first: date, last: date) -> List[str]:
+    existing = set(get_partition_months(connection))
+    created = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        month = first
+        while month <= last:
+            if month not in existing:
+                _create_partition(cursor, month)
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+
+    return created
+
+
+def detach_visit_partitions(before: date, drop: bool = False, connection=None) -> List[str]:
+    """
+    Detach the partitions of the months ending before `before`.
+
+    Detaching only changes the catalog, so it takes constant time regardless of
+    the number of visits. The detached tables are kept (e.g. for archiving) unless
+    `drop` is set. Their visits disappear from the application, and the customer
+    restaurant statistics drop them at the next `verify_stats --repair`.
+
+    Parameters:
+        before (date): The detached partitions end on or before the first day of this month.
+        drop (bool): Whether to drop the detached tables.
+
+    Returns:
+        List[str]: The names of the detached partitions.
+
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        return []
+
+    detached = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for month in get_partition_months(connection):
+            if add_months(month, 1) > before.replace(day=1):
+                break
+            name = partition_name(month)
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+            if drop:
+                cursor.execute(f'DROP TABLE {name}')
+            detached.append(name)
+
+    return detached
+
+
+def partition_visit_table(months_ahead: int = 3, connection=None) -> List[str]:
+    """
+    Convert the visits table into a table partitioned by month of the visit date.
+
+    The rows are copied into a new partitioned table with a partition for every
+    month from the first visit until `months_ahead` months ahead, which then
+    replaces the original table. Indexes and constraints are recreated under
+    their original names, with the primary key extended to (id, date). The table
+    is locked while its rows are copied, so convert large tables during a
+    maintenance window.
+
+    Parameters:
+        months_ahead (int): The number of future months to create partitions for.
+
+    Returns:
+        List[str]: The names of the created partitions.
+
+    """
+    connection = connection or default_connection
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass '
+            'AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = indexrelid)', [TABLE]
+        )
+        indexes = [definition for definition, in cursor.fetchall()]
+        cursor.execute(
+            'SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass '
+            "AND contype IN ('p', 'u', 'f', 'c')", [TABLE]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(f'SELECT min(date), max(id) FROM {TABLE}')
+        first_visit, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned')
+        cursor.execute(f'CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned) PARTITION BY RANGE (date)')
+        # the identity of the id column belongs to the original table, use a sequence instead
+        cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq_partitioned OWNED BY {TABLE}.id')
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq_partitioned')")
+        cursor.execute(f"SELECT setval('{TABLE}_id_seq_partitioned', %s, %s)", [max_id or 1, max_id is not None])
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+        current = timezone.now().date().replace(day=1)
+        first = min(first_visit.replace(day=1), current) if first_visit else current
+        created = _create_partitions(connection, first, add_months(current, months_ahead))
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned')
+        cursor.execute(f'DROP TABLE {TABLE}_unpartitioned')
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq_partitioned RENAME TO {TABLE}_id_seq')
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = 'PRIMARY KEY (id, date)'
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for definition in indexes:
+            cursor.execute(definition)
+
+    return created
+
+
+def unpartition_visit_table(connection=None) -> None:
+    """
+    Convert the partitioned visits table back into a regular table, the reverse of `partition_visit_table`.
+    """
+    connection = connection or default_connection
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass '
+            'AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = indexrelid)', [TABLE]
+        )
+        indexes = [definition for definition, in cursor.fetchall()]
+        cursor.execute(
+            'SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass '
+            "AND contype IN ('p', 'u', 'f', 'c')", [TABLE]
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+        cursor.execute(f'CREATE TABLE {TABLE} (LIKE {TABLE}_partitioned INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned')
+        cursor.execute(f'ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+        cursor.execute(f'DROP TABLE {TABLE}_partitioned')
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = 'PRIMARY KEY (id)'
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for definition in indexes:
+            # the indexes of a partitioned table are defined ON ONLY the parent
+            cursor.execute(definition.replace(' ON ONLY ', ' ON ', 1))
@@ -0,0 +1,77 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+# Routing state of the current request, set by ReplicaRoutingMiddleware:
+# 'replica' tells whether reads may go to a replica, 'wrote' whether the request wrote.
+# Outside of requests (management commands, Celery tasks, tests) it is None and
+# everything uses the primary.
+_routing_state: ContextVar[Optional[dict]] = ContextVar('routing_state', default=None)
+
+
+def get_replica_databases() -> list:
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+@contextmanager
+def routing_state(replica: bool):
+    """
+    Route the reads of the enclosed code to a replica (replica=True) or the primary.
+
+    Yields:
+        dict: The routing state, whose 'wrote' flag is set once the code writes.
+              Writes are also reported to the enclosing state.
+
+    """
+    outer = _routing_state.get()
+    state = {'replica': replica, 'wrote': False}
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+        if outer is not None and state['wrote']:
+            outer['wrote'] = True
+            outer['replica'] = False
+
+
+def use_primary():
+    """
+    Read from the primary within the enclosed code, e.g. before caching a response.
+    """
+    return routing_state(replica=False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send the reads of safe requests to the replicas and everything else to the primary.
+
+    The replicas are the aliases listed in REPLICA_DATABASES. Reads only go to a
+    replica inside a request that ReplicaRoutingMiddleware marked as safe, i.e.
+    a GET or HEAD request that is not in the read-your-writes window after a write
+    by the same client. Once a request writes, its remaining reads use the primary.
+
+    """
+    def db_for_read(self, model, **hints) -> str:
+        state = _routing_state.get()
+        replicas = get_replica_databases()
+        if replicas and state is not None and state['replica']:
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _routing_state.get()
+        if state is not None:
+            state['wrote'] = True
+            state['replica'] = False
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # replicas mirror the primary, so their objects may be related to each other
+        databases = {'default', *get_replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
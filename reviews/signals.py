@@ -0,0 +1,309 @@
+from django.db.models import DEFERRED, F
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .leaderboard import bayesian_rating_expression
+from .models import Customer, CustomerRestaurantStats, Restaurant, Review, TableVersion, Visit
+
+
+# review
+REVIEW_STATE_FIELDS = ('restaurant_id', 'rating', 'pricing')
+
+
+def _apply_review_delta(restaurant_id: int, count: int = 0, rating: int = 0, pricing: dict = None) -> None:
+    """
+    Adjust the stored review aggregates of a restaurant in a single UPDATE.
+
+    Parameters:
+        restaurant_id (int): The ID of the restaurant to update.
+        count (int): The change of the review count.
+        rating (int): The change of the rating sum.
+        pricing (dict): The change of the review count per pricing category.
+
+    """
+    if restaurant_id is None:
+        return
+
+    deltas = {'review_count': count, 'rating_sum': rating}
+    for category, change in (pricing or {}).items():
+        field = Restaurant.PRICING_COUNT_FIELDS.get(category)
+        if field:
+            deltas[field] = deltas.get(field, 0) + change
+
+    updates = {field: F(field) + change for field, change in deltas.items() if change}
+    if count or rating:
+        updates['bayesian_rating'] = bayesian_rating_expression(count_delta=count, rating_delta=rating)
+    if updates:
+        Restaurant.objects.filter(pk=restaurant_id).update(**updates, updated_at=Now())
+
+
+def _add_review(state: dict, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) a review state from its restaurant aggregates.
+
+    Parameters:
+        state (dict): The 'restaurant_id', 'rating' and 'pricing' of the review.
+        sign (int): 1 to add the review, -1 to remove it.
+
+    """
+    _apply_review_delta(
+        state['restaurant_id'],
+        count=sign,
+        rating=sign * int(state['rating']),
+        pricing={state['pricing']: sign},
+    )
+
+
+def _current_review_state(instance: Review) -> dict:
+    return {'restaurant_id': instance.restaurant_id, 'rating': int(instance.rating), 'pricing': instance.pricing}
+
+
+def _loaded_review_state(instance: Review) -> dict or None:
+    """
+    Return the state the review had when it was loaded, if known.
+
+    Parameters:
+        instance (Review): The review instance.
+
+    Returns:
+        dict or None: The loaded 'restaurant_id', 'rating' and 'pricing', or None if the
+                review was not loaded from the database or those fields were deferred.
+
+    """
+    loaded = getattr(instance, '_loaded_values', None)
+    if not loaded:
+        return None
+
+    state = {key: loaded.get(key, DEFERRED) for key in REVIEW_STATE_FIELDS}
+    if DEFERRED in state.values():
+        return None
+    return state
+
+
+@receiver(post_save, sender=Review)
+def update_restaurant_stats_on_review_save(sender, instance: Review, created: bool, raw: bool, **kwargs) -> None:
+    """
+    Keep the restaurant review aggregates in sync when a review is saved.
+
+    New reviews are added to the aggregates. For updated reviews, the difference
+    to the previously loaded state is applied; if that state is unknown, the
+    aggregates of the restaurant are recomputed.
+
+    """
+    if raw:
+        return
+
+    current = _current_review_state(instance)
+
+    if created:
+        _add_review(current, 1)
+    else:
+        previous = _loaded_review_state(instance)
+        if previous is None:
+            instance.restaurant.recalculate_review_stats()
+        elif previous['restaurant_id'] != current['restaurant_id']:
+            _add_review(previous, -1)
+            _add_review(current, 1)
+        else:
+            # an unchanged pricing is left alone, {p: -1, p: 1} would collapse to {p: 1}
+            pricing = None
+            if previous['pricing'] != current['pricing']:
+                pricing = {previous['pricing']: -1, current['pricing']: 1}
+            _apply_review_delta(
+                current['restaurant_id'],
+                rating=current['rating'] - int(previous['rating']),
+                pricing=pricing,
+            )
+
+    instance._loaded_values = current
+
+
+@receiver(post_delete, sender=Review)
+def update_restaurant_stats_on_review_delete(sender, instance: Review, origin=None, **kwargs) -> None:
+    """
+    Remove a deleted review from the restaurant review aggregates.
+
+    This also runs for reviews removed by cascade, e.g. when their customer is deleted.
+    Reviews cascading from the deletion of their own restaurant are skipped.
+
+    """
+    if isinstance(origin, Restaurant) and origin.pk == instance.restaurant_id:
+        return
+
+    _add_review(_loaded_review_state(instance) or _current_review_state(instance), -1)
+
+
+# visit
+VISIT_STATE_FIELDS = ('customer_id', 'restaurant_id', 'date', 'spending')
+
+
+def _current_visit_state(instance: Visit) -> dict:
+    return {
+        'customer_id': instance.customer_id,
+        'restaurant_id': instance.restaurant_id,
+        'date': Visit._meta.get_field('date').to_python(instance.date),
+        'spending': Visit._meta.get_field('spending').to_python(instance.spending),
+    }
+
+
+def _loaded_visit_state(instance: Visit) -> dict or None:
+    """
+    Return the state the visit had when it was loaded, if known.
+
+    Parameters:
+        instance (Visit): The visit instance.
+
+    Returns:
+        dict or None: The loaded 'customer_id', 'restaurant_id', 'date' and 'spending',
+                or None if the visit was not loaded from the database or those fields
+                were deferred.
+
+    """
+    loaded = getattr(instance, '_loaded_values', None)
+    if not loaded:
+        return None
+
+    state = {key: loaded.get(key, DEFERRED) for key in VISIT_STATE_FIELDS}
+    if DEFERRED in state.values():
+        return None
+    return state
+
+
+@receiver(post_save, sender=Visit)
+def update_customer_restaurant_stats_on_visit_save(sender, instance: Visit, created: bool, raw: bool,
+                                                   **kwargs) -> None:
+    """
+    Keep the customer restaurant statistics in sync when a visit is saved.
+
+    New visits are added to the statistics of their pair. A changed spending is
+    applied as a difference; any other change, or an unknown previous state,
+    rebuilds the affected pairs from their visits.
+
+    """
+    if raw:
+        return
+
+    current = _current_visit_state(instance)
+    previous = None if created else _loaded_visit_state(instance)
+
+    if created:
+        if current['restaurant_id'] is not None:
+            CustomerRestaurantStats.add_visit(
+                current['customer_id'], current['restaurant_id'], current['date'], current['spending']
+            )
+    elif previous is not None and all(previous[key] == current[key] for key in ('customer_id', 'restaurant_id', 'date')):
+        spending_change = current['spending'] - previous['spending']
+        if current['restaurant_id'] is not None and spending_change:
+            CustomerRestaurantStats.objects.filter(
+                customer_id=current['customer_id'], restaurant_id=current['restaurant_id']
+            ).update(total_spending=F('total_spending') + spending_change)
+    else:
+        pairs = {(current['customer_id'], current['restaurant_id'])}
+        if previous is not None:
+            pairs.add((previous['customer_id'], previous['restaurant_id']))
+        for customer_id, restaurant_id in pairs:
+            if restaurant_id is not None:
+                CustomerRestaurantStats.rebuild_for(customer_id, restaurant_id)
+
+    instance._loaded_values = current
+
+
+@receiver(post_delete, sender=Visit)
+def update_customer_restaurant_stats_on_visit_delete(sender, instance: Visit, origin=None, **kwargs) -> None:
+    """
+    Remove a deleted visit from the customer restaurant statistics.
+
+    Visits cascading from the deletion of their own customer are skipped, as the
+    statistics of that customer are removed by the same cascade. Visits whose
+    restaurant was deleted are detached by SET_NULL and their statistics rows
+    are removed by cascade from the restaurant.
+
+    """
+    if isinstance(origin, Customer) and origin.pk == instance.customer_id:
+        return
+
+    state = _loaded_visit_state(instance) or _current_visit_state(instance)
+    if state['restaurant_id'] is not None:
+        CustomerRestaurantStats.rebuild_for(state['customer_id'], state['restaurant_id'])
+
+
+@receiver(pre_delete, sender=Restaurant)
+def touch_visits_on_restaurant_delete(sender, instance: Restaurant, **kwargs) -> None:
+    """
+    Bump the modification time of the visits about to be detached from a deleted restaurant.
+
+    The SET_NULL of the deletion is a bulk UPDATE of the restaurant column only,
+    which would leave the ETags of the detached visits unchanged.
+
+    """
+    Visit.objects.filter(restaurant_id=instance.pk).update(updated_at=Now())
+
+
+# versions
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Visit)
+def bump_table_version_on_delete(sender, instance, **kwargs) -> None:
+    # a deletion does not raise the maximum `updated_at` the list validators read
+    TableVersion.bump(sender)
+
+
+# cache
+# These receivers are connected after the statistics receivers above, so outside
+# of transactions the generations are bumped once the aggregates are updated
+# (inside a transaction, `invalidate` waits for the commit anyway). The statistics
+# receivers overwrite `_loaded_values`, so the values a review or visit was loaded
+# with are copied before the save; a review or visit moved to another restaurant
+# then still invalidates the restaurant it was loaded with.
+def _previous_values(instance) -> dict:
+    # the copy taken before a save is used once, a later delete uses `_loaded_values`
+    return instance.__dict__.pop('_values_before_save', None) or getattr(instance, '_loaded_values', None) or {}
+
+
+def _restaurant_scopes(instance, previous: dict) -> list:
+    restaurant_ids = {instance.restaurant_id, previous.get('restaurant_id')}
+    return [f'restaurant:{restaurant_id}' for restaurant_id in restaurant_ids if restaurant_id is not None]
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=Visit)
+def remember_loaded_values(sender, instance, **kwargs) -> None:
+    instance._values_before_save = dict(getattr(instance, '_loaded_values', None) or {})
+
+
+def _visitor_scopes(restaurant_id: int) -> list:
+    # the spending of the customers who visited the restaurant lists its name
+    stats = CustomerRestaurantStats.objects.filter(restaurant_id=restaurant_id)
+    return [f'customer:{customer_id}' for customer_id in stats.values_list('customer_id', flat=True)]
+
+
+@receiver(post_save, sender=Restaurant)
+def invalidate_cache_on_restaurant_save(sender, instance: Restaurant, created: bool, **kwargs) -> None:
+    # an instance not loaded with its name may have been renamed
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    renamed = not created and ('name' not in loaded or loaded['name'] != instance.name)
+    invalidate('restaurants', f'restaurant:{instance.pk}', *(_visitor_scopes(instance.pk) if renamed else []))
+    instance._loaded_values = {**loaded, 'name': instance.name}
+
+
+@receiver(pre_delete, sender=Restaurant)
+def invalidate_cache_on_restaurant_delete(sender, instance: Restaurant, **kwargs) -> None:
+    # before the deletion removes the visit statistics of the restaurant
+    invalidate('restaurants', f'restaurant:{instance.pk}', *_visitor_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_cache_on_review_change(sender, instance: Review, **kwargs) -> None:
+    invalidate('restaurants', *_restaurant_scopes(instance, _previous_values(instance)))
+
+
+@receiver(post_save, sender=Visit)
+@receiver(post_delete, sender=Visit)
+def invalidate_cache_on_visit_change(sender, instance: Visit, **kwargs) -> None:
+    previous = _previous_values(instance)
+    customer_ids = {instance.customer_id, previous.get('customer_id')}
+    customer_scopes = [f'customer:{customer_id}' for customer_id in customer_ids if customer_id is not None]
+    invalidate(*_restaurant_scopes(instance, previous), *customer_scopes)
@@ -0,0 +1,232 @@
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, Now
+
+from .cache import invalidate
+from .leaderboard import bayesian_rating_expression, compute_mean_rating, set_mean_rating
+from .models import Customer, CustomerRestaurantStats, Restaurant, Review, Visit
+
+RESTAURANT_STAT_FIELDS = ('review_count', 'rating_sum', *Restaurant.PRICING_COUNT_FIELDS.values())
+CUSTOMER_RESTAURANT_STAT_FIELDS = ('visit_count', 'total_spending', 'first_visit', 'last_visit')
+
+
+def _id_ranges(model, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield half-open [start, end) primary key ranges covering every row of a model.
+
+    Ranges are computed from the smallest and largest primary key, so each chunk
+    is read with an index range scan regardless of gaps in the ids.
+
+    """
+    bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+
+    for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+        yield start, start + chunk_size
+
+
+def _batches(items: list, batch_size: int) -> Iterator[list]:
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+# restaurant
+def _actual_restaurant_stats(review_filter: Q) -> Dict[int, dict]:
+    pricing_aggregates = {
+        field: Count('id', filter=Q(pricing=pricing)) for pricing, field in Restaurant.PRICING_COUNT_FIELDS.items()
+    }
+    rows = (
+        Review.objects.filter(review_filter)
+        .values('restaurant_id')
+        .annotate(review_count=Count('id'), rating_sum=Coalesce(Sum('rating'), 0), **pricing_aggregates)
+        .order_by()
+    )
+    return {row.pop('restaurant_id'): row for row in rows}
+
+
+def _empty_restaurant_stats() -> dict:
+    return {field: 0 for field in RESTAURANT_STAT_FIELDS}
+
+
+def verify_restaurant_stats(chunk_size: int = 1000, repair: bool = False, batch_size: int = 100) -> List[dict]:
+    """
+    Compare the stored review aggregates of every restaurant with the reviews.
+
+    Restaurants are checked in primary key ranges of `chunk_size`, each with one
+    grouped query over the reviews of the range. With `repair`, mismatching
+    restaurants are fixed in transactions of `batch_size` rows: their rows are
+    locked, the aggregates are recomputed under the lock and written back. A review
+    write and its signal delta are separate statements, so a review committed just
+    before the repair whose delta is applied just after it is counted twice; such
+    drift is small and found again by the next run.
+
+    Parameters:
+        chunk_size (int): The size of the restaurant ID ranges to compare at once.
+        repair (bool): Whether to repair the mismatching restaurants.
+        batch_size (int): The number of restaurants repaired per transaction.
+
+    Returns:
+        List[dict]: A mismatch per restaurant with its 'id', 'stored' and 'actual' aggregates.
+
+    """
+    mismatches = []
+
+    for start, end in _id_ranges(Restaurant, chunk_size):
+        stored = Restaurant.objects.filter(pk__gte=start, pk__lt=end).values('id', *RESTAURANT_STAT_FIELDS)
+        actual = _actual_restaurant_stats(Q(restaurant_id__gte=start, restaurant_id__lt=end))
+
+        for row in stored:
+            restaurant_id = row.pop('id')
+            expected = actual.get(restaurant_id, _empty_restaurant_stats())
+            if row != expected:
+                mismatches.append({'id': restaurant_id, 'stored': row, 'actual': expected})
+
+    if repair:
+        for batch in _batches([mismatch['id'] for mismatch in mismatches], batch_size):
+            repair_restaurant_stats(batch)
+
+    return mismatches
+
+
+def repair_restaurant_stats(restaurant_ids: List[int]) -> None:
+    """
+    Recompute the stored review aggregates of the given restaurants in one transaction.
+
+    Parameters:
+        restaurant_ids (List[int]): The IDs of the restaurants to repair.
+
+    """
+    with transaction.atomic():
+        locked = list(
+            Restaurant.objects.select_for_update().filter(pk__in=restaurant_ids).order_by('pk').values_list('pk', flat=True)
+        )
+        actual = _actual_restaurant_stats(Q(restaurant_id__in=locked))
+
+        for restaurant_id in locked:
+            stats = actual.get(restaurant_id, _empty_restaurant_stats())
+            Restaurant.objects.filter(pk=restaurant_id).update(**stats, updated_at=Now())
+        # rank the repaired aggregates against the stored mean in a single UPDATE
+        Restaurant.objects.filter(pk__in=locked).update(bayesian_rating=bayesian_rating_expression())
+
+    invalidate('restaurants', *(f'restaurant:{restaurant_id}' for restaurant_id in locked))
+
+
+def rebuild_leaderboard(chunk_size: int = 1000) -> float:
+    """
+    Recompute the mean rating and the Bayesian rating of every restaurant, see `reviews.leaderboard`.
+
+    The review writes keep the Bayesian ratings up to date with the mean rating of
+    the last rebuild. This refreshes the mean and applies it to all restaurants in
+    primary key ranges, each in its own short UPDATE.
+
+    Parameters:
+        chunk_size (int): The size of the primary key ranges.
+
+    Returns:
+        float: The new mean rating.
+
+    """
+    mean = compute_mean_rating()
+    set_mean_rating(mean)
+
+    for start, end in _id_ranges(Restaurant, chunk_size):
+        Restaurant.objects.filter(pk__gte=start, pk__lt=end).update(bayesian_rating=bayesian_rating_expression())
+
+    invalidate('restaurants')
+    return mean
+
+
+# customer restaurant stats
+def _actual_customer_restaurant_stats(visit_filter: Q) -> Dict[Tuple[int, int], dict]:
+    rows = (
+        Visit.objects.filter(visit_filter, restaurant__isnull=False)
+        .values('customer_id', 'restaurant_id')
+        .annotate(
+            visit_count=Count('id'),
+            total_spending=Sum('spending'),
+            first_visit=Min('date'),
+            last_visit=Max('date'),
+        )
+        .order_by()
+    )
+    return {(row.pop('customer_id'), row.pop('restaurant_id')): row for row in rows}
+
+
+def _normalize(stats: Optional[dict]) -> Optional[dict]:
+    if stats is None:
+        return None
+    return {**stats, 'total_spending': Decimal(stats['total_spending']).quantize(Decimal('0.01'))}
+
+
+def verify_customer_restaurant_stats(chunk_size: int = 1000, repair: bool = False,
+                                     batch_size: int = 100) -> List[dict]:
+    """
+    Compare the CustomerRestaurantStats table with the visits.
+
+    Customers are checked in primary key ranges of `chunk_size`, each with one
+    grouped query over their visits. Missing, surplus and outdated rows are all
+    reported. With `repair`, the mismatching pairs are fixed in transactions of
+    `batch_size` pairs, with their existing rows locked while they are recomputed.
+
+    Parameters:
+        chunk_size (int): The size of the customer ID ranges to compare at once.
+        repair (bool): Whether to repair the mismatching pairs.
+        batch_size (int): The number of pairs repaired per transaction.
+
+    Returns:
+        List[dict]: A mismatch per pair with its 'id' (customer ID, restaurant ID),
+                'stored' and 'actual' statistics; None stands for a missing row.
+
+    """
+    mismatches = []
+
+    for start, end in _id_ranges(Customer, chunk_size):
+        stored = {
+            (row.pop('customer_id'), row.pop('restaurant_id')): row
+            for row in CustomerRestaurantStats.objects.filter(customer_id__gte=start, customer_id__lt=end)
+            .values('customer_id', 'restaurant_id', *CUSTOMER_RESTAURANT_STAT_FIELDS)
+        }
+        actual = _actual_customer_restaurant_stats(Q(customer_id__gte=start, customer_id__lt=end))
+
+        for pair in sorted(stored.keys() | actual.keys()):
+            row, expected = _normalize(stored.get(pair)), _normalize(actual.get(pair))
+            if row != expected:
+                mismatches.append({'id': pair, 'stored': row, 'actual': expected})
+
+    if repair:
+        for batch in _batches([mismatch['id'] for mismatch in mismatches], batch_size):
+            repair_customer_restaurant_stats(batch)
+
+    return mismatches
+
+
+def repair_customer_restaurant_stats(pairs: List[Tuple[int, int]]) -> None:
+    """
+    Recompute the statistics of the given (customer ID, restaurant ID) pairs in one transaction.
+
+    Parameters:
+        pairs (List[Tuple[int, int]]): The pairs to repair.
+
+    """
+    pair_filter = Q()
+    for customer_id, restaurant_id in pairs:
+        pair_filter |= Q(customer_id=customer_id, restaurant_id=restaurant_id)
+
+    with transaction.atomic():
+        list(CustomerRestaurantStats.objects.select_for_update().filter(pair_filter).order_by('pk'))
+        actual = _actual_customer_restaurant_stats(pair_filter)
+
+        for customer_id, restaurant_id in pairs:
+            stats = actual.get((customer_id, restaurant_id))
+            if stats is None:
+                CustomerRestaurantStats.objects.filter(customer_id=customer_id, restaurant_id=restaurant_id).delete()
+            else:
+                CustomerRestaurantStats.objects.update_or_create(
+                    customer_id=customer_id, restaurant_id=restaurant_id, defaults=stats
+                )
+
+    invalidate(*{f'restaurant:{restaurant_id}' for _, restaurant_id in pairs})
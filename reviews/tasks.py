@@ -0,0 +1,42 @@
+from celery import shared_task
+from django.conf import settings
+
+from .partitions import create_visit_partitions as create_partitions
+from .stats import rebuild_leaderboard as rebuild_ranking, verify_customer_restaurant_stats, verify_restaurant_stats
+
+
+@shared_task
+def verify_stats(repair: bool = True, chunk_size: int = 1000, batch_size: int = 100) -> dict:
+    """
+    Periodic counterpart of `manage.py verify_stats`, see CELERY_BEAT_SCHEDULE.
+
+    Returns:
+        dict: The number of mismatching 'restaurant' and 'customer_restaurant' statistics.
+    """
+    options = {'chunk_size': chunk_size, 'repair': repair, 'batch_size': batch_size}
+    return {
+        'restaurant': len(verify_restaurant_stats(**options)),
+        'customer_restaurant': len(verify_customer_restaurant_stats(**options)),
+    }
+
+
+@shared_task
+def rebuild_leaderboard() -> float:
+    """
+    Periodically refresh the mean rating of the Bayesian restaurant ranking, see CELERY_BEAT_SCHEDULE.
+
+    Returns:
+        float: The new mean rating.
+    """
+    return rebuild_ranking()
+
+
+@shared_task
+def create_visit_partitions() -> list:
+    """
+    Periodic counterpart of `manage.py visit_partitions`, see CELERY_BEAT_SCHEDULE.
+
+    Returns:
+        list: The names of the created partitions, empty if the visits table is not partitioned.
+    """
+    return create_partitions(months_ahead=settings.VISIT_PARTITIONS_AHEAD)
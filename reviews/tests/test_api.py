@@ -0,0 +1,895 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from django.core.cache import cache
+
+from reviews.cache import get_cache_stats, get_generations
+from reviews.leaderboard import compute_bayesian_rating, get_mean_rating, set_mean_rating
+from reviews.models import CustomerRestaurantStats, Restaurant, Review, Visit
+from reviews.stats import rebuild_leaderboard
+
+
+# customer
+class CustomersApiViewTestCase(TestCase):
+    def setUp(self):
+        for name in ['anna', 'annabel', 'anne', 'bob']:
+            get_user_model().objects.create_user(username=name, password='testpassword', email=f'{name}@example.com')
+
+    def test_customers_exact_match(self):
+        response = self.client.get(reverse('customers'), {'query': 'anna'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([customer['username'] for customer in response.data], ['anna'])
+
+    def test_customers_exact_email_match(self):
+        response = self.client.get(reverse('customers'), {'query': 'bob@example.com'})
+
+        self.assertEqual([customer['username'] for customer in response.data], ['bob'])
+
+    def test_customers_search_limit(self):
+        response = self.client.get(reverse('customers'), {'query': 'ann', 'limit': 2})
+
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('bob', [customer['username'] for customer in response.data])
+
+    def test_customers_lean_projection(self):
+        # the exact match lookup and the search, no per-customer queries
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('customers'), {'query': 'an'})
+
+        self.assertEqual(len(response.data), 3)
+        self.assertNotIn('password', response.data[0])
+        self.assertNotIn('groups', response.data[0])
+
+    def test_customers_list_paginated(self):
+        response = self.client.get(reverse('customers'), {'page_size': 3})
+
+        self.assertEqual([customer['username'] for customer in response.data['results']], ['anna', 'annabel', 'anne'])
+        self.assertIsNotNone(response.data['next'])
+
+
+class CustomerSpendingApiViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other_user = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.url = reverse('customer_spending', args=['testuser'])
+
+        self.restaurant = Restaurant.objects.create(name='Restaurant A', cuisine='asian_cuisine', address='Test',
+                                                    created_by=self.user)
+        self.restaurant2 = Restaurant.objects.create(name='Restaurant B', cuisine='asian_cuisine', address='Test',
+                                                     created_by=self.user)
+        for restaurant, day, spending in [
+            (self.restaurant, date(2023, 1, 5), '10.00'),
+            (self.restaurant, date(2023, 1, 20), '15.50'),
+            (self.restaurant2, date(2023, 1, 7), '4.50'),
+            (self.restaurant2, date(2023, 3, 1), '20.00'),
+        ]:
+            Visit.objects.create(restaurant=restaurant, customer=self.user, date=day, spending=spending)
+        Visit.objects.create(restaurant=self.restaurant, customer=self.other_user, date=date(2023, 1, 5),
+                             spending='99.00')
+
+    def test_spending_per_month(self):
+        # the user of the token and the aggregation
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_spending'], response.data['visit_count']), (Decimal('50.00'), 4))
+        self.assertEqual(
+            [(row['month'], row['total_spending'], row['visit_count']) for row in response.data['months']],
+            [('2023-01', Decimal('30.00'), 3), ('2023-03', Decimal('20.00'), 1)],
+        )
+
+    def test_spending_per_restaurant(self):
+        response = self.client.get(self.url, {'group_by': 'restaurant'}, **self.auth)
+
+        self.assertEqual(
+            [(row['month'], row['restaurant_name'], row['total_spending']) for row in response.data['months']],
+            [('2023-01', 'Restaurant A', Decimal('25.50')), ('2023-01', 'Restaurant B', Decimal('4.50')),
+             ('2023-03', 'Restaurant B', Decimal('20.00'))],
+        )
+
+    def test_date_range(self):
+        response = self.client.get(self.url, {'date_from': '2023-01-06', 'date_to': '2023-02-28'}, **self.auth)
+
+        self.assertEqual(response.data['months'][0]['total_spending'], Decimal('20.00'))
+        self.assertEqual(response.data['visit_count'], 2)
+
+        response = self.client.get(self.url, {'date_from': 'yesterday'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_permissions(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        other_auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.other_user).access_token}'}
+        self.assertEqual(self.client.get(self.url, **other_auth).status_code, 403)
+
+        self.other_user.is_staff = True
+        self.other_user.save()
+        response = self.client.get(self.url, **other_auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['visit_count'], 4)
+
+    def test_cached_and_invalidated(self):
+        self.client.get(self.url, **self.auth)
+
+        # only the user of the token is loaded
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.data['visit_count'], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, 3, 2), spending='1.00')
+
+        response = self.client.get(self.url, **self.auth)
+        self.assertEqual(response.data['visit_count'], 5)
+        self.assertEqual(response.data['months'][-1]['total_spending'], Decimal('21.00'))
+
+    def test_invalidated_on_restaurant_change(self):
+        params = {'group_by': 'restaurant', 'date_to': '2023-01-31'}
+        self.client.get(self.url, params, **self.auth)
+
+        self.restaurant.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.save()
+
+        response = self.client.get(self.url, params, **self.auth)
+        self.assertEqual([row['restaurant_name'] for row in response.data['months']], ['Renamed', 'Restaurant B'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant2.delete()
+
+        response = self.client.get(self.url, params, **self.auth)
+        self.assertCountEqual([row['restaurant_name'] for row in response.data['months']], ['Renamed', None])
+
+    def test_kept_on_restaurant_change_without_rename(self):
+        self.client.get(self.url, **self.auth)
+
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        restaurant.address = 'Moved'
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.save()
+
+        # only the user of the token is loaded
+        with self.assertNumQueries(1):
+            self.client.get(self.url, **self.auth)
+
+
+# restaurant
+class RestaurantsApiViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.user2 = get_user_model().objects.create_user(username='testuser2', password='testpassword2')
+
+    def create_restaurants(self, count):
+        for index in range(count):
+            restaurant = Restaurant.objects.create(
+                name=f'Test Restaurant {index}',
+                cuisine='asian_cuisine',
+                address='123 Test Street',
+                created_by=self.user,
+            )
+            Review.objects.create(restaurant=restaurant, customer=self.user, rating=4, pricing='cheap')
+            Review.objects.create(restaurant=restaurant, customer=self.user2, rating=2, pricing='high')
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('restaurants'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_restaurants_view_stats(self):
+        self.create_restaurants(1)
+
+        _, response = self.count_list_queries()
+
+        self.assertEqual(response.data['results'][0]['average_rating'], 3)
+        self.assertEqual(response.data['results'][0]['pricing_category_eval'], 'moderate')
+        self.assertEqual(response.data['results'][0]['created_by'], self.user.id)
+
+    def test_restaurants_view_constant_query_count(self):
+        self.create_restaurants(2)
+        small_page_queries, _ = self.count_list_queries()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_restaurants(10)
+        large_page_queries, response = self.count_list_queries()
+
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(small_page_queries, large_page_queries)
+
+
+class RestaurantSearchApiViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        for name in ['Pizza Palace', 'Pizzeria Napoli', 'Sushi Bar', 'The Pizza']:
+            Restaurant.objects.create(name=name, cuisine='european_cuisine', address='Test Address', created_by=self.user)
+
+    def test_search(self):
+        response = self.client.get(reverse('restaurants'), {'search': 'pizza'})
+
+        self.assertEqual(response.status_code, 200)
+        names = [restaurant['name'] for restaurant in response.data]
+        self.assertEqual(set(names[:2]), {'The Pizza', 'Pizza Palace'})
+        self.assertNotIn('Sushi Bar', names)
+
+    @skipUnless(connection.vendor == 'postgresql', 'fuzzy matching needs pg_trgm')
+    def test_search_typo(self):
+        response = self.client.get(reverse('restaurants'), {'search': 'suhsi bar'})
+
+        self.assertEqual(response.data[0]['name'], 'Sushi Bar')
+
+    def test_search_limit(self):
+        response = self.client.get(reverse('restaurants'), {'search': 'pizz', 'limit': 2})
+
+        self.assertEqual(len(response.data), 2)
+
+
+@override_settings(LEADERBOARD_PRIOR_WEIGHT=10)
+class TopRestaurantsApiViewTestCase(TestCase):
+    def setUp(self):
+        # the reviews below are rated against the mean stored by the migrations, 3.0 on an empty database
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        customers = [get_user_model().objects.create_user(username=f'customer{i}') for i in range(20)]
+
+        self.single = Restaurant.objects.create(name='Single Review', cuisine='asian_cuisine', address='Test',
+                                                created_by=self.user)
+        self.popular = Restaurant.objects.create(name='Popular', cuisine='european_cuisine', address='Test',
+                                                 created_by=self.user)
+        Restaurant.objects.create(name='Unrated', cuisine='asian_cuisine', address='Test', created_by=self.user)
+
+        self.review = Review.objects.create(restaurant=self.single, customer=self.user, rating=5)
+        # 20 reviews averaging 4.8
+        for i, customer in enumerate(customers):
+            Review.objects.create(restaurant=self.popular, customer=customer, rating=4 if i < 4 else 5)
+
+    def test_ranking(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('top_restaurants'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.data], ['Popular', 'Single Review'])
+        self.assertAlmostEqual(response.data[0]['bayesian_rating'], (10 * 3 + 96) / 30)
+        self.assertAlmostEqual(response.data[1]['bayesian_rating'], (10 * 3 + 5) / 11)
+        self.assertEqual(response.data[0]['review_count'], 20)
+
+    def test_cuisine_and_limit(self):
+        response = self.client.get(reverse('top_restaurants'), {'cuisine': 'asian_cuisine'})
+        self.assertEqual([row['name'] for row in response.data], ['Single Review'])
+
+        response = self.client.get(reverse('top_restaurants'), {'limit': 1})
+        self.assertEqual([row['name'] for row in response.data], ['Popular'])
+
+        response = self.client.get(reverse('top_restaurants'), {'cuisine': 'martian_cuisine'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_updated_on_review_writes(self):
+        self.review.rating = 1
+        self.review.save()
+        Review.objects.create(restaurant=self.single, customer=get_user_model().objects.get(username='customer0'),
+                              rating=2)
+
+        single = Restaurant.objects.get(pk=self.single.pk)
+        self.assertAlmostEqual(single.bayesian_rating, compute_bayesian_rating(2, 3))
+
+        self.review.delete()
+
+        single = Restaurant.objects.get(pk=self.single.pk)
+        self.assertAlmostEqual(single.bayesian_rating, compute_bayesian_rating(1, 2))
+
+        response = self.client.get(reverse('top_restaurants'))
+        self.assertAlmostEqual(response.data[1]['bayesian_rating'], (10 * 3 + 2) / 11)
+
+    def test_stored_mean(self):
+        set_mean_rating(4.0)
+        customer = get_user_model().objects.get(username='customer0')
+
+        # the review and the restaurant aggregates, whose UPDATE reads the mean
+        with self.assertNumQueries(2):
+            Review.objects.create(restaurant=self.single, customer=customer, rating=3)
+
+        single = Restaurant.objects.get(pk=self.single.pk)
+        self.assertAlmostEqual(single.bayesian_rating, (10 * 4 + 8) / 12)
+
+    def test_rebuild(self):
+        mean = rebuild_leaderboard(chunk_size=1)
+
+        self.assertAlmostEqual(mean, 101 / 21)
+        self.assertAlmostEqual(get_mean_rating(), mean)
+        popular = Restaurant.objects.get(pk=self.popular.pk)
+        self.assertAlmostEqual(popular.bayesian_rating, (10 * mean + 96) / 30)
+
+        response = self.client.get(reverse('top_restaurants'))
+        ratings = {row['name']: row['bayesian_rating'] for row in response.data}
+        self.assertAlmostEqual(ratings['Single Review'], (10 * mean + 5) / 11)
+
+
+# visit
+class VisitsApiViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.user2 = get_user_model().objects.create_user(username='testuser2', password='testpassword2')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+        self.restaurant2 = Restaurant.objects.create(
+            name='Test Restaurant 2',
+            cuisine='african_cuisine',
+            address='456 Test Street',
+            created_by=self.user,
+        )
+
+    def create_visits(self, customer, restaurant, count, spending='10.50'):
+        for index in range(count):
+            Visit.objects.create(
+                restaurant=restaurant,
+                customer=customer,
+                date=date(2023, 1, 1) + timedelta(days=index),
+                spending=spending,
+            )
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('visits'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_visits_view_total_spending(self):
+        self.create_visits(self.user, self.restaurant, 3)
+        self.create_visits(self.user, self.restaurant2, 1, spending='5.00')
+        self.create_visits(self.user2, self.restaurant, 2, spending='1.25')
+
+        _, response = self.count_list_queries()
+
+        totals = {
+            (visit['customer'], visit['restaurant']): visit['total_spending_at_restaurant']
+            for visit in response.data['results']
+        }
+        self.assertEqual(totals[(self.user.id, self.restaurant.id)], Decimal('31.50'))
+        self.assertEqual(totals[(self.user.id, self.restaurant2.id)], Decimal('5.00'))
+        self.assertEqual(totals[(self.user2.id, self.restaurant.id)], Decimal('2.50'))
+
+    def test_visits_view_constant_query_count(self):
+        self.create_visits(self.user, self.restaurant, 2)
+        small_page_queries, _ = self.count_list_queries()
+
+        self.create_visits(self.user2, self.restaurant, 5)
+        self.create_visits(self.user2, self.restaurant2, 5)
+        large_page_queries, response = self.count_list_queries()
+
+        self.assertEqual(len(response.data['results']), 12)
+        self.assertEqual(small_page_queries, large_page_queries)
+
+
+# pagination
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+
+        for index in range(12):
+            customer = get_user_model().objects.create_user(username=f'customer{index}', password='testpassword')
+            # several visits share a date to exercise the id tie-breaker
+            Visit.objects.create(
+                restaurant=self.restaurant,
+                customer=customer,
+                date=date(2023, 1, 1) + timedelta(days=index // 4),
+                spending='10.00',
+            )
+
+    def collect_pages(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(visit['id'] for visit in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_visits_pages(self):
+        ids, pages = self.collect_pages(reverse('visits') + '?page_size=5')
+
+        expected = list(Visit.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_reviews_pages_same_millisecond(self):
+        for index, customer in enumerate(get_user_model().objects.filter(username__startswith='customer')[:4]):
+            review = Review.objects.create(restaurant=self.restaurant, customer=customer, rating=4, pricing='moderate')
+            # the microseconds differ, the milliseconds are the same
+            created = datetime(2023, 1, 1, 12, 0, 0, 123400 + index, tzinfo=timezone.utc)
+            Review.objects.filter(pk=review.pk).update(created=created)
+
+        ids, pages = self.collect_pages(reverse('reviews') + '?page_size=1')
+
+        self.assertEqual(ids, list(Review.objects.order_by('-created', '-id').values_list('id', flat=True)))
+        self.assertEqual(pages, 4)
+
+    @override_settings(API_MAX_PAGE_SIZE=4)
+    def test_max_page_size(self):
+        response = self.client.get(reverse('visits') + '?page_size=100')
+
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('visits') + '?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(API_PAGINATE_LISTS=False)
+    def test_pagination_opt_in(self):
+        response = self.client.get(reverse('visits'))
+        self.assertEqual(len(response.data), 12)
+
+        response = self.client.get(reverse('visits') + '?page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+
+
+# export
+class ExportApiViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+        self.restaurant2 = Restaurant.objects.create(
+            name='Test Restaurant 2',
+            cuisine='african_cuisine',
+            address='456 Test Street',
+            created_by=self.user,
+        )
+
+        for day in range(1, 6):
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, 1, day), spending='10.00')
+        Visit.objects.create(restaurant=self.restaurant2, customer=self.user, date=date(2023, 1, 1), spending='7.50')
+
+        Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=4, pricing='cheap', comment='Nice, cheap')
+
+    def test_visits_export_ndjson(self):
+        response = self.client.get(reverse('visits_export'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0], {
+            'id': rows[0]['id'], 'date': '2023-01-01', 'spending': '10.00',
+            'restaurant': self.restaurant.id, 'customer': self.user.id,
+        })
+
+    def test_visits_export_csv_filters(self):
+        response = self.client.get(reverse('visits_export'), {
+            'format': 'csv', 'date_from': '2023-01-02', 'date_to': '2023-01-04', 'restaurant': self.restaurant.id,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,date,spending,restaurant,customer')
+        self.assertEqual(len(lines), 4)
+
+    def test_visits_export_invalid_date(self):
+        response = self.client.get(reverse('visits_export'), {'date_from': '2023-13-45'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_reviews_export_csv(self):
+        response = self.client.get(reverse('reviews_export'), {'format': 'csv'})
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,restaurant,customer,created,rating,pricing,comment')
+        self.assertTrue(lines[1].endswith(',4,cheap,"Nice, cheap"'))
+
+
+# bulk visits
+class BulkVisitsApiViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+        self.restaurant2 = Restaurant.objects.create(
+            name='Test Restaurant 2',
+            cuisine='african_cuisine',
+            address='456 Test Street',
+            created_by=self.user,
+        )
+
+    def post_visits(self, rows, **extra):
+        return self.client.post(reverse('visits'), data=json.dumps(rows), content_type='application/json', **extra)
+
+    def test_bulk_create(self):
+        Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2022, 12, 31), spending='5.00')
+        rows = [
+            {'restaurant': self.restaurant.id, 'date': f'2023-01-0{day}', 'spending': '10.00'} for day in range(1, 6)
+        ] + [{'restaurant': self.restaurant2.id, 'date': '2023-01-01', 'spending': '3.50'}]
+
+        response = self.post_visits(rows, **self.auth)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(Visit.objects.filter(customer=self.user).count(), 7)
+        self.assertEqual(response.data[0]['total_spending_at_restaurant'], Decimal('55.00'))
+
+        stats = CustomerRestaurantStats.objects.get(customer=self.user, restaurant=self.restaurant)
+        self.assertEqual(stats.visit_count, 6)
+        self.assertEqual(stats.total_spending, Decimal('55.00'))
+        self.assertEqual(stats.first_visit, date(2022, 12, 31))
+        self.assertEqual(stats.last_visit, date(2023, 1, 5))
+
+        stats = CustomerRestaurantStats.objects.get(customer=self.user, restaurant=self.restaurant2)
+        self.assertEqual(stats.visit_count, 1)
+
+    def test_bulk_create_constant_query_count(self):
+        def count_queries(first_day, days):
+            rows = [
+                {'restaurant': self.restaurant.id, 'date': str(date(2023, 1, first_day) + timedelta(days=day)),
+                 'spending': '10.00'}
+                for day in range(days)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                response = self.post_visits(rows, **self.auth)
+            self.assertEqual(response.status_code, 201)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(1, 2), count_queries(10, 10))
+
+    def test_bulk_create_row_errors(self):
+        Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, 1, 1), spending='5.00')
+        rows = [
+            {'restaurant': self.restaurant.id, 'date': '2023-01-02', 'spending': '10.00'},
+            {'restaurant': self.restaurant.id, 'date': '2023-01-01', 'spending': '10.00'},
+            {'restaurant': 999, 'date': '2023-01-02', 'spending': '10.00'},
+            {'restaurant': self.restaurant.id, 'date': '2023-01-02', 'spending': '12.00'},
+            {'restaurant': self.restaurant.id, 'date': 'not-a-date', 'spending': '10.00'},
+        ]
+
+        response = self.post_visits(rows, **self.auth)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('non_field_errors', response.data[1])
+        self.assertIn('restaurant', response.data[2])
+        self.assertIn('non_field_errors', response.data[3])
+        self.assertIn('date', response.data[4])
+        self.assertEqual(Visit.objects.count(), 1)
+
+    @override_settings(API_MAX_BULK_VISITS=2)
+    def test_bulk_create_limit(self):
+        rows = [{'restaurant': self.restaurant.id, 'date': f'2023-01-0{day}', 'spending': '1.00'} for day in range(1, 4)]
+
+        response = self.post_visits(rows, **self.auth)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Visit.objects.exists())
+
+    def test_bulk_create_requires_authentication(self):
+        response = self.post_visits([{'restaurant': self.restaurant.id, 'date': '2023-01-01', 'spending': '1.00'}])
+
+        self.assertEqual(response.status_code, 401)
+
+
+# conditional requests
+class ConditionalGetApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+        self.visit = Visit.objects.create(
+            restaurant=self.restaurant, customer=self.user, date=date(2023, 1, 1), spending='10.00',
+        )
+
+    def test_restaurant_detail_not_modified(self):
+        url = reverse('restaurant', args=[self.restaurant.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_restaurant_detail_changes_with_reviews(self):
+        url = reverse('restaurant', args=[self.restaurant.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=5, pricing='cheap')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        etag = self.client.get(reverse('visits'))['ETag']
+
+        # the validator is a single indexed read, whatever the size of the table
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('visits'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, 1, 2), spending='5.00')
+
+        self.assertEqual(self.client.get(reverse('visits'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_changes_on_delete(self):
+        other = Restaurant.objects.create(name='Other', cuisine='asian_cuisine', address='Test', created_by=self.user)
+        etag = self.client.get(reverse('restaurants'))['ETag']
+
+        self.assertEqual(self.client.get(reverse('restaurants'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.filter(pk=self.restaurant.pk).delete()
+
+        # the newest restaurant is still there, only the deletion counter changed
+        self.assertEqual(self.client.get(reverse('restaurants'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertTrue(Restaurant.objects.filter(pk=other.pk).exists())
+
+    def test_filtered_list_changes_when_row_leaves(self):
+        url = reverse('restaurants') + '?restaurant_name=Test'
+        etag = self.client.get(url)['ETag']
+
+        self.restaurant.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_visit_detail_changes_on_restaurant_delete(self):
+        url = reverse('visit', args=[self.visit.id])
+        etag = self.client.get(url)['ETag']
+
+        self.restaurant.delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['restaurant'])
+
+    def test_visit_detail_changes_with_pair_visits(self):
+        url = reverse('visit', args=[self.visit.id])
+        etag = self.client.get(url)['ETag']
+
+        Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, 1, 2), spending='5.00')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_spending_at_restaurant'], Decimal('15.00'))
+
+    def test_missing_restaurant(self):
+        response = self.client.get(reverse('restaurant', args=[999]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+# cache
+class ResponseCacheApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+
+    def test_restaurant_detail_cached(self):
+        url = reverse('restaurant', args=[self.restaurant.id])
+        self.client.get(url)
+
+        # only the conditional GET validators are queried
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['name'], 'Test Restaurant')
+
+    def test_review_invalidates_restaurant(self):
+        self.client.get(reverse('restaurants'))
+        self.client.get(reverse('restaurant', args=[self.restaurant.id]))
+
+        # the generations are bumped once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=4, pricing='cheap')
+
+        response = self.client.get(reverse('restaurant', args=[self.restaurant.id]))
+        self.assertEqual(response.data['average_rating'], 4)
+
+        response = self.client.get(reverse('restaurants'))
+        self.assertEqual(response.data['results'][0]['average_rating'], 4)
+
+    def test_invalidated_on_commit(self):
+        generations = get_generations(['restaurants', f'restaurant:{self.restaurant.id}'])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=4, pricing='cheap')
+            self.assertEqual(get_generations(['restaurants', f'restaurant:{self.restaurant.id}']), generations)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_generations(['restaurants', f'restaurant:{self.restaurant.id}']), generations)
+
+    def test_restaurant_update_invalidates_list(self):
+        self.client.get(reverse('restaurants'))
+
+        self.restaurant.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.restaurant.save()
+
+        response = self.client.get(reverse('restaurants'))
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed')
+
+    def test_accept_header_keys(self):
+        url = reverse('restaurant', args=[self.restaurant.id])
+
+        response = self.client.get(url, HTTP_ACCEPT='text/html')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['name'], 'Test Restaurant')
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        # the browsable API page is not stored
+        self.assertEqual(get_cache_stats()['hits'], 0)
+
+    def test_query_string_keys(self):
+        Restaurant.objects.create(name='Other', cuisine='asian_cuisine', address='Test', created_by=self.user)
+        self.client.get(reverse('restaurants'))
+
+        response = self.client.get(reverse('restaurants'), {'restaurant_name': 'Other'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Other'])
+
+    def test_cache_stats(self):
+        url = reverse('restaurant', args=[self.restaurant.id])
+        before = get_cache_stats()
+        self.client.get(url)
+        self.client.get(url)
+        after = get_cache_stats()
+
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+    def test_cache_stats_view_requires_staff(self):
+        response = self.client.get(reverse('cache_stats'))
+        self.assertEqual(response.status_code, 401)
+
+        self.user.is_staff = True
+        self.user.save()
+        token = RefreshToken.for_user(self.user).access_token
+
+        response = self.client.get(reverse('cache_stats'), HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'hits', 'misses'})
+
+
+# async
+class AsyncApiViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser', email='test@example.com', password='testpassword',
+        )
+        self.restaurants = [
+            Restaurant.objects.create(name=name, cuisine='asian_cuisine', address='Test', created_by=self.user)
+            for name in ['Sushi Bar', 'Noodle House', 'Pizza Place']
+        ]
+        self.review = Review.objects.create(restaurant=self.restaurants[0], customer=self.user, rating=4,
+                                            pricing='cheap', comment='Good')
+        self.visits = [
+            Visit.objects.create(restaurant=self.restaurants[0], customer=self.user, date=date(2023, 1, day),
+                                 spending='12.50')
+            for day in range(1, 4)
+        ]
+
+    def assertSameResponse(self, sync_name, async_name, args=None, params=None):
+        expected = self.client.get(reverse(sync_name, args=args), params)
+        response = self.client.get(reverse(async_name, args=args), params)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content.decode().replace(
+            reverse(sync_name, args=args), reverse(async_name, args=args))))
+
+    def test_same_responses(self):
+        cases = [
+            ('customers', 'async_customers', None, None),
+            ('customers', 'async_customers', None, {'query': 'test'}),
+            ('customer', 'async_customer', ['testuser'], None),
+            ('restaurants', 'async_restaurants', None, {'page_size': 2}),
+            ('restaurants', 'async_restaurants', None, {'search': 'sushi'}),
+            ('restaurant', 'async_restaurant', [self.restaurants[0].id], None),
+            ('reviews', 'async_reviews', None, {'restaurant_id': self.restaurants[0].id}),
+            ('review', 'async_review', [self.review.id], None),
+            ('visits', 'async_visits', None, {'page_size': 2}),
+            ('visit', 'async_visit', [self.visits[0].id], None),
+        ]
+        for sync_name, async_name, args, params in cases:
+            with self.subTest(async_name, params=params):
+                self.assertSameResponse(sync_name, async_name, args, params)
+
+    def test_next_page(self):
+        first = self.client.get(reverse('async_restaurants'), {'page_size': 2}).json()
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual([row['name'] for row in first['results'] + second['results']],
+                         ['Sushi Bar', 'Noodle House', 'Pizza Place'])
+        self.assertIsNone(second['next'])
+
+    def test_not_found(self):
+        response = self.client.get(reverse('async_restaurant', args=[999]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('async_visits'), {'cursor': 'invalid'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('async_restaurants'), {'name': 'New'})
+
+        self.assertEqual(response.status_code, 405)
+
+    async def test_async_client(self):
+        response = await self.async_client.get(reverse('async_visits'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['total_spending_at_restaurant'], 37.5)
+
+    async def test_async_query_count(self):
+        response = await self.async_client.get(reverse('async_visits'))
+
+        queries = int(response['Server-Timing'].split('desc="')[1].split()[0])
+        self.assertGreater(queries, 0)
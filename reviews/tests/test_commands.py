@@ -0,0 +1,386 @@
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from reviews.leaderboard import compute_bayesian_rating
+from reviews.models import CustomerRestaurantStats, Restaurant, Review, Visit
+from reviews.management.commands.bench import Command as BenchCommand, percentile
+from reviews.partitions import (DEFAULT_PARTITION, add_months, create_visit_partitions, get_partition_months,
+                                is_partitioned, partition_visit_table)
+from reviews.tasks import create_visit_partitions as create_visit_partitions_task, verify_stats
+
+
+class RebuildCustomerRestaurantStatsCommandTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+
+        for day in range(1, 4):
+            Visit.objects.create(
+                restaurant=self.restaurant,
+                customer=self.user,
+                date=date(2023, 1, day),
+                spending='10.00',
+            )
+
+    def test_rebuild_customer_restaurant_stats(self):
+        CustomerRestaurantStats.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_customer_restaurant_stats', batch_size=1, stdout=out)
+
+        stats = CustomerRestaurantStats.objects.get(customer=self.user, restaurant=self.restaurant)
+        self.assertEqual(stats.visit_count, 3)
+        self.assertEqual(stats.total_spending, Decimal('30.00'))
+        self.assertEqual(stats.first_visit, date(2023, 1, 1))
+        self.assertEqual(stats.last_visit, date(2023, 1, 3))
+        self.assertIn('Rebuilt 1 customer restaurant stats rows.', out.getvalue())
+
+
+class ImportReviewsCommandTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.user2 = get_user_model().objects.create_user(username='testuser2', password='testpassword2')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_import_reviews_csv(self):
+        Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=1, pricing='cheap')
+        path = self.write_file('reviews.csv', (
+            'restaurant,customer,rating,pricing,comment\n'
+            f'{self.restaurant.id},testuser,5,high,Great\n'
+            f'{self.restaurant.id},testuser2,3,high,\n'
+            f'{self.restaurant.id},unknown,3,high,\n'
+            f'{self.restaurant.id},testuser2,9,high,\n'
+        ))
+        rejects = os.path.join(self.tmpdir.name, 'rejects.jsonl')
+        out = StringIO()
+
+        call_command('import_reviews', path, batch_size=2, rejects=rejects, stdout=out)
+
+        self.assertEqual(Review.objects.count(), 2)
+        review = Review.objects.get(restaurant=self.restaurant, customer=self.user)
+        self.assertEqual((review.rating, review.pricing, review.comment), (5, 'high', 'Great'))
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 2)
+        self.assertEqual(self.restaurant.rating_sum, 8)
+        self.assertEqual(self.restaurant.pricing_high_count, 2)
+
+        with open(rejects) as file:
+            reasons = [json.loads(line)['reason'] for line in file]
+        self.assertEqual(reasons, ['unknown customer', 'invalid rating'])
+        self.assertIn('Imported 2 reviews, rejected 2 rows', out.getvalue())
+
+    def test_import_reviews_jsonl(self):
+        path = self.write_file('reviews.jsonl', '\n'.join([
+            json.dumps({'restaurant': self.restaurant.id, 'customer': 'testuser', 'rating': 4, 'pricing': 'moderate'}),
+            json.dumps({'restaurant': self.restaurant.id, 'customer': 'testuser', 'rating': 2, 'pricing': 'cheap'}),
+            json.dumps({'restaurant': 999, 'customer': 'testuser2', 'rating': 4, 'pricing': 'moderate'}),
+            'not json',
+        ]))
+        out = StringIO()
+
+        call_command('import_reviews', path, stdout=out)
+
+        review = Review.objects.get()
+        self.assertEqual((review.rating, review.pricing), (2, 'cheap'))
+        self.assertIn('Imported 1 reviews, rejected 2 rows', out.getvalue())
+
+    @skipIf(connection.vendor == 'postgresql', 'COPY is available on PostgreSQL')
+    def test_import_reviews_copy_requires_postgresql(self):
+        path = self.write_file('reviews.jsonl', '')
+
+        with self.assertRaises(CommandError):
+            call_command('import_reviews', path, copy=True, stdout=StringIO())
+
+
+class VerifyStatsCommandTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.other_user = get_user_model().objects.create_user(username='otheruser', password='testpassword')
+
+        self.restaurants = [
+            Restaurant.objects.create(name=f'Restaurant {i}', cuisine='asian_cuisine', address='Test',
+                                      created_by=self.user)
+            for i in range(3)
+        ]
+        for restaurant in self.restaurants:
+            Review.objects.create(restaurant=restaurant, customer=self.user, rating=4, pricing='cheap')
+            Visit.objects.create(restaurant=restaurant, customer=self.user, date=date(2023, 1, 1), spending='10.00')
+
+    def test_consistent(self):
+        out = StringIO()
+        call_command('verify_stats', '--chunk-size', '2', stdout=out)
+
+        self.assertIn('All statistics are consistent.', out.getvalue())
+
+    def test_report_without_repair(self):
+        Restaurant.objects.filter(pk=self.restaurants[1].pk).update(review_count=7)
+
+        out = StringIO()
+        call_command('verify_stats', stdout=out)
+
+        self.assertIn(f'restaurant {self.restaurants[1].pk}:', out.getvalue())
+        self.assertIn('Found 1 mismatching statistics', out.getvalue())
+        self.assertEqual(Restaurant.objects.get(pk=self.restaurants[1].pk).review_count, 7)
+
+    def test_repair(self):
+        Restaurant.objects.filter(pk=self.restaurants[0].pk).update(rating_sum=0, pricing_cheap_count=0)
+        Review.objects.filter(restaurant=self.restaurants[2]).update(rating=2)
+        CustomerRestaurantStats.objects.filter(restaurant=self.restaurants[0]).update(total_spending=Decimal('1.00'))
+        CustomerRestaurantStats.objects.filter(restaurant=self.restaurants[1]).delete()
+        CustomerRestaurantStats.objects.create(
+            customer=self.other_user, restaurant=self.restaurants[2], visit_count=1,
+            total_spending=Decimal('5.00'), first_visit=date(2023, 1, 1), last_visit=date(2023, 1, 1),
+        )
+
+        out = StringIO()
+        call_command('verify_stats', '--repair', '--chunk-size', '1', '--batch-size', '1', stdout=out)
+        self.assertIn('Repaired 5 mismatching statistics.', out.getvalue())
+
+        for restaurant in Restaurant.objects.all():
+            rating = 2 if restaurant.pk == self.restaurants[2].pk else 4
+            self.assertEqual((restaurant.review_count, restaurant.rating_sum, restaurant.pricing_cheap_count),
+                             (1, rating, 1))
+            self.assertAlmostEqual(restaurant.bayesian_rating, compute_bayesian_rating(1, rating))
+
+        self.assertEqual(
+            sorted(CustomerRestaurantStats.objects.values_list('customer_id', 'restaurant_id', 'total_spending')),
+            [(self.user.pk, restaurant.pk, Decimal('10.00')) for restaurant in self.restaurants],
+        )
+
+        out = StringIO()
+        call_command('verify_stats', stdout=out)
+        self.assertIn('All statistics are consistent.', out.getvalue())
+
+    def test_periodic_task(self):
+        Restaurant.objects.filter(pk=self.restaurants[0].pk).update(review_count=0)
+
+        self.assertEqual(verify_stats(), {'restaurant': 1, 'customer_restaurant': 0})
+        self.assertEqual(Restaurant.objects.get(pk=self.restaurants[0].pk).review_count, 1)
+
+
+class BenchCommandTestCase(TestCase):
+    def setUp(self):
+        self.command = BenchCommand()
+        self.command.seed(size=6, seed=1)
+
+    def test_seed(self):
+        self.assertEqual(Restaurant.objects.count(), 6)
+        self.assertEqual(Review.objects.count(), 30)
+        self.assertEqual(Visit.objects.count(), 60)
+        self.assertEqual(sum(Restaurant.objects.values_list('review_count', flat=True)), 30)
+        self.assertEqual(sum(CustomerRestaurantStats.objects.values_list('visit_count', flat=True)), 60)
+
+    def test_run_endpoints(self):
+        options = {'endpoint': ['restaurant_list', 'restaurants', 'visits_export', 'delete_visit'],
+                   'warmup': 1, 'iterations': 3}
+        results = self.command.run_endpoints(options)
+
+        self.assertEqual(set(results), set(options['endpoint']))
+        for result in results.values():
+            self.assertLess(result['status'], 400)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+        # the cache is cleared before the measured request: validators, count and page
+        self.assertEqual(results['restaurants']['queries'], 3)
+
+        # writes are rolled back after every request
+        self.assertEqual(Visit.objects.count(), 60)
+
+    def test_compare(self):
+        baseline = {'restaurants': {'p95_ms': 10.0, 'queries': 1}, 'visits': {'p95_ms': 10.0, 'queries': 3}}
+        results = {'restaurants': {'p95_ms': 12.0, 'queries': 2}, 'visits': {'p95_ms': 14.0, 'queries': 3},
+                   'metrics': {'p95_ms': 5.0, 'queries': 0}}
+
+        regressions = self.command.compare(baseline, results, threshold=0.25)
+
+        self.assertEqual(regressions, ['restaurants: 2 queries, baseline 1',
+                                       'visits: p95 14.00ms, baseline 10.00ms (+40%)'])
+
+    def test_invalid_iterations(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', iterations=0, stdout=StringIO())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 99)), (50, 95, 99))
+
+
+class GenerateDataCommandTestCase(TestCase):
+    def generate(self, **options):
+        call_command('generate_data', customers=40, restaurants=40, reviews=150, visits=600, days=30,
+                     chunk_size=7, batch_size=50, stdout=StringIO(), **options)
+
+    def test_generate_data(self):
+        self.generate()
+
+        self.assertEqual(get_user_model().objects.filter(username__startswith='generated_').count(), 40)
+        self.assertEqual(set(Restaurant.objects.values_list('cuisine', flat=True)),
+                         {cuisine for cuisine, _ in Restaurant.RESTAURANT_TYPE_OPTIONS})
+        # heavy reviewers are capped at one review per restaurant
+        self.assertTrue(120 <= Review.objects.count() <= 170)
+        self.assertAlmostEqual(Visit.objects.count(), 600, delta=60)
+
+        # skewed popularity: the most reviewed restaurant has several times the reviews of the least
+        counts = sorted(Restaurant.objects.values_list('review_count', flat=True))
+        self.assertGreater(counts[-1], 2 * counts[0])
+
+        out = StringIO()
+        call_command('verify_stats', stdout=out)
+        self.assertIn('All statistics are consistent.', out.getvalue())
+
+    def test_reproducible(self):
+        self.generate(seed=3, prefix='first_')
+        first = sorted(Visit.objects.values_list('customer__username', 'date', 'spending'))
+        Visit.objects.all().delete()
+
+        self.generate(seed=3, prefix='second_')
+        second = sorted(Visit.objects.values_list('customer__username', 'date', 'spending'))
+
+        self.assertEqual([(username.replace('first_', ''), *rest) for username, *rest in first],
+                         [(username.replace('second_', ''), *rest) for username, *rest in second])
+
+    def test_existing_prefix(self):
+        self.generate()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+# the command closes connections, which would end the transaction of a TestCase
+class BenchConnectionsCommandTestCase(TransactionTestCase):
+    @skipIf(connection.vendor == 'sqlite', 'in-memory SQLite test connections are never closed')
+    def test_bench_connections(self):
+        out = StringIO()
+        call_command('bench_connections', '--requests', '5', stdout=out)
+
+        self.assertIn('CONN_MAX_AGE=0 ', out.getvalue())
+        self.assertIn('Persistent connections save', out.getvalue())
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+
+    def test_invalid_requests(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_connections', '--requests', '0', stdout=StringIO())
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    def test_loadtest(self):
+        output = os.path.join(tempfile.mkdtemp(), 'loadtest.json')
+        call_command('loadtest', f'{self.live_server_url}/api/async/restaurants/', f'{self.live_server_url}/missing/',
+                     '--concurrency', '2', '--requests', '6', '--output', output, stdout=StringIO())
+
+        with open(output) as file:
+            results = json.load(file)['urls']
+
+        self.assertEqual(results[f'{self.live_server_url}/api/async/restaurants/']['errors'], 0)
+        self.assertEqual(results[f'{self.live_server_url}/missing/']['errors'], 6)
+
+
+class VisitPartitionsCommandTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', cuisine='asian_cuisine', address='Test',
+                                                    created_by=self.user)
+        for month in range(1, 4):
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=date(2023, month, 15),
+                                 spending='10.00')
+
+        if connection.vendor == 'postgresql':
+            # tables with pending deferred constraint checks cannot be altered
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    @skipIf(connection.vendor == 'postgresql', 'partitioning is available on PostgreSQL')
+    def test_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('visit_partitions', stdout=StringIO())
+
+        self.assertEqual(create_visit_partitions_task(), [])
+
+    @skipUnless(connection.vendor == 'postgresql', 'partitioning requires PostgreSQL')
+    def test_convert(self):
+        with self.assertRaises(CommandError):
+            call_command('visit_partitions', stdout=StringIO())
+
+        out = StringIO()
+        call_command('visit_partitions', '--convert', '--months-ahead', '2', stdout=out)
+
+        current = timezone.now().date().replace(day=1)
+        self.assertTrue(is_partitioned())
+        months = get_partition_months()
+        self.assertEqual((months[0], months[-1]), (date(2023, 1, 1), add_months(current, 2)))
+        self.assertEqual(Visit.objects.count(), 3)
+
+        # the model keeps working, including the (restaurant, customer, date) uniqueness
+        visit = Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=current, spending='5.00')
+        self.assertEqual(Visit.objects.get(pk=visit.pk).spending, Decimal('5.00'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=current, spending='1.00')
+
+    @skipUnless(connection.vendor == 'postgresql', 'partitioning requires PostgreSQL')
+    def test_partition_pruning(self):
+        partition_visit_table()
+
+        plan = Visit.objects.filter(date__gte=date(2023, 2, 1), date__lt=date(2023, 3, 1)).explain()
+
+        self.assertIn('reviews_visit_y2023m02', plan)
+        self.assertNotIn('reviews_visit_y2023m01', plan)
+        self.assertNotIn('reviews_visit_y2023m03', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'partitioning requires PostgreSQL')
+    def test_create_partitions_moves_default_rows(self):
+        partition_visit_table(months_ahead=1)
+        future = add_months(timezone.now().date().replace(day=1), 6)
+        Visit.objects.create(restaurant=self.restaurant, customer=self.user, date=future, spending='5.00')
+
+        created = create_visit_partitions(months_ahead=6)
+
+        self.assertEqual(len(created), 5)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(Visit.objects.filter(date=future).count(), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'partitioning requires PostgreSQL')
+    def test_detach(self):
+        partition_visit_table()
+
+        out = StringIO()
+        call_command('visit_partitions', '--detach-before', '2023-03-01', '--drop', stdout=out)
+
+        self.assertIn('Dropped reviews_visit_y2023m01.', out.getvalue())
+        self.assertIn('Dropped reviews_visit_y2023m02.', out.getvalue())
+        self.assertEqual(list(Visit.objects.values_list('date', flat=True)), [date(2023, 3, 15)])
+        self.assertEqual(get_partition_months()[0], date(2023, 3, 1))
@@ -1,10 +1,15 @@
-from datetime import date
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.test import TestCase
+from django.db import IntegrityError, connection
+from django.db.models import Count, Q, Sum
+from django.test import TestCase, TransactionTestCase
 
-from reviews.models import Customer, Restaurant, Review, Visit
+from reviews.models import Customer, CustomerRestaurantStats, Restaurant, Review, Visit
+from reviews.utils import calculate_user_total_spending_at_restaurant, count_user_visits_to_restaurant
 
 
 # customer
@@ -75,12 +80,99 @@ class RestaurantModelTestCase(TestCase):
         )
 
     def test_average_rating(self):
-        avg_rating = self.restaurant.average_rating()
+        self.restaurant.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            avg_rating = self.restaurant.average_rating
 
         self.assertEqual(avg_rating, (4 + 5) / 2)
 
+    def test_review_stats_on_create(self):
+        self.restaurant.refresh_from_db()
+
+        self.assertEqual(self.restaurant.review_count, 2)
+        self.assertEqual(self.restaurant.rating_sum, 9)
+        self.assertEqual(self.restaurant.pricing_high_count, 1)
+
+    def test_review_stats_on_rating_update(self):
+        review = Review.objects.get(pk=self.review1.pk)
+        review.rating = 1
+        review.save()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 2)
+        self.assertEqual(self.restaurant.rating_sum, 6)
+
+    def test_review_stats_on_delete(self):
+        self.review2.delete()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 1)
+        self.assertEqual(self.restaurant.average_rating, 4)
+
+    def test_review_stats_on_cascade_delete(self):
+        self.user2.delete()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 1)
+        self.assertEqual(self.restaurant.rating_sum, 4)
+
+    def test_pricing_counts_on_update(self):
+        review = Review.objects.get(pk=self.review1.pk)
+        review.pricing = 'high'
+        review.save()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.pricing_moderate_count, 0)
+        self.assertEqual(self.restaurant.pricing_high_count, 2)
+        self.assertEqual(self.restaurant.get_restaurant_pricing_category_eval(), 'high')
+
+    def test_pricing_counts_on_rating_and_comment_update(self):
+        review = Review.objects.get(pk=self.review1.pk)
+        review.rating = 2
+        review.save()
+        review.comment = 'Updated comment'
+        review.save()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.rating_sum, 7)
+        self.assertEqual(self.restaurant.pricing_moderate_count, 1)
+        self.assertEqual(self.restaurant.pricing_high_count, 1)
+
+    def test_evaluate_pricing_counts_tie_scenarios(self):
+        evaluate = Restaurant.evaluate_pricing_counts
+
+        self.assertEqual(evaluate(Counter(cheap=2, high=2, moderate=1)), 'moderate')
+        self.assertEqual(evaluate(Counter(cheap=1, overpriced=1)), 'moderate')
+        self.assertEqual(evaluate(Counter(moderate=3, overpriced=3)), 'high')
+        self.assertEqual(evaluate(Counter(cheap=3, moderate=3)), 'moderate - cheap')
+        self.assertEqual(evaluate(Counter(cheap=0, moderate=0, high=0, overpriced=0)), None)
+
+    def test_with_stats(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(review_count=0, rating_sum=0, pricing_high_count=0)
+
+        restaurant = Restaurant.objects.with_stats().get(pk=self.restaurant.pk)
+
+        self.assertEqual(restaurant.stats_review_count, 2)
+        self.assertEqual(restaurant.stats_pricing_high_count, 1)
+        self.assertEqual(restaurant.average_rating, (4 + 5) / 2)
+        self.assertIn(restaurant.get_restaurant_pricing_category_eval(), ['high - moderate', 'moderate - high'])
+
+    def test_recalculate_review_stats(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(review_count=0, rating_sum=0, pricing_high_count=0)
+
+        self.restaurant.recalculate_review_stats()
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 2)
+        self.assertEqual(self.restaurant.rating_sum, 9)
+        self.assertEqual(self.restaurant.pricing_high_count, 1)
+
     def test_get_restaurant_pricing_category_eval(self):
-        pricing_category_eval = self.restaurant.get_restaurant_pricing_category_eval()
+        self.restaurant.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            pricing_category_eval = self.restaurant.get_restaurant_pricing_category_eval()
 
         self.assertTrue(
             pricing_category_eval in ['high - moderate', 'moderate - high'],
@@ -186,3 +278,156 @@ class VisitModelTestCase(TestCase):
                 pass
             else:
                 self.fail("IntegrityError not raised for non-unique visit combination")
+
+
+# stats
+class CustomerRestaurantStatsModelTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            cuisine='asian_cuisine',
+            address='123 Test Street',
+            created_by=self.user,
+        )
+
+        self.visit1 = Visit.objects.create(
+            restaurant=self.restaurant,
+            customer=self.user,
+            date=date(2023, 1, 10),
+            spending='25.50',
+        )
+        self.visit2 = Visit.objects.create(
+            restaurant=self.restaurant,
+            customer=self.user,
+            date=date(2023, 1, 5),
+            spending='10.00',
+        )
+
+    def get_stats(self):
+        return CustomerRestaurantStats.objects.get(customer=self.user, restaurant=self.restaurant)
+
+    def test_stats_on_create(self):
+        stats = self.get_stats()
+
+        self.assertEqual(stats.visit_count, 2)
+        self.assertEqual(stats.total_spending, Decimal('35.50'))
+        self.assertEqual(stats.first_visit, date(2023, 1, 5))
+        self.assertEqual(stats.last_visit, date(2023, 1, 10))
+
+    def test_stats_on_spending_update(self):
+        visit = Visit.objects.get(pk=self.visit1.pk)
+        visit.spending = Decimal('30.00')
+        visit.save()
+
+        self.assertEqual(self.get_stats().total_spending, Decimal('40.00'))
+
+    def test_stats_on_date_update(self):
+        visit = Visit.objects.get(pk=self.visit2.pk)
+        visit.date = date(2023, 2, 1)
+        visit.save()
+
+        stats = self.get_stats()
+        self.assertEqual(stats.first_visit, date(2023, 1, 10))
+        self.assertEqual(stats.last_visit, date(2023, 2, 1))
+
+    def test_stats_on_delete(self):
+        self.visit1.delete()
+
+        stats = self.get_stats()
+        self.assertEqual(stats.visit_count, 1)
+        self.assertEqual(stats.total_spending, Decimal('10.00'))
+
+        self.visit2.delete()
+
+        self.assertFalse(CustomerRestaurantStats.objects.exists())
+
+    def test_stats_on_restaurant_delete(self):
+        self.restaurant.delete()
+
+        self.assertFalse(CustomerRestaurantStats.objects.exists())
+        self.assertEqual(Visit.objects.filter(restaurant=None).count(), 2)
+
+    def test_utils_read_stats(self):
+        with self.assertNumQueries(1):
+            visit_count = count_user_visits_to_restaurant(self.user, self.restaurant)
+
+        self.assertEqual(visit_count, 2)
+        self.assertEqual(calculate_user_total_spending_at_restaurant(self.user, self.restaurant), Decimal('35.50'))
+
+
+# indexes
+@skipUnless(connection.vendor == 'postgresql', 'the query plans are checked on PostgreSQL')
+class IndexUsageTestCase(TransactionTestCase):
+    """
+    Check that the hot query shapes are answered from their indexes.
+
+    The tables of the tests are too small for the planner to prefer an index over
+    a sequential scan, so sequential scans are disabled while explaining.
+    """
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.restaurants = Restaurant.objects.bulk_create([
+            Restaurant(name=f'Restaurant {i}', cuisine='asian_cuisine', address='Test', created_by=self.user)
+            for i in range(20)
+        ])
+        customers = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'customer{i}', email=f'customer{i}@example.com') for i in range(20)
+        ])
+        Review.objects.bulk_create([
+            Review(restaurant=restaurant, customer=customer, rating=(i + j) % 5 + 1)
+            for i, restaurant in enumerate(self.restaurants) for j, customer in enumerate(customers)
+        ])
+        Visit.objects.bulk_create([
+            Visit(restaurant=restaurant, customer=customer, date=date(2023, 1, 1) + timedelta(days=i), spending=10)
+            for i, restaurant in enumerate(self.restaurants) for customer in customers
+        ])
+        self.customer = customers[0]
+
+        with connection.cursor() as cursor:
+            # index-only scans need an up to date visibility map
+            cursor.execute('VACUUM ANALYZE reviews_customer, reviews_review, reviews_visit')
+            cursor.execute('SET enable_seqscan = off')
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def test_customer_visits_by_date(self):
+        for visits in [
+            Visit.objects.filter(customer=self.customer).order_by('-date'),
+            self.customer.get_all_visits(),
+        ]:
+            plan = visits.explain()
+
+            self.assertIn('visit_customer_date_idx', plan)
+            self.assertNotIn('Sort', plan)
+
+    def test_customer_reviews_by_created(self):
+        plan = Review.objects.filter(customer=self.customer).order_by('-created', '-id').explain()
+
+        self.assertIn('review_customer_created_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_restaurant_review_aggregates(self):
+        # the shape of Restaurant.recalculate_review_stats
+        reviews = Review.objects.filter(restaurant=self.restaurants[0]).values('restaurant').annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            cheap_count=Count('id', filter=Q(pricing='cheap')),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_bitmapscan = off')
+            try:
+                plan = reviews.explain()
+            finally:
+                cursor.execute('RESET enable_bitmapscan')
+
+        self.assertIn('Index Only Scan using review_restaurant_cover_idx', plan)
+
+    def test_reviews_by_customer_username(self):
+        plan = Review.objects.filter(customer__username__icontains='customer1').explain()
+
+        self.assertIn('customer_username_upper_trgm_idx', plan)
@@ -1,8 +1,17 @@
+import os
+import tempfile
+
 from django.contrib.auth import get_user_model
 from django.contrib.messages import get_messages
-from django.test import TestCase, Client
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from reviews.forms import RegistrationForm, RestaurantForm, ReviewForm, VisitForm
+from reviews.middleware import QueryBudgetExceeded
 from reviews.models import Restaurant, Review, Visit
 
 
@@ -205,8 +214,45 @@ class RestaurantDeleteViewTestCase(TestCase):
         self.assertRedirects(response, reverse('restaurant_list'))
 
 
+class RestaurantListViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            password='testpassword'
+        )
+        self.other_user = get_user_model().objects.create_user(
+            username='otheruser',
+            password='otherpassword'
+        )
+
+    def create_restaurants(self, count):
+        for index in range(count):
+            Restaurant.objects.create(
+                name=f'Test Restaurant {index}',
+                cuisine='european_cuisine',
+                address='Test Address',
+                created_by=self.other_user if index % 2 else self.user
+            )
+
+    def test_restaurant_list_view_constant_query_count(self):
+        self.client.login(username='testuser', password='testpassword')
+
+        self.create_restaurants(2)
+        with CaptureQueriesContext(connection) as small_page:
+            response = self.client.get(reverse('restaurant_list'))
+        self.assertEqual(response.status_code, 200)
+
+        self.create_restaurants(10)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(reverse('restaurant_list'))
+        self.assertEqual(len(response.context['restaurants']), 12)
+
+        self.assertEqual(len(small_page.captured_queries), len(large_page.captured_queries))
+
+
 class RestaurantDetailViewTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = get_user_model().objects.create_user(
             username='testuser',
             password='testpassword'
@@ -233,6 +279,26 @@ class RestaurantDetailViewTestCase(TestCase):
 
         self.assertTemplateUsed(response, 'reviews/restaurant_detail.html')
 
+    def test_restaurant_detail_view_cached_per_user(self):
+        url = reverse('restaurant_detail', args=[self.restaurant.id])
+        self.client.login(username='testuser', password='testpassword')
+        self.client.get(url)
+
+        response = self.client.get(url)
+        self.assertIsNone(response.context)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Visit.objects.create(restaurant=self.restaurant, customer=self.user, date='2023-01-01', spending='10.00')
+
+        response = self.client.get(url)
+        self.assertEqual(response.context['visit_count'], 1)
+
+        get_user_model().objects.create_user(username='otheruser', password='testpassword')
+        self.client.login(username='otheruser', password='testpassword')
+
+        response = self.client.get(url)
+        self.assertEqual(response.context['visit_count'], 0)
+
 
 # review
 class CreateReviewViewTestCase(TestCase):
@@ -449,3 +515,191 @@ class DeleteVisitViewTestCase(TestCase):
 
         with self.assertRaises(Visit.DoesNotExist):
             Visit.objects.get(id=self.visit.id)
+
+
+# query instrumentation
+@override_settings(QUERY_BUDGETS={'restaurant_list': 1}, QUERY_BUDGET_RAISE=False)
+class QueryCountMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        Restaurant.objects.create(name='Test Restaurant', cuisine='asian_cuisine', address='Test', created_by=self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('login'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", db-slowest;dur=[\d.]+$')
+
+    def test_query_log(self):
+        with self.assertLogs('reviews.queries', level='INFO') as logs:
+            self.client.get(reverse('restaurant_list'))
+
+        record = logs.records[0]
+        self.assertEqual((record.view, record.status), ('restaurant_list', 200))
+        self.assertEqual(record.queries, int(record.getMessage().split('queries=')[1].split()[0]))
+
+    def test_budget_exceeded_logged(self):
+        self.client.login(username='testuser', password='testpassword')
+
+        with self.assertLogs('reviews.queries', level='WARNING') as logs:
+            response = self.client.get(reverse('restaurant_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('restaurant_list executed', logs.output[-1])
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_budget_exceeded_raises(self):
+        self.client.login(username='testuser', password='testpassword')
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('restaurant_list'))
+
+
+# metrics
+class MetricsViewTestCase(TestCase):
+    def test_metrics(self):
+        self.client.get(reverse('login'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        for sample in [
+            'restaurant_review_request_duration_seconds_count{method="GET",view="login"}',
+            'restaurant_review_response_size_bytes_count{method="GET",view="login"}',
+            'restaurant_review_db_queries_count{view="login"}',
+            'restaurant_review_requests_in_flight',
+            'restaurant_review_worker_start_time_seconds',
+        ]:
+            self.assertIn(sample, content)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_metrics_restricted(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+        get_user_model().objects.create_user(username='staff', password='testpassword', is_staff=True)
+        self.client.login(username='staff', password='testpassword')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_cache_metrics(self):
+        user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        restaurant = Restaurant.objects.create(name='Test', cuisine='asian_cuisine', address='Test', created_by=user)
+        self.client.get(reverse('restaurant_detail', args=[restaurant.id]))
+        self.client.get(reverse('restaurant_detail', args=[restaurant.id]))
+
+        content = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('restaurant_review_view_cache_requests_total{result="hit",view="restaurant_detail"}', content)
+        self.assertIn('restaurant_review_view_cache_requests_total{result="miss",view="restaurant_detail"}', content)
+
+
+# read replicas
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTestCase(TestCase):
+    """
+    A second SQLite database stands in for the replica. It is only updated by
+    `replicate`, so whatever was written since is missing from it like on a lagging replica.
+    """
+    @classmethod
+    def setUpClass(cls):
+        # the alias only exists while the test case runs, so it is not declared for the test runner
+        cls.databases = {'default', 'replica'}
+        cls.replica_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+        connections.settings['replica'] = connections.configure_settings({
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.replica_file.name},
+        })['default']
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        os.unlink(cls.replica_file.name)
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='testuser', password='testpassword')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', cuisine='asian_cuisine',
+                                                    address='Test Address', created_by=self.user)
+        self.review = Review.objects.create(restaurant=self.restaurant, customer=self.user, rating=4,
+                                            pricing='moderate', comment='Replicated review')
+
+    @staticmethod
+    def replicate():
+        # bulk_create sends no signals, so the statistics of the primary stay untouched
+        for model in [get_user_model(), Restaurant, Review, Session]:
+            replicated = set(model.objects.using('replica').values_list('pk', flat=True))
+            rows = [row for row in model.objects.using('default').all() if row.pk not in replicated]
+            model.objects.using('replica').bulk_create(rows)
+
+    def test_get_reads_from_replica(self):
+        response = self.client.get(reverse('review', args=[self.review.id]))
+        self.assertEqual(response.status_code, 404)
+
+        self.replicate()
+        response = self.client.get(reverse('review', args=[self.review.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comment'], 'Replicated review')
+        self.assertNotIn('primary_until', response.cookies)
+
+    async def test_async_get_reads_from_replica(self):
+        response = await self.async_client.get(reverse('async_review', args=[self.review.id]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_go_to_primary(self):
+        self.replicate()
+        self.client.login(username='testuser', password='testpassword')
+        self.replicate()
+
+        response = self.client.post(reverse('add_visit', args=[self.restaurant.id]),
+                                    data={'date': '2023-01-01', 'spending': '25.00'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Visit.objects.using('default').exists())
+        self.assertFalse(Visit.objects.using('replica').exists())
+        self.assertIn('primary_until', response.cookies)
+
+    def test_read_your_writes(self):
+        self.replicate()
+        self.client.login(username='testuser', password='testpassword')
+        self.replicate()
+
+        response = self.client.post(reverse('create_review', args=[self.restaurant.id]), follow=True,
+                                    data={'rating': 5, 'pricing': 'high', 'comment': 'Updated review'})
+
+        # the redirected request reads the updated rating from the primary
+        self.assertEqual(response.redirect_chain, [(reverse('restaurant_detail', args=[self.restaurant.id]), 302)])
+        self.assertContains(response, 'Average Rating: 5')
+        self.assertEqual(Review.objects.using('replica').get(id=self.review.id).comment, 'Replicated review')
+
+        response = self.client.get(reverse('review', args=[self.review.id]))
+        self.assertEqual(response.json()['comment'], 'Updated review')
+
+        # once the window expired, the reads are back on the (still lagging) replica
+        self.client.cookies['primary_until'] = '0'
+        response = self.client.get(reverse('review', args=[self.review.id]))
+        self.assertEqual(response.json()['comment'], 'Replicated review')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_read_after_write_without_stickiness(self):
+        self.replicate()
+        self.client.login(username='testuser', password='testpassword')
+        self.replicate()
+
+        response = self.client.post(reverse('create_review', args=[self.restaurant.id]), follow=True,
+                                    data={'rating': 5, 'pricing': 'high', 'comment': 'Updated review'})
+
+        # the lagging replica still has the previous rating
+        self.assertContains(response, 'Average Rating: 4')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas(self):
+        response = self.client.get(reverse('review', args=[self.review.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('primary_until', response.cookies)
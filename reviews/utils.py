@@ -1,6 +1,28 @@
 from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 from django.contrib import messages
-from .models import Visit, Restaurant, Customer
+from django.db.models import QuerySet, Sum
+
+from .models import CustomerRestaurantStats, Visit, Restaurant, Customer
+
+
+def get_customer_restaurant_stats(user: Customer, restaurant: Restaurant) -> Optional[CustomerRestaurantStats]:
+    """
+    Get the stored visit statistics of a user at a restaurant.
+
+    This is a single lookup on the (customer, restaurant) unique index.
+
+    Parameters:
+        user (get_user_model): The user for whom the statistics are retrieved.
+        restaurant (Restaurant): The restaurant for which the statistics are retrieved.
+
+    Returns:
+        Optional[CustomerRestaurantStats]: The statistics, or None if the user has not
+                visited the restaurant or is anonymous.
+
+    """
+    return CustomerRestaurantStats.objects.filter(customer_id=user.pk, restaurant_id=restaurant.pk).first()
 
 
 def count_user_visits_to_restaurant(user: Customer, restaurant: Restaurant) -> int:
@@ -18,9 +40,11 @@ def count_user_visits_to_restaurant(user: Customer, restaurant: Restaurant) -> i
 
     """
     try:
-        user_visits = Visit.objects.filter(customer=user, restaurant=restaurant)
-        visit_count = user_visits.count()
-        return visit_count
+        if restaurant is None:
+            return Visit.objects.filter(customer=user, restaurant=None).count()
+
+        stats = get_customer_restaurant_stats(user, restaurant)
+        return stats.visit_count if stats else 0
     except Visit.DoesNotExist:
         messages.error("Error counting visits. Please try again.")
         return 0
@@ -44,9 +68,12 @@ def calculate_user_total_spending_at_restaurant(user: Customer, restaurant: Rest
 
     """
     try:
-        user_visits = Visit.objects.filter(customer=user, restaurant=restaurant)
-        total_spending = sum(visit.spending for visit in user_visits)
-        return total_spending
+        if restaurant is None:
+            user_visits = Visit.objects.filter(customer=user, restaurant=None)
+            return user_visits.aggregate(total=Sum('spending'))['total'] or 0
+
+        stats = get_customer_restaurant_stats(user, restaurant)
+        return stats.total_spending if stats else 0
     except Visit.DoesNotExist:
         messages.error("Error calculating total spending. Please try again.")
         return 0
@@ -56,3 +83,70 @@ def calculate_user_total_spending_at_restaurant(user: Customer, restaurant: Rest
     except Exception as e:
         messages.error("An unexpected error occurred. Please try again later.")
         return 0
+
+
+def get_total_spending_by_customer_and_restaurant(
+        visits: Iterable[Visit]) -> Dict[Tuple[int, Optional[int]], Decimal]:
+    """
+    Calculate the total spending for every (customer, restaurant) pair of the given visits.
+
+    The totals are read from the stored customer restaurant statistics with a single
+    query, which makes it suitable for list responses where every visit needs the total
+    spending of its customer at its restaurant. Visits whose restaurant was deleted are
+    summed with one additional grouped query.
+
+    Parameters:
+        visits (Iterable[Visit]): The visits for which the totals are needed.
+
+    Returns:
+        Dict[Tuple[int, Optional[int]], Decimal]: The total spending keyed by
+                (customer ID, restaurant ID).
+
+    """
+    pairs = {(visit.customer_id, visit.restaurant_id) for visit in visits}
+    totals = {}
+
+    for query in _total_spending_queries(pairs):
+        totals.update({(customer_id, restaurant_id): total for customer_id, restaurant_id, total in query})
+
+    return {pair: total for pair, total in totals.items() if pair in pairs}
+
+
+async def aget_total_spending_by_customer_and_restaurant(
+        visits: Iterable[Visit]) -> Dict[Tuple[int, Optional[int]], Decimal]:
+    """
+    Asynchronous version of `get_total_spending_by_customer_and_restaurant`.
+    """
+    pairs = {(visit.customer_id, visit.restaurant_id) for visit in visits}
+    totals = {}
+
+    for query in _total_spending_queries(pairs):
+        totals.update({(customer_id, restaurant_id): total async for customer_id, restaurant_id, total in query})
+
+    return {pair: total for pair, total in totals.items() if pair in pairs}
+
+
+def _total_spending_queries(pairs: Set[Tuple[int, Optional[int]]]) -> List[QuerySet]:
+    """
+    Build the queries returning (customer ID, restaurant ID, total spending) rows for the given pairs.
+    """
+    customer_ids = {customer_id for customer_id, restaurant_id in pairs if restaurant_id is not None}
+    restaurant_ids = {restaurant_id for _, restaurant_id in pairs if restaurant_id is not None}
+    queries = []
+
+    if restaurant_ids:
+        queries.append(CustomerRestaurantStats.objects.filter(
+            customer_id__in=customer_ids, restaurant_id__in=restaurant_ids,
+        ).values_list('customer_id', 'restaurant_id', 'total_spending'))
+
+    detached_customer_ids = {customer_id for customer_id, restaurant_id in pairs if restaurant_id is None}
+    if detached_customer_ids:
+        queries.append(
+            Visit.objects.filter(customer_id__in=detached_customer_ids, restaurant__isnull=True)
+            .values('customer_id', 'restaurant_id')
+            .annotate(total_spending=Sum('spending'))
+            .values_list('customer_id', 'restaurant_id', 'total_spending')
+            .order_by()
+        )
+
+    return queries
@@ -7,6 +7,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.http import HttpRequest, HttpResponse
 from typing import List, Union
 
+from .cache import cached_view
 from .forms import (LoginForm, RegistrationForm, RestaurantForm, ReviewForm,
                     VisitForm)
 from .models import Restaurant, Review, Visit
@@ -222,6 +223,7 @@ def restaurant_list(request: HttpRequest) -> Union[render]:
         return render(request, 'reviews/restaurant_list.html', {'restaurants': []})
 
 
+@cached_view('restaurant_detail', lambda request, restaurant_id: [f'restaurant:{restaurant_id}'], per_user=True)
 def restaurant_detail(request: HttpRequest, restaurant_id: int) -> Union[render, HttpResponse]:
     """
     Display details for a specific restaurant.